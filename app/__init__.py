@@ -2,32 +2,43 @@ import logging
 from flask import Flask, jsonify
 from config import Config
 from flask_cors import CORS
+from werkzeug.middleware.proxy_fix import ProxyFix
 
-from .models import init_db
+from .metrics import init_metrics
+from .db import init_db
+from .events import init_events
+from .pricing import init_pricing
+from .ratelimit import init_rate_limiter
+from .tracing import init_tracing
+from .waiters import init_waiters
+
+# Allow development localhost origins and the deployed domains
+ALLOWED_ORIGINS = [
+    "http://localhost",
+    "http://localhost:3000",
+    "http://127.0.0.1",
+    "http://127.0.0.1:3000",
+    "https://midnight-madness.808dtp.com",
+    "https://admin.808dtp.com",
+    "https://808api.vercel.app",  # Add Vercel domain
+]
 
 
 def create_app():
     app = Flask(__name__)
     app.config.from_object(Config)
 
-    # Configure CORS
-    # Allow development localhost origins and the deployed domains
-    allowed_origins = [
-        "http://localhost",
-        "http://localhost:3000",
-        "http://127.0.0.1",
-        "http://127.0.0.1:3000",
-        "https://midnight-madness.808dtp.com",
-        "https://admin.808dtp.com",
-        "https://808api.vercel.app",  # Add Vercel domain
-    ]
+    # request.remote_addr is the client, as seen by our trusted proxies
+    hops = app.config.get("TRUSTED_PROXY_HOPS", 1)
+    if hops:
+        app.wsgi_app = ProxyFix(app.wsgi_app, x_for=hops)
 
     # Configure CORS with additional options
     cors = CORS(
         app,
         resources={
             r"/*": {
-                "origins": allowed_origins,
+                "origins": ALLOWED_ORIGINS,
                 "methods": ["GET", "POST", "PUT", "DELETE", "OPTIONS"],
                 "allow_headers": ["Content-Type", "Authorization"],
                 "supports_credentials": True,
@@ -38,18 +49,37 @@ def create_app():
     # initialize logging
     logging.basicConfig(level=logging.INFO)
 
-    # Initialize DB (adds db client to app.extensions['db'])
-    try:
-        init_db(app)
-        app.logger.info("MySQL initialized")
-    except Exception as e:
-        app.logger.warning(f"Failed to initialize DB: {e}")
+    # Request metrics and the /metrics endpoint
+    init_metrics(app)
+
+    # Request ids, spans and the Server-Timing header
+    init_tracing(app)
+
+    # Rate limiter for public endpoints
+    init_rate_limiter(app)
+
+    # Initialize DB (adds the backend to app.extensions['db_pool']). Nothing
+    # connects yet: the pool, schema and pricing load on first DB use
+    init_db(app)
+    init_pricing(app)
+
+    # Broadcaster behind the /admin/events stream
+    init_events(app)
+
+    # Registry that wakes long-polling /check-manual-payment requests
+    init_waiters(app)
 
     # register blueprints
     from .routes import bp as routes_bp
 
     app.register_blueprint(routes_bp)
 
+    # `flask events ...` and `flask comps ...`
+    from .cli import comps_cli, events_cli
+
+    app.cli.add_command(events_cli)
+    app.cli.add_command(comps_cli)
+
     # Generic JSON error handler
     @app.errorhandler(Exception)
     def handle_exception(err):
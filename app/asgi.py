@@ -0,0 +1,161 @@
+"""
+ASGI entry point.
+
+/buy-ticket and /verify-payment are served by an async Quart app
+(async_routes.py: aiomysql + httpx); every other path is handed to the
+regular Flask app through asgiref's WSGI adapter, so one ASGI server
+(uvicorn or hypercorn) runs the whole API:
+
+    uvicorn asgi:app --host 0.0.0.0 --port 8000
+
+The extra dependencies are listed in requirements-async.txt.
+"""
+
+import asyncio
+import time
+
+from asgiref.wsgi import WsgiToAsgi
+from quart import Quart, g, jsonify, request
+from quart_cors import cors
+
+from config import Config
+
+from . import ALLOWED_ORIGINS, create_app
+from .async_db import close_async_db, init_async_db
+from .metrics import metrics
+from .tracing import init_async_tracing
+
+ASYNC_PATHS = frozenset(("/buy-ticket", "/verify-payment"))
+
+
+def _warm_sync(flask_app):
+    """Create the schema and load pricing once, through the sync path."""
+    from . import pricing
+    from .db import get_conn
+
+    with flask_app.app_context():
+        get_conn().close()
+        pricing._ensure_loaded()
+
+
+def create_async_app(flask_app):
+    app = Quart(__name__)
+    app.config.from_object(Config)
+    # One set of rate-limit buckets for both apps
+    app.extensions["rate_limiter"] = flask_app.extensions.get("rate_limiter")
+    app = cors(
+        app,
+        allow_origin=ALLOWED_ORIGINS,
+        allow_methods=["GET", "POST", "PUT", "DELETE", "OPTIONS"],
+        allow_headers=["Content-Type", "Authorization"],
+        allow_credentials=True,
+    )
+
+    @app.before_serving
+    async def _startup():
+        import httpx
+
+        try:
+            await asyncio.to_thread(_warm_sync, flask_app)
+        except Exception as e:
+            app.logger.warning(f"Database warm-up failed: {e}")
+        await init_async_db(flask_app)
+        app.extensions["http_client"] = httpx.AsyncClient(
+            timeout=app.config["ASYNC_HTTP_TIMEOUT"],
+            limits=httpx.Limits(
+                max_connections=app.config["ASYNC_HTTP_MAX_CONNECTIONS"]
+            ),
+        )
+
+    @app.after_serving
+    async def _shutdown():
+        client = app.extensions.pop("http_client", None)
+        if client is not None:
+            await client.aclose()
+        await close_async_db()
+
+    # Same request metrics as init_metrics() records for the Flask app
+    @app.before_request
+    async def _start_timer():
+        g._metrics_start = time.perf_counter()
+
+    @app.after_request
+    async def _record_request(response):
+        start = g.pop("_metrics_start", None)
+        if start is not None:
+            endpoint = request.endpoint or "unmatched"
+            metrics.observe(
+                "http_request_duration_seconds",
+                time.perf_counter() - start,
+                (("endpoint", endpoint), ("method", request.method)),
+            )
+            metrics.inc(
+                "http_requests_total",
+                (
+                    ("endpoint", endpoint),
+                    ("method", request.method),
+                    ("status", response.status_code),
+                ),
+            )
+        return response
+
+    init_async_tracing(app)
+
+    from .async_routes import bp as async_bp
+
+    app.register_blueprint(async_bp)
+
+    @app.errorhandler(Exception)
+    async def handle_exception(err):
+        code = getattr(err, "code", 500)
+        message = getattr(err, "description", str(err))
+        app.logger.exception(err)
+        return jsonify({"success": False, "error": message}), code
+
+    return app
+
+
+def forwarded_client(scope, hops):
+    """
+    scope with its client replaced by the X-Forwarded-For hop `hops` from
+    the right, as ProxyFix(x_for=hops) does for the Flask app; unchanged
+    when the header has fewer hops.
+    """
+    forwarded = [
+        value.decode("latin1")
+        for name, value in scope.get("headers", ())
+        if name.lower() == b"x-forwarded-for"
+    ]
+    hosts = [h.strip() for h in ",".join(forwarded).split(",") if h.strip()]
+    if not hops or len(hosts) < hops:
+        return scope
+    port = (scope.get("client") or (None, 0))[1]
+    return {**scope, "client": (hosts[-hops], port)}
+
+
+class PathDispatcher:
+    """Route ASYNC_PATHS (and lifespan events) to Quart, the rest to Flask."""
+
+    def __init__(self, async_app, wsgi_app, proxy_hops=0):
+        self.async_app = async_app
+        self.wsgi_app = WsgiToAsgi(wsgi_app)
+        # The Flask side already runs behind ProxyFix (see create_app)
+        self.proxy_hops = proxy_hops
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] == "lifespan":
+            await self.async_app(scope, receive, send)
+        elif scope.get("path") in ASYNC_PATHS:
+            scope = forwarded_client(scope, self.proxy_hops)
+            await self.async_app(scope, receive, send)
+        else:
+            await self.wsgi_app(scope, receive, send)
+
+
+def create_asgi_app():
+    flask_app = create_app()
+    return PathDispatcher(
+        create_async_app(flask_app),
+        flask_app,
+        proxy_hops=flask_app.config.get("TRUSTED_PROXY_HOPS", 1),
+    )
@@ -0,0 +1,122 @@
+"""
+Async database access for the ASGI endpoints (see asgi.py).
+
+With the MySQL backend, statements run on an aiomysql pool, so a request
+waiting on the database holds no thread. aiomysql only speaks MySQL: with
+DB_BACKEND=sqlite the async models fall back to the synchronous ones in a
+worker thread, which keeps local runs and benchmarks working.
+
+Schema creation and seeding still happen once through the synchronous
+get_conn() (see asgi.py), so both paths share one set of tables.
+"""
+
+import asyncio
+import time
+from contextlib import asynccontextmanager
+
+from .metrics import metrics
+from .tracing import record_span
+
+_pool = None
+_sync_app = None
+
+
+async def init_async_db(app):
+    """
+    Create the aiomysql pool (no connections are opened yet). `app` is the
+    Flask app, used for its config and for the synchronous fallback.
+    """
+    global _pool, _sync_app
+    _sync_app = app
+    config = app.config
+    if config.get("DB_BACKEND", "mysql") != "mysql":
+        return None
+
+    import aiomysql
+
+    _pool = await aiomysql.create_pool(
+        host=config.get("MYSQL_HOST"),
+        user=config.get("MYSQL_USER"),
+        password=config.get("MYSQL_PASSWORD"),
+        db=config.get("MYSQL_DB"),
+        charset="utf8mb4",
+        autocommit=False,
+        minsize=0,
+        maxsize=config.get("ASYNC_DB_POOL_SIZE", 20),
+        connect_timeout=config.get("DB_CONNECT_TIMEOUT", 5),
+        # Recycle before MySQL's wait_timeout drops idle connections
+        pool_recycle=config.get("ASYNC_DB_POOL_RECYCLE", 280),
+    )
+    return _pool
+
+
+async def close_async_db():
+    global _pool
+    if _pool is not None:
+        _pool.close()
+        await _pool.wait_closed()
+        _pool = None
+
+
+def has_async_pool():
+    return _pool is not None
+
+
+async def run_sync(fn, *args, **kwargs):
+    """Run a synchronous model function in a worker thread."""
+
+    def call():
+        with _sync_app.app_context():
+            return fn(*args, **kwargs)
+
+    return await asyncio.to_thread(call)
+
+
+@asynccontextmanager
+async def connection(tag):
+    """Check out a pooled connection; rolls back anything left uncommitted."""
+    start = time.perf_counter()
+    conn = await _pool.acquire()
+    elapsed = time.perf_counter() - start
+    metrics.observe("db_pool_checkout_seconds", elapsed, (("function", tag),))
+    record_span("db.checkout", elapsed)
+    try:
+        yield conn
+    except Exception:
+        try:
+            await conn.rollback()
+        except Exception:
+            # Broken connection: the pool discards closed connections
+            conn.close()
+        raise
+    finally:
+        _pool.release(conn)
+
+
+async def fetchone(conn, sql, params=None, tag="async"):
+    import aiomysql
+
+    start = time.perf_counter()
+    async with conn.cursor(aiomysql.DictCursor) as cursor:
+        await cursor.execute(sql, params)
+        row = await cursor.fetchone()
+    _record(tag, "SELECT", start, 1 if row else 0)
+    return row
+
+
+async def execute(conn, sql, params=None, tag="async"):
+    """Run a write statement; returns the affected row count."""
+    start = time.perf_counter()
+    async with conn.cursor() as cursor:
+        await cursor.execute(sql, params)
+        rows = cursor.rowcount
+    _record(tag, sql.lstrip().split(None, 1)[0].upper(), start, rows)
+    return rows
+
+
+def _record(tag, statement, start, rows):
+    elapsed = time.perf_counter() - start
+    labels = (("function", tag), ("statement", statement))
+    metrics.observe("db_query_duration_seconds", elapsed, labels)
+    metrics.inc("db_query_rows_total", (("function", tag),), max(rows, 0))
+    record_span(f"db.{tag}", elapsed)
@@ -0,0 +1,190 @@
+"""
+Async versions of the model functions used by the purchase and
+verification endpoints. The SQL, pricing and counter updates are the ones
+models.py uses (only the awaiting differs); without an aiomysql pool
+(DB_BACKEND=sqlite) each call runs the synchronous model function in a
+worker thread instead.
+"""
+
+from . import models
+from .async_db import connection, execute, fetchone, has_async_pool, run_sync
+from .events import publish
+from .metrics import metrics
+from .pricing import current_event
+
+
+async def get_promo_code(code):
+    """Get promo code details and validate it."""
+    if not has_async_pool():
+        return await run_sync(models.get_promo_code, code)
+
+    async with connection("get_promo_code") as conn:
+        return await fetchone(conn, models._PROMO_SQL, (code,), tag="get_promo_code")
+
+
+async def generate_ticket_code(conn):
+    """Generate a unique ticket code in the format MM-XXXXXX."""
+    while True:
+        ticket_code = models._random_ticket_code()
+        exists = await fetchone(
+            conn,
+            models._TICKET_CODE_EXISTS_SQL,
+            (ticket_code, ticket_code),
+            tag="generate_ticket_code",
+        )
+        if not exists:
+            return ticket_code
+
+
+async def insert_ticket(
+    email,
+    name,
+    phone,
+    price,
+    reference,
+    ticket_type="regular",
+    quantity=1,
+    total_price=None,
+    promo_code=None,
+    ticket_code=None,
+    final_price=None,
+    discount_amount=None,
+    event_id=None,
+):
+    """Insert a new ticket record; see models.insert_ticket."""
+    if not has_async_pool():
+        return await run_sync(
+            models.insert_ticket,
+            email=email,
+            name=name,
+            phone=phone,
+            price=price,
+            reference=reference,
+            ticket_type=ticket_type,
+            quantity=quantity,
+            total_price=total_price,
+            promo_code=promo_code,
+            ticket_code=ticket_code,
+            final_price=final_price,
+            discount_amount=discount_amount,
+            event_id=event_id,
+        )
+
+    if event_id is None:
+        event_id = current_event().id
+    total_price, final_price, discount_amount = models.ticket_totals(
+        price, quantity, total_price, final_price, discount_amount
+    )
+
+    async with connection("insert_ticket") as conn:
+        if ticket_code is None:
+            ticket_code = await generate_ticket_code(conn)
+
+        if final_price is None:
+            promo = None
+            if promo_code:
+                promo = await fetchone(
+                    conn, models._PROMO_SQL, (promo_code,), tag="insert_ticket"
+                )
+            final_price, discount_amount = models.promo_discount(total_price, promo)
+
+        if promo_code:
+            # Mark promo code as used
+            await execute(
+                conn, models._USE_PROMO_SQL, (promo_code,), tag="insert_ticket"
+            )
+
+        await execute(
+            conn,
+            models._TICKET_INSERT,
+            models.ticket_insert_params(
+                email,
+                name,
+                phone,
+                price,
+                reference,
+                ticket_type,
+                quantity,
+                total_price,
+                promo_code,
+                ticket_code,
+                final_price,
+                discount_amount,
+                event_id,
+            ),
+            tag="insert_ticket",
+        )
+        result = await fetchone(
+            conn, models._INSERTED_TICKET_SQL, (reference,), tag="insert_ticket"
+        )
+        for statement in models.ticket_deltas(result, "pending"):
+            await execute(conn, *statement, tag="insert_ticket")
+        await conn.commit()
+    metrics.inc("tickets_created_total", (("channel", "paystack"),))
+
+    del result["created_at"]
+    return result
+
+
+async def update_ticket_payment_status(reference, status="paid"):
+    """Update ticket payment status."""
+    if not has_async_pool():
+        return await run_sync(models.update_ticket_payment_status, reference, status)
+
+    async with connection("update_ticket_payment_status") as conn:
+        ticket = await fetchone(
+            conn,
+            models._LOCK_TICKET_SQL,
+            (reference,),
+            tag="update_ticket_payment_status",
+        )
+        affected_rows = await execute(
+            conn,
+            models._SET_PAYMENT_STATUS_SQL,
+            (status, reference, status),
+            tag="update_ticket_payment_status",
+        )
+        if affected_rows > 0:
+            for statement in models.payment_status_statements(ticket, status):
+                await execute(conn, *statement, tag="update_ticket_payment_status")
+        await conn.commit()
+    if affected_rows > 0 and status == "paid":
+        metrics.inc("tickets_paid_total", (("channel", "paystack"),))
+        publish("ticket.paid", models.paid_event(ticket, reference, "paystack"))
+    return affected_rows > 0
+
+
+async def restore_expired_ticket(reference):
+    """Rare (a payment completing after its ticket expired), so always run in a worker thread."""
+    return await run_sync(models.restore_expired_ticket, reference)
+
+
+async def get_admission_codes(ticket_codes):
+    """Only needed for a group order's email, so always run in a worker thread."""
+    return await run_sync(models.get_admission_codes, ticket_codes)
+
+
+async def check_waitlist_status(email):
+    """Check if an email exists in waitlist."""
+    if not has_async_pool():
+        return await run_sync(models.check_waitlist_status, email)
+
+    async with connection("check_waitlist_status") as conn:
+        row = await fetchone(
+            conn, models._WAITLIST_STATUS_SQL, (email,), tag="check_waitlist_status"
+        )
+    return bool(row)
+
+
+async def get_ticket_by_reference(reference):
+    """Get ticket details by reference."""
+    if not has_async_pool():
+        return await run_sync(models.get_ticket_by_reference, reference)
+
+    async with connection("get_ticket_by_reference") as conn:
+        return await fetchone(
+            conn,
+            models._TICKET_BY_REFERENCE_SQL,
+            (reference,),
+            tag="get_ticket_by_reference",
+        )
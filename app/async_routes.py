@@ -0,0 +1,229 @@
+"""
+Async variants of /buy-ticket and /verify-payment (served by asgi.py).
+
+Request validation, pricing, rate limits and response bodies are shared
+with routes.py; only the waiting is different: Paystack and Resend are called with httpx and
+the database through async_models, so an in-flight checkout costs a
+coroutine rather than a worker thread.
+"""
+
+import asyncio
+import os
+
+from quart import Blueprint, current_app, jsonify, request
+
+from . import async_models, pricing
+from .email import build_ticket_confirmation_email
+from .routes import (
+    PAYSTACK_BASE_URL,
+    PAYSTACK_SECRET_KEY,
+    limit_buy_ticket,
+    limit_verify_payment,
+    paystack_initialize_request,
+    purchase_response,
+    ticket_email_data,
+    validate_purchase,
+)
+from .tracing import span
+
+bp = Blueprint("async_routes", __name__)
+
+RESEND_API_URL = os.getenv("RESEND_API_URL", "https://api.resend.com")
+
+
+def http_client():
+    return current_app.extensions["http_client"]
+
+
+async def quote_order(ticket_type, quantity, promo_code=None):
+    """Price an order, validating the promo code if one was given."""
+    promo = None
+    if promo_code:
+        promo = await async_models.get_promo_code(promo_code)
+        pricing.check_promo(promo)
+    return pricing.quote(ticket_type, quantity, promo)
+
+
+async def send_ticket_confirmation_email(ticket_data):
+    """Async counterpart of email.send_ticket_confirmation_email."""
+    try:
+        params = build_ticket_confirmation_email(
+            ticket_data, current_app.config["RESEND_VERIFIED_DOMAIN"]
+        )
+        with span("resend.send"):
+            response = await http_client().post(
+                f"{RESEND_API_URL}/emails",
+                headers={
+                    "Authorization": f"Bearer {current_app.config['RESEND_API_KEY']}"
+                },
+                json=params,
+            )
+            response.raise_for_status()
+        current_app.logger.info(
+            f"Confirmation email sent to {ticket_data['email']} for ticket {ticket_data['ticket_code']}"
+        )
+        return True
+    except Exception as e:
+        current_app.logger.error(f"Error sending ticket confirmation email: {str(e)}")
+        return False
+
+
+@bp.route("/buy-ticket", methods=["POST"])
+@limit_buy_ticket
+async def buy_ticket():
+    if not request.is_json:
+        return jsonify({"success": False, "error": "JSON body required"}), 400
+
+    purchase, error = validate_purchase(await request.get_json())
+    if error:
+        return jsonify({"success": False, "error": error}), 400
+
+    # Independent of pricing and Paystack, so it runs alongside them
+    waitlisted = asyncio.ensure_future(
+        async_models.check_waitlist_status(purchase["email"])
+    )
+
+    try:
+        order = await quote_order(
+            purchase["ticket_type"], purchase["quantity"], purchase["promo_code"]
+        )
+    except pricing.PricingError as e:
+        waitlisted.cancel()
+        return jsonify({"success": False, "error": str(e)}), 400
+
+    headers, payload = paystack_initialize_request(purchase, order["final_price"])
+
+    try:
+        with span("paystack.initialize"):
+            response = await http_client().post(
+                f"{PAYSTACK_BASE_URL}/transaction/initialize",
+                headers=headers,
+                json=payload,
+            )
+            paystack_data = response.json()
+
+        if not paystack_data.get("status"):
+            waitlisted.cancel()
+            return (
+                jsonify({"success": False, "error": "Failed to initialize payment"}),
+                400,
+            )
+
+        ticket_info = await async_models.insert_ticket(
+            email=purchase["email"],
+            name=purchase["name"],
+            phone=purchase["phone"],
+            price=order["price"],
+            total_price=order["total_price"],
+            quantity=purchase["quantity"],
+            ticket_type=purchase["ticket_type"],
+            reference=paystack_data["data"]["reference"],
+            promo_code=purchase["promo_code"],
+            final_price=order["final_price"],
+            discount_amount=order["discount_amount"],
+        )
+
+        return jsonify(
+            purchase_response(
+                purchase, order, paystack_data, ticket_info, await waitlisted
+            )
+        )
+
+    except Exception:
+        waitlisted.cancel()
+        current_app.logger.exception("Error processing ticket purchase")
+        return (
+            jsonify(
+                {"success": False, "error": "Server error processing ticket purchase"}
+            ),
+            500,
+        )
+
+
+@bp.route("/verify-payment", methods=["GET", "OPTIONS"])
+@limit_verify_payment
+async def verify_payment():
+    if request.method == "OPTIONS":
+        return jsonify({"success": True}), 200
+
+    reference = request.args.get("reference")
+    if not reference:
+        return (
+            jsonify({"success": False, "error": "Payment reference is required"}),
+            400,
+        )
+
+    try:
+        with span("paystack.verify"):
+            response = await http_client().get(
+                f"{PAYSTACK_BASE_URL}/transaction/verify/{reference}",
+                headers={"Authorization": f"Bearer {PAYSTACK_SECRET_KEY}"},
+            )
+            result = response.json()
+
+        if result.get("data", {}).get("status") != "success":
+            return (
+                jsonify({"success": False, "error": "Payment verification failed"}),
+                400,
+            )
+
+        ticket = await async_models.get_ticket_by_reference(reference)
+        if not ticket and await async_models.restore_expired_ticket(reference):
+            # Paid after the sweeper expired the abandoned checkout
+            current_app.logger.warning(f"Restored expired ticket {reference}")
+            ticket = await async_models.get_ticket_by_reference(reference)
+        if not ticket:
+            return (
+                jsonify(
+                    {"success": False, "error": "Ticket not found for this reference"}
+                ),
+                404,
+            )
+
+        # Update ticket status (and email) only if it's still pending
+        email_sent = False
+        if ticket.get("payment_status") == "pending":
+            if not await async_models.update_ticket_payment_status(reference):
+                return (
+                    jsonify(
+                        {"success": False, "error": "Failed to update ticket status"}
+                    ),
+                    500,
+                )
+            ticket = await async_models.get_ticket_by_reference(reference)
+            admission_codes = []
+            if ticket["quantity"] > 1:
+                admission_codes = await async_models.get_admission_codes(
+                    [ticket["ticket_code"]]
+                )
+                admission_codes = admission_codes.get(ticket["ticket_code"], [])
+            email_sent = await send_ticket_confirmation_email(
+                ticket_email_data(ticket, admission_codes)
+            )
+        else:
+            current_app.logger.info(
+                f"Ticket already in status: {ticket.get('payment_status')}"
+            )
+            email_sent = True  # Assume email was already sent
+
+        return jsonify(
+            {
+                "success": True,
+                "message": (
+                    "Payment verified and confirmation email sent"
+                    if email_sent
+                    else "Payment verified but email sending failed"
+                ),
+                "status": "verified",
+                "ticket_code": ticket["ticket_code"],
+                "payment_status": ticket.get("payment_status", "unknown"),
+                "email_sent": email_sent,
+            }
+        )
+
+    except Exception:
+        current_app.logger.exception("Error verifying payment")
+        return (
+            jsonify({"success": False, "error": "Server error verifying payment"}),
+            500,
+        )
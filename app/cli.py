@@ -0,0 +1,154 @@
+"""
+Flask CLI commands (run with `flask --app run <command>`).
+
+`flask events archive <code>` moves a finished event's tickets and manual
+payments to tickets_archive / manual_payments_archive, a batch at a time,
+so the hot tables (and their unique indexes) only hold the events still on
+sale or still to be checked in.
+
+`flask comps issue <csv> --list <name>` issues guest list tickets (see
+comps.py) and sends their confirmation emails before exiting.
+"""
+
+import datetime
+
+import click
+from flask.cli import AppGroup
+
+from . import comps, pricing
+from .email import send_ticket_confirmation_emails
+from .models import (
+    archive_event_rows,
+    create_event,
+    get_event_by_code,
+    get_events,
+    mark_event_archived,
+    recount_sales_rollup,
+    recount_ticket_stats,
+    set_current_event,
+)
+
+events_cli = AppGroup("events", help="Manage events and archive finished ones.")
+
+
+@events_cli.command("list")
+@click.option("--all", "include_archived", is_flag=True, help="Include archived events.")
+def list_events(include_archived):
+    """List events."""
+    for event in get_events(include_archived):
+        flags = []
+        if event["is_current"]:
+            flags.append("current")
+        if event["archived_at"]:
+            flags.append(f"archived {event['archived_at']:%Y-%m-%d}")
+        click.echo(
+            f"{event['id']:>4}  {event['code']:<24} {event['starts_at']:%Y-%m-%d %H:%M}  "
+            f"{event['title']}" + (f"  [{', '.join(flags)}]" if flags else "")
+        )
+
+
+@events_cli.command("add")
+@click.argument("code")
+@click.option("--title", required=True)
+@click.option(
+    "--date", "starts_at", required=True, help="ISO date or datetime, e.g. 2026-10-31T21:00"
+)
+@click.option("--venue")
+@click.option("--current", is_flag=True, help="Sell new tickets for this event.")
+def add_event(code, title, starts_at, venue, current):
+    """Create an event."""
+    try:
+        starts_at = datetime.datetime.fromisoformat(starts_at)
+        create_event(code, title, starts_at, venue)
+    except ValueError as e:
+        raise click.ClickException(str(e))
+    if current:
+        set_current_event(code)
+    pricing.reload_pricing()
+    click.echo(f"Created event {code}" + (" (current)" if current else ""))
+
+
+@events_cli.command("set-current")
+@click.argument("code")
+def set_current(code):
+    """Sell new tickets for event CODE."""
+    if not set_current_event(code):
+        raise click.ClickException(f"No live event '{code}'")
+    pricing.reload_pricing()
+    click.echo(f"Current event is now {code}")
+
+
+@events_cli.command("archive")
+@click.argument("code")
+@click.option(
+    "--batch-size", default=500, show_default=True, help="Rows moved per transaction."
+)
+@click.option("--force", is_flag=True, help="Archive even if the event hasn't started yet.")
+def archive_event(code, batch_size, force):
+    """Move event CODE's tickets and manual payments to the archive tables."""
+    event = get_event_by_code(code)
+    if event is None:
+        raise click.ClickException(f"No event '{code}'")
+    if event["archived_at"]:
+        raise click.ClickException(f"Event '{code}' is already archived")
+    if event["is_current"]:
+        raise click.ClickException(
+            f"Event '{code}' is the current event; set-current another event first"
+        )
+    if event["starts_at"] > datetime.datetime.utcnow() and not force:
+        raise click.ClickException(f"Event '{code}' hasn't happened yet (use --force)")
+
+    for table in ("tickets", "manual_payments"):
+        total = 0
+        while True:
+            moved = archive_event_rows(table, event["id"], batch_size)
+            total += moved
+            if moved < batch_size:
+                break
+        click.echo(f"Archived {total} {table} rows")
+
+    mark_event_archived(event["id"])
+    pricing.reload_pricing()
+    # The stats counters only cover the hot tables
+    recount_ticket_stats()
+    recount_sales_rollup()
+    click.echo(f"Event {code} archived")
+
+
+comps_cli = AppGroup("comps", help="Issue comp (guest list) tickets.")
+
+
+@comps_cli.command("issue")
+@click.argument("guest_list", type=click.File("r", encoding="utf-8-sig"))
+@click.option(
+    "--list", "list_name", required=True, help="Guest list name, e.g. artist-guests."
+)
+@click.option("--ticket-type", default=comps.COMP_TICKET_TYPE, show_default=True)
+@click.option("--dry-run", is_flag=True, help="Only validate the guest list.")
+@click.option("--no-email", is_flag=True, help="Don't send confirmation emails.")
+def issue_comps(guest_list, list_name, ticket_type, dry_run, no_email):
+    """Issue a paid, zero-price ticket to every guest in GUEST_LIST (CSV)."""
+    from .routes import tickets_email_data
+
+    try:
+        result = comps.issue_guest_list(
+            guest_list.read(), list_name, ticket_type=ticket_type, dry_run=dry_run
+        )
+    except comps.GuestListError as e:
+        raise click.ClickException(str(e))
+
+    for error in result["errors"]:
+        click.echo(f"line {error['line']}: {error['error']} ({error['email']})", err=True)
+    if dry_run:
+        click.echo(f"{len(result['guests'])} valid guests, {len(result['errors'])} errors")
+        return
+
+    tickets = result["tickets"]
+    click.echo(
+        f"Issued {len(tickets)} tickets for list {result['list_name']} "
+        f"({len(result['already_issued'])} guests already had one)"
+    )
+    if tickets and not no_email:
+        # Sent here rather than queued: the queue's thread dies with this process
+        sent = send_ticket_confirmation_emails(tickets_email_data(tickets))
+        click.echo(f"Sent {sent} confirmation emails")
@@ -0,0 +1,144 @@
+"""
+Comp (guest list) tickets.
+
+parse_guest_list() reads a CSV of guests, finding the name and email
+columns by header (phone, ticket_type and quantity are optional), and
+reports bad lines instead of failing the whole list. The guests are then
+issued free, already-paid tickets in one transaction by
+models.issue_comp_tickets, from POST /admin/comps or `flask comps issue`.
+
+Each list has a name (e.g. artist-guests, sponsor-acme) and a guest gets
+at most one ticket per list, so re-running an import only issues tickets
+to the guests added since.
+"""
+
+import csv
+import io
+import re
+
+from . import pricing
+from .models import issue_comp_tickets
+from .momo_import import find_column
+
+COMP_TICKET_TYPE = "comp"
+MAX_GUEST_QUANTITY = 10
+
+NAME_HEADERS = ("name", "full name", "guest name", "guest")
+EMAIL_HEADERS = ("email", "email address", "e-mail")
+PHONE_HEADERS = ("phone", "phone number", "mobile")
+TYPE_HEADERS = ("ticket_type", "ticket type", "type")
+QUANTITY_HEADERS = ("quantity", "qty", "tickets")
+
+_EMAIL = re.compile(r"^[^@\s]+@[^@\s]+\.[^@\s]+$")
+_LIST_NAME = re.compile(r"^[a-z0-9][a-z0-9_-]{0,49}$")
+
+
+class GuestListError(ValueError):
+    """Raised when a guest list can't be read."""
+
+
+def normalize_list_name(list_name):
+    name = (list_name or "").strip().lower()
+    if not _LIST_NAME.match(name):
+        raise GuestListError(
+            "list_name must be 1-50 letters, digits, '-' or '_' (e.g. artist-guests)"
+        )
+    return name
+
+
+def is_valid_ticket_type(code):
+    return code == COMP_TICKET_TYPE or pricing.get_ticket_type(code) is not None
+
+
+def parse_guest_list(text, default_ticket_type=COMP_TICKET_TYPE):
+    """
+    Returns (guests, errors): guests as dicts with line, name, email, phone,
+    ticket_type and quantity; errors as dicts with line and error.
+    """
+    reader = csv.DictReader(io.StringIO(text.lstrip("\ufeff")))
+    if not reader.fieldnames:
+        raise GuestListError("Guest list is empty")
+
+    headers = reader.fieldnames
+    email = find_column(headers, EMAIL_HEADERS)
+    name = find_column(headers, NAME_HEADERS)
+    first = find_column(headers, ("first name",))
+    last = find_column(headers, ("last name", "surname"))
+    if first is not None and name in (first, last):
+        # Split name columns, found by the partial match on "name"
+        name = None
+    if email is None or (name is None and first is None):
+        raise GuestListError("Guest list needs name and email columns")
+    phone = find_column(headers, PHONE_HEADERS)
+    ticket_type = find_column(headers, TYPE_HEADERS)
+    quantity = find_column(headers, QUANTITY_HEADERS)
+
+    guests = []
+    errors = []
+    seen = set()
+    # Line 1 is the header
+    for number, row in enumerate(reader, start=2):
+        values = {h: (row.get(h) or "").strip() for h in headers if h}
+        if not any(values.values()):
+            continue  # blank line
+        if name is not None:
+            guest_name = values[name]
+        else:
+            guest_name = " ".join(values[c] for c in (first, last) if c).strip()
+        guest = {
+            "line": number,
+            "name": guest_name,
+            "email": values[email],
+            "phone": (values[phone] or None) if phone else None,
+            "ticket_type": (values[ticket_type].lower() if ticket_type else "")
+            or default_ticket_type,
+        }
+        try:
+            guest["quantity"] = int(values[quantity] or 1) if quantity else 1
+        except ValueError:
+            guest["quantity"] = 0
+
+        error = None
+        if not guest["name"]:
+            error = "Name is required"
+        elif not _EMAIL.match(guest["email"]):
+            error = "Invalid email"
+        elif guest["email"].lower() in seen:
+            error = "Duplicate email"
+        elif not is_valid_ticket_type(guest["ticket_type"]):
+            error = f"Unknown ticket type '{guest['ticket_type']}'"
+        elif not 1 <= guest["quantity"] <= MAX_GUEST_QUANTITY:
+            error = f"Quantity must be between 1 and {MAX_GUEST_QUANTITY}"
+        if error:
+            errors.append({"line": number, "email": guest["email"], "error": error})
+            continue
+        seen.add(guest["email"].lower())
+        guests.append(guest)
+    return guests, errors
+
+
+def issue_guest_list(
+    text, list_name, ticket_type=COMP_TICKET_TYPE, dry_run=False, max_rows=None
+):
+    """
+    Parse a guest list and issue its tickets. Returns a dict with the
+    issued tickets, already_issued (emails with a ticket from this list)
+    and errors (lines skipped); nothing is issued on a dry run.
+    """
+    list_name = normalize_list_name(list_name)
+    if not is_valid_ticket_type(ticket_type):
+        raise GuestListError(f"Unknown ticket type '{ticket_type}'")
+    guests, errors = parse_guest_list(text, ticket_type)
+    if max_rows and len(guests) + len(errors) > max_rows:
+        raise GuestListError(f"Guest lists are limited to {max_rows} rows")
+
+    tickets, already_issued = [], []
+    if guests and not dry_run:
+        tickets, already_issued = issue_comp_tickets(guests, list_name)
+    return {
+        "list_name": list_name,
+        "guests": guests,
+        "tickets": tickets,
+        "already_issued": already_issued,
+        "errors": errors,
+    }
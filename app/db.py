@@ -0,0 +1,284 @@
+"""
+Database connections.
+
+The storage backend is MySQL (see mysql_backend.py) or, with
+DB_BACKEND=sqlite, an embedded SQLite database (see sqlite_backend.py).
+Nothing connects at import or create_app() time: connections (and
+mysql.connector itself) are opened on the first get_conn(), which then runs
+any on_first_connect() hooks once. get_conn() hands out pooled connections
+wrapped so every statement is timed and tagged with the model function that
+opened the connection.
+Statements slower than SLOW_QUERY_MS are written to the `app.slow_query`
+logger with literals and parameters redacted.
+
+With MYSQL_REPLICA_HOST set, model functions marked @read_only get their
+connections from a separate read-only pool on the replica, so admin
+listings don't compete with checkout for primary connections.
+"""
+
+import inspect
+import logging
+import re
+import sys
+import threading
+import time
+
+from flask import current_app
+
+from .metrics import metrics
+from .tracing import record_span
+
+slow_query_log = logging.getLogger("app.slow_query")
+
+metrics.describe(
+    "db_query_duration_seconds", "histogram", "Statement latency by model function"
+)
+metrics.describe("db_query_rows_total", "counter", "Rows returned or affected")
+
+_LITERALS = re.compile(r"'(?:[^'\\]|\\.)*'|\b\d+(?:\.\d+)?\b")
+_WHITESPACE = re.compile(r"\s+")
+
+
+def redact_sql(sql):
+    """Collapse whitespace and replace inline literals with '?'."""
+    return _LITERALS.sub("?", _WHITESPACE.sub(" ", sql).strip())
+
+
+class InstrumentedCursor:
+    """Cursor proxy that times execute()/executemany()."""
+
+    def __init__(self, cursor, tag):
+        self._cursor = cursor
+        self._tag = tag
+
+    def __getattr__(self, name):
+        return getattr(self._cursor, name)
+
+    def __iter__(self):
+        return iter(self._cursor)
+
+    def _record(self, sql, start, params_count):
+        elapsed = time.perf_counter() - start
+        statement = sql.lstrip().split(None, 1)[0].upper() if sql.strip() else "?"
+        rows = max(self._cursor.rowcount, 0)
+
+        labels = (("function", self._tag), ("statement", statement))
+        metrics.observe("db_query_duration_seconds", elapsed, labels)
+        metrics.inc("db_query_rows_total", (("function", self._tag),), rows)
+        record_span(f"db.{self._tag}", elapsed)
+
+        threshold = current_app.config.get("SLOW_QUERY_MS", 200)
+        if threshold is not None and elapsed * 1000 >= threshold:
+            slow_query_log.warning(
+                "slow query function=%s duration_ms=%.1f rows=%d params=%d sql=%s",
+                self._tag,
+                elapsed * 1000,
+                rows,
+                params_count,
+                redact_sql(sql),
+            )
+
+    def execute(self, sql, params=None):
+        start = time.perf_counter()
+        try:
+            return self._cursor.execute(sql, params)
+        finally:
+            self._record(sql, start, len(params) if params else 0)
+
+    def executemany(self, sql, seq_params):
+        seq_params = list(seq_params)
+        start = time.perf_counter()
+        try:
+            return self._cursor.executemany(sql, seq_params)
+        finally:
+            self._record(sql, start, sum(len(p) for p in seq_params))
+
+
+class InstrumentedConnection:
+    """Pooled connection proxy whose cursors are instrumented."""
+
+    def __init__(self, conn, tag):
+        self._conn = conn
+        self._tag = tag
+
+    def __getattr__(self, name):
+        return getattr(self._conn, name)
+
+    def cursor(self, *args, **kwargs):
+        # Buffer results so rowcount and timings cover the whole result set
+        kwargs.setdefault("buffered", True)
+        return InstrumentedCursor(self._conn.cursor(*args, **kwargs), self._tag)
+
+    def close(self):
+        # Returns the connection to the pool
+        self._conn.close()
+
+
+_first_connect_hooks = []
+
+
+def on_first_connect(fn):
+    """Register fn() to run once, inside the app context, on first DB use."""
+    _first_connect_hooks.append(fn)
+    return fn
+
+
+# Code objects of @read_only functions: get_conn() matches its caller's
+# frame against them, so renaming or wrapping a function can't reroute it
+_read_only_code = set()
+
+
+def read_only(fn):
+    """
+    Send fn's get_conn() calls to the read replica, when one is configured.
+
+    Only for reads that can tolerate replication lag (admin listings,
+    reports); anything that reads back its own writes must stay on the
+    primary.
+    """
+    _read_only_code.add(inspect.unwrap(fn).__code__)
+    return fn
+
+
+def _mysql_backend(app, host, user, password, pool_size, **connect_args):
+    from .mysql_backend import MySQLBackend
+
+    dbconfig = {
+        "host": host,
+        "user": user,
+        "password": password,
+        "database": app.config.get("MYSQL_DB"),
+        "charset": "utf8mb4",
+        "connection_timeout": app.config.get("DB_CONNECT_TIMEOUT", 5),
+        "use_pure": app.config.get("DB_USE_PURE", False),
+    }
+    dbconfig.update(connect_args)
+    return MySQLBackend(
+        dbconfig,
+        pool_size=pool_size,
+        checkout_timeout=app.config.get("DB_CHECKOUT_TIMEOUT", 10),
+        ping_after_seconds=app.config.get("DB_PING_AFTER_SECONDS", 30),
+        single_connection=app.config.get("DB_SINGLE_CONNECTION", False),
+    )
+
+
+def init_db(app):
+    # Describe the storage backend; connections are opened lazily
+    app.extensions = getattr(app, "extensions", {})
+    if app.config.get("DB_BACKEND", "mysql") == "sqlite":
+        from .sqlite_backend import SQLiteBackend
+
+        backend = SQLiteBackend(
+            app.config.get("SQLITE_PATH"),
+            pool_size=app.config.get("DB_POOL_SIZE", 5),
+        )
+    else:
+        backend = _mysql_backend(
+            app,
+            app.config.get("MYSQL_HOST"),
+            app.config.get("MYSQL_USER"),
+            app.config.get("MYSQL_PASSWORD"),
+            app.config.get("DB_POOL_SIZE", 5),
+        )
+
+        # Optional read replica for @read_only model functions
+        if app.config.get("MYSQL_REPLICA_HOST"):
+            replica = _mysql_backend(
+                app,
+                app.config.get("MYSQL_REPLICA_HOST"),
+                app.config.get("MYSQL_REPLICA_USER") or app.config.get("MYSQL_USER"),
+                app.config.get("MYSQL_REPLICA_PASSWORD")
+                or app.config.get("MYSQL_PASSWORD"),
+                app.config.get("DB_REPLICA_POOL_SIZE", 3),
+                # Guard against a read-only function ever writing
+                init_command="SET SESSION TRANSACTION READ ONLY",
+            )
+            replica.down_until = 0
+            app.extensions["db_replica_pool"] = replica
+
+    backend.ready = False
+    backend.running_hooks = False
+    backend.ready_lock = threading.RLock()
+    app.extensions["db_pool"] = backend
+
+
+def _run_first_connect_hooks(backend):
+    # Other threads wait here until the hooks have finished; the hooks' own
+    # get_conn() calls re-enter on the same thread and skip straight through
+    with backend.ready_lock:
+        if backend.ready or backend.running_hooks:
+            return
+        backend.running_hooks = True
+        try:
+            for hook in _first_connect_hooks:
+                hook()
+            backend.ready = True
+        except Exception as e:
+            # Leave ready unset so the next get_conn() retries
+            current_app.logger.warning(f"Database setup failed: {e}")
+        finally:
+            backend.running_hooks = False
+
+
+def get_backend():
+    backend = current_app.extensions.get("db_pool")
+    if backend is None:
+        raise RuntimeError("DB pool is not initialized")
+    return backend
+
+
+def is_duplicate_error(error):
+    """True if `error` is a unique-key violation on the active backend."""
+    return get_backend().is_duplicate_error(error)
+
+
+def _checkout(pool, tag):
+    start = time.perf_counter()
+    conn = pool.get_connection()
+    elapsed = time.perf_counter() - start
+    metrics.observe("db_pool_checkout_seconds", elapsed, (("function", tag),))
+    record_span("db.checkout", elapsed)
+    return InstrumentedConnection(conn, tag)
+
+
+def _replica_conn(tag):
+    replica = current_app.extensions.get("db_replica_pool")
+    if replica is None or time.monotonic() < replica.down_until:
+        return None
+    try:
+        return _checkout(replica, tag)
+    except Exception as e:
+        if replica.is_connection_error(e):
+            # Serve from the primary for a while rather than paying the
+            # connect timeout on every admin read
+            replica.down_until = time.monotonic() + current_app.config.get(
+                "DB_REPLICA_RETRY_SECONDS", 30
+            )
+            current_app.logger.warning(
+                f"Read replica unavailable, using primary: {e}"
+            )
+        else:
+            # Busy pool: the replica is fine, only this read moves
+            current_app.logger.warning(f"Read replica busy, using primary: {e}")
+        return None
+
+
+def get_conn(tag=None, replica=None):
+    """
+    Check out a pooled connection, tagged with the calling function.
+    `replica` overrides whether the caller is @read_only.
+    """
+    pool = get_backend()
+    caller = sys._getframe(1).f_code
+    if tag is None:
+        tag = caller.co_name
+    if not pool.ready:
+        _run_first_connect_hooks(pool)
+
+    if replica is None:
+        replica = caller in _read_only_code
+    if replica:
+        conn = _replica_conn(tag)
+        if conn is not None:
+            return conn
+    return _checkout(pool, tag)
@@ -1,47 +1,70 @@
-import resend
-from flask import current_app
-
-
-def send_ticket_confirmation_email(ticket_data):
-    """
-    Send confirmation email after successful ticket payment
-    Supports both light and dark mode with Gmail fallback
-    """
-    try:
-        resend.api_key = current_app.config["RESEND_API_KEY"]
-        verified_domain = current_app.config["RESEND_VERIFIED_DOMAIN"]
+import queue
+import threading
 
-        user_email = ticket_data["email"]
-        user_name = ticket_data.get("name", "Guest")
-        ticket_code = ticket_data["ticket_code"]
-        price = ticket_data["price"]
-        total_price = ticket_data.get("total_price", price)
-        quantity = ticket_data.get("quantity", 1)
-        ticket_type = (
-            ticket_data.get("ticket_type", "regular").replace("_", " ").title()
-        )
-        event_title = ticket_data.get("event_title", "MIDNIGHT MADNESS III")
-        event_date = ticket_data.get("event_date", "October 31, 2025")
-        event_venue = ticket_data.get("event_venue", "13 Mankata Ave, Accra")
-
-        # Static map image (no iframe, works in all email clients)
-        # You can replace the `key=` part with your actual Google Maps Static API key
-        map_image_url = (
-            "https://maps.googleapis.com/maps/api/staticmap?"
-            "center=13+Mankata+Ave,Accra,Ghana"
-            "&zoom=15"
-            "&size=600x300"
-            "&maptype=roadmap"
-            "&markers=color:green%7C13+Mankata+Ave,Accra,Ghana"
-            "&key=YOUR_GOOGLE_MAPS_API_KEY"
-        )
+from flask import current_app
 
-        # Clickable link to open in Google Maps
-        maps_link = (
-            "https://goo.gl/maps/2JkB5W7bi7hP99GQ9"  # (short link for 13 Mankata Ave)
+from .metrics import metrics
+from .tracing import span
+
+metrics.describe("emails_queued_total", "counter", "Confirmation emails queued")
+metrics.describe("emails_sent_total", "counter", "Confirmation emails sent by method")
+metrics.describe("email_queue_depth", "gauge", "Confirmation emails waiting to be sent")
+
+# Most emails Resend accepts in one batch call
+RESEND_BATCH_LIMIT = 100
+
+_email_queue = queue.Queue()
+_email_worker = None
+_email_worker_lock = threading.Lock()
+
+
+def build_ticket_confirmation_email(ticket_data, verified_domain):
+    """Resend params (from, to, subject, html) for a ticket confirmation."""
+    user_email = ticket_data["email"]
+    user_name = ticket_data.get("name", "Guest")
+    ticket_code = ticket_data["ticket_code"]
+    price = ticket_data["price"]
+    total_price = ticket_data.get("total_price", price)
+    quantity = ticket_data.get("quantity", 1)
+    ticket_type = (
+        ticket_data.get("ticket_type", "regular").replace("_", " ").title()
+    )
+    # From the ticket's event (see routes.ticket_email_data)
+    event_title = ticket_data["event_title"]
+    event_date = ticket_data["event_date"]
+    event_venue = ticket_data["event_venue"]
+    # One code per attendee, so a group can arrive separately
+    admission_codes = ticket_data.get("admission_codes") or []
+    admissions_html = ""
+    if quantity > 1 and admission_codes:
+        admissions_html = (
+            '<h3 style="color:#00ff66;font-size:15px;text-transform:uppercase;letter-spacing:1px;margin-top:20px;">Guest Codes</h3>\n'
+            '        <p style="font-size:13px;color:#bbb;">Each guest enters with their own code.</p>\n'
+            + "\n".join(
+                f'        <p style="font-size:14px;color:#e0e0e0;margin:6px 0;">Guest {n}: '
+                f'<code style="color:#00ff66;font-family:\'Consolas\',monospace;">{code}</code></p>'
+                for n, code in enumerate(admission_codes, start=1)
+            )
         )
 
-        html_content = f"""
+    # Static map image (no iframe, works in all email clients)
+    # You can replace the `key=` part with your actual Google Maps Static API key
+    map_image_url = (
+        "https://maps.googleapis.com/maps/api/staticmap?"
+        "center=13+Mankata+Ave,Accra,Ghana"
+        "&zoom=15"
+        "&size=600x300"
+        "&maptype=roadmap"
+        "&markers=color:green%7C13+Mankata+Ave,Accra,Ghana"
+        "&key=YOUR_GOOGLE_MAPS_API_KEY"
+    )
+
+    # Clickable link to open in Google Maps
+    maps_link = (
+        "https://goo.gl/maps/2JkB5W7bi7hP99GQ9"  # (short link for 13 Mankata Ave)
+    )
+
+    html_content = f"""
 <!DOCTYPE html>
 <html lang="en">
 <head>
@@ -53,72 +76,88 @@ def send_ticket_confirmation_email(ticket_data):
   <table align="center" width="100%" cellpadding="0" cellspacing="0" role="presentation">
     <tr>
       <td>
-        <div style="max-width:600px;margin:0 auto;padding:40px 20px;text-align:center;">
-          <h1 style="color:#00ff66;font-size:24px;font-weight:900;letter-spacing:2px;">ACCESS GRANTED</h1>
-          <p style="font-size:13px;letter-spacing:1px;color:#8a8a8a;">TRANSMISSION: FILE 003</p>
-        </div>
-
-        <div style="max-width:600px;margin:0 auto;padding:0 20px;">
-          <div style="background-color:#121212;border-radius:8px;padding:30px;border:1px solid #1a1a1a;">
-            <h2 style="color:#00ff66;font-size:18px;text-transform:uppercase;letter-spacing:1px;margin-top:0;">{event_title}</h2>
-            <p style="font-size:14px;margin-top:10px;color:#bbb;">{event_date} — {event_venue}</p>
-            <hr style="border:none;border-top:1px solid #2b2b2b;margin:20px 0;" />
-
-            <h3 style="color:#00ff66;font-size:15px;text-transform:uppercase;letter-spacing:1px;">Ticket Details</h3>
-            <p style="font-size:14px;color:#e0e0e0;">Name: <span style="color:#00ff66;">{user_name}</span></p>
-            <p style="font-size:14px;color:#e0e0e0;">Ticket Type: <span style="color:#00ff66;">{ticket_type}</span></p>
-            <p style="font-size:14px;color:#e0e0e0;">Quantity: <span style="color:#00ff66;">{quantity}</span></p>
-
-            <h3 style="color:#00ff66;font-size:15px;text-transform:uppercase;letter-spacing:1px;margin-top:20px;">Ticket Code</h3>
-            <div style="margin:16px 0;border:1px solid #00ff66;background-color:#000;padding:12px;border-radius:6px;text-align:center;">
-              <code style="color:#00ff66;font-size:20px;font-weight:bold;font-family:'Consolas',monospace;">{ticket_code}</code>
-            </div>
-
-            <p style="font-size:14px;color:#e0e0e0;">Amount Paid: <span style="color:#00ff66;">GHS {total_price}</span></p>
-
-            <hr style="border:none;border-top:1px solid #2b2b2b;margin:30px 0;" />
-
-            <h3 style="color:#00ff66;font-size:15px;text-transform:uppercase;letter-spacing:1px;">Location</h3>
-            <p style="font-size:14px;color:#bbb;">13 Mankata Ave, Accra</p>
-            <a href="{maps_link}" target="_blank" style="display:inline-block;text-decoration:none;">
-              <img src="{map_image_url}" alt="Event Location Map" width="100%" style="border-radius:8px;border:2px solid #00ff66;display:block;margin-top:10px;" />
-            </a>
-
-            <p style="margin-top:10px;font-size:12px;color:#888;">
-              Click the map to open directions in Google Maps.
-            </p>
-
-            <p style="margin-top:24px;font-size:12px;color:#888;">
-              Keep this code safe. It will be required for entry verification at the gate.
-            </p>
-          </div>
-        </div>
-
-        <div style="max-width:600px;margin:0 auto;text-align:center;padding:30px 20px;">
-          <p style="font-size:12px;color:#777;">
-            This transmission was issued by <span style="color:#00ff66;">808 DTP</span>.<br>
-            For operational inquiries, contact <a href="mailto:ops@808dtp.com" style="color:#00ff66;text-decoration:none;">ops@808dtp.com</a>
-          </p>
-          <p style="font-size:11px;color:#555;margin-top:10px;">© 2025 808 DTP. All Rights Reserved.</p>
+    <div style="max-width:600px;margin:0 auto;padding:40px 20px;text-align:center;">
+      <h1 style="color:#00ff66;font-size:24px;font-weight:900;letter-spacing:2px;">ACCESS GRANTED</h1>
+      <p style="font-size:13px;letter-spacing:1px;color:#8a8a8a;">TRANSMISSION: FILE 003</p>
+    </div>
+
+    <div style="max-width:600px;margin:0 auto;padding:0 20px;">
+      <div style="background-color:#121212;border-radius:8px;padding:30px;border:1px solid #1a1a1a;">
+        <h2 style="color:#00ff66;font-size:18px;text-transform:uppercase;letter-spacing:1px;margin-top:0;">{event_title}</h2>
+        <p style="font-size:14px;margin-top:10px;color:#bbb;">{event_date} — {event_venue}</p>
+        <hr style="border:none;border-top:1px solid #2b2b2b;margin:20px 0;" />
+
+        <h3 style="color:#00ff66;font-size:15px;text-transform:uppercase;letter-spacing:1px;">Ticket Details</h3>
+        <p style="font-size:14px;color:#e0e0e0;">Name: <span style="color:#00ff66;">{user_name}</span></p>
+        <p style="font-size:14px;color:#e0e0e0;">Ticket Type: <span style="color:#00ff66;">{ticket_type}</span></p>
+        <p style="font-size:14px;color:#e0e0e0;">Quantity: <span style="color:#00ff66;">{quantity}</span></p>
+
+        <h3 style="color:#00ff66;font-size:15px;text-transform:uppercase;letter-spacing:1px;margin-top:20px;">Ticket Code</h3>
+        <div style="margin:16px 0;border:1px solid #00ff66;background-color:#000;padding:12px;border-radius:6px;text-align:center;">
+          <code style="color:#00ff66;font-size:20px;font-weight:bold;font-family:'Consolas',monospace;">{ticket_code}</code>
         </div>
+        {admissions_html}
+
+        <p style="font-size:14px;color:#e0e0e0;">Amount Paid: <span style="color:#00ff66;">GHS {total_price}</span></p>
+
+        <hr style="border:none;border-top:1px solid #2b2b2b;margin:30px 0;" />
+
+        <h3 style="color:#00ff66;font-size:15px;text-transform:uppercase;letter-spacing:1px;">Location</h3>
+        <p style="font-size:14px;color:#bbb;">13 Mankata Ave, Accra</p>
+        <a href="{maps_link}" target="_blank" style="display:inline-block;text-decoration:none;">
+          <img src="{map_image_url}" alt="Event Location Map" width="100%" style="border-radius:8px;border:2px solid #00ff66;display:block;margin-top:10px;" />
+        </a>
+
+        <p style="margin-top:10px;font-size:12px;color:#888;">
+          Click the map to open directions in Google Maps.
+        </p>
+
+        <p style="margin-top:24px;font-size:12px;color:#888;">
+          Keep this code safe. It will be required for entry verification at the gate.
+        </p>
+      </div>
+    </div>
+
+    <div style="max-width:600px;margin:0 auto;text-align:center;padding:30px 20px;">
+      <p style="font-size:12px;color:#777;">
+        This transmission was issued by <span style="color:#00ff66;">808 DTP</span>.<br>
+        For operational inquiries, contact <a href="mailto:ops@808dtp.com" style="color:#00ff66;text-decoration:none;">ops@808dtp.com</a>
+      </p>
+      <p style="font-size:11px;color:#555;margin-top:10px;">© 2025 808 DTP. All Rights Reserved.</p>
+    </div>
       </td>
     </tr>
   </table>
 </body>
 </html>
 """
+    return {
+        "from": f"808 DTP <noreply@{verified_domain}>",
+        "to": [user_email],
+        "subject": f"ACCESS GRANTED // {ticket_code}",
+        "html": html_content,
+    }
+
+
+def send_ticket_confirmation_email(ticket_data):
+    """
+    Send confirmation email after successful ticket payment
+    Supports both light and dark mode with Gmail fallback
+    """
+    try:
+        # Imported lazily to keep cold starts fast
+        import resend
 
-        resend.Emails.send(
-            {
-                "from": f"808 DTP <noreply@{verified_domain}>",
-                "to": [user_email],
-                "subject": f"ACCESS GRANTED // {ticket_code}",
-                "html": html_content,
-            }
+        resend.api_key = current_app.config["RESEND_API_KEY"]
+        params = build_ticket_confirmation_email(
+            ticket_data, current_app.config["RESEND_VERIFIED_DOMAIN"]
         )
 
+        with span("resend.send"):
+            resend.Emails.send(params)
+
         current_app.logger.info(
-            f"Confirmation email sent to {user_email} for ticket {ticket_code}"
+            f"Confirmation email sent to {params['to'][0]} for ticket {ticket_data['ticket_code']}"
         )
         return True
 
@@ -127,11 +166,88 @@ def send_ticket_confirmation_email(ticket_data):
         return False
 
 
+def send_ticket_confirmation_emails(tickets_data):
+    """
+    Send many confirmation emails through Resend's batch API. Returns how
+    many were sent. If Resend rejects a batch (one bad address fails the
+    whole call) its emails are retried one by one.
+    """
+    # Imported lazily to keep cold starts fast
+    import resend
+
+    resend.api_key = current_app.config["RESEND_API_KEY"]
+    domain = current_app.config["RESEND_VERIFIED_DOMAIN"]
+    sent = 0
+    for start in range(0, len(tickets_data), RESEND_BATCH_LIMIT):
+        batch = tickets_data[start : start + RESEND_BATCH_LIMIT]
+        try:
+            with span("resend.batch"):
+                resend.Batch.send(
+                    [build_ticket_confirmation_email(d, domain) for d in batch]
+                )
+            sent += len(batch)
+            metrics.inc("emails_sent_total", (("method", "batch"),), len(batch))
+        except Exception as e:
+            current_app.logger.warning(
+                f"Batch email send failed, sending {len(batch)} individually: {e}"
+            )
+            single = sum(send_ticket_confirmation_email(d) for d in batch)
+            sent += single
+            metrics.inc("emails_sent_total", (("method", "single"),), single)
+    return sent
+
+
+def _email_loop(app):
+    while True:
+        batch = [_email_queue.get()]
+        # Whatever else is already waiting goes in the same API call
+        while len(batch) < RESEND_BATCH_LIMIT:
+            try:
+                batch.append(_email_queue.get_nowait())
+            except queue.Empty:
+                break
+        try:
+            with app.app_context():
+                send_ticket_confirmation_emails(batch)
+        except Exception as e:
+            app.logger.error(f"Error sending queued confirmation emails: {e}")
+
+
+def queue_ticket_confirmation_emails(tickets_data):
+    """
+    Hand confirmation emails to a background sender and return at once.
+    With EMAIL_QUEUE_ENABLED off (e.g. on serverless, where background
+    threads are frozen between requests) they are sent before returning.
+    Queued emails are lost if the process exits before they go out.
+    """
+    global _email_worker
+    app = current_app._get_current_object()
+    if not app.config.get("EMAIL_QUEUE_ENABLED", True):
+        return send_ticket_confirmation_emails(tickets_data)
+
+    with _email_worker_lock:
+        if _email_worker is None:
+            metrics.register_gauge_callback(
+                lambda: [("email_queue_depth", (), _email_queue.qsize())]
+            )
+            _email_worker = threading.Thread(
+                target=_email_loop, args=(app,), daemon=True
+            )
+            _email_worker.start()
+    for ticket_data in tickets_data:
+        _email_queue.put(ticket_data)
+    metrics.inc("emails_queued_total", value=len(tickets_data))
+    return 0
+
+
 def send_manual_payment_notification(payment_data):
     """
     Send notification to admins when someone attempts a manual ticket purchase
     """
     try:
+        # Imported lazily to keep cold starts fast
+        import resend
+
         resend.api_key = current_app.config["RESEND_API_KEY"]
         verified_domain = current_app.config["RESEND_VERIFIED_DOMAIN"]
 
@@ -268,14 +384,15 @@ def send_manual_payment_notification(payment_data):
 </html>
 """
 
-        resend.Emails.send(
-            {
-                "from": f"808 DTP Notifications <noreply@{verified_domain}>",
-                "to": admin_emails,
-                "subject": f"Manual Payment Request - {reference_code} - GHS {amount}",
-                "html": html_content,
-            }
-        )
+        with span("resend.send"):
+            resend.Emails.send(
+                {
+                    "from": f"808 DTP Notifications <noreply@{verified_domain}>",
+                    "to": admin_emails,
+                    "subject": f"Manual Payment Request - {reference_code} - GHS {amount}",
+                    "html": html_content,
+                }
+            )
 
         current_app.logger.info(
             f"Manual payment notification sent to admins for reference {reference_code}"
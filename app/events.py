@@ -0,0 +1,295 @@
+"""
+Live admin events, pushed to /admin/events as Server-Sent Events.
+
+Model functions publish() an event after committing a change (ticket paid,
+manual payment created/confirmed/rejected, ticket checked in). The
+broadcaster formats it once and appends it to every connected client's
+buffer, so staff screens stay current without polling MySQL.
+
+Each client buffer holds at most EVENTS_CLIENT_BUFFER frames. A client that
+falls that far behind is evicted rather than letting its buffer grow (or
+slowing down publishers); browsers reconnect on their own and send
+Last-Event-ID, and the last EVENTS_HISTORY events are replayed to them.
+
+The broadcaster itself is per process. Set EVENTS_REDIS_URL (requires the
+`redis` package; it can be the RATELIMIT_STORAGE_URL server) whenever more
+than one process serves the API: gunicorn's workers (one per core), or
+Vercel, where every invocation is its own process. Events are then
+published to Redis, which numbers them, keeps the last EVENTS_HISTORY for
+replay and pushes them to every process serving a stream. Without it a
+stream only sees events committed by its own process, so /admin/events
+must be served by a single worker. On Vercel a stream also ends at the
+function's maximum duration; browsers reconnect and replay from Redis.
+"""
+
+import json
+import logging
+import threading
+import time
+from collections import deque
+
+from .metrics import metrics
+
+metrics.describe("events_published_total", "counter", "Admin events published by type")
+metrics.describe(
+    "events_evicted_clients_total", "counter", "Event stream clients evicted for falling behind"
+)
+metrics.describe("events_clients", "gauge", "Connected event stream clients")
+
+log = logging.getLogger(__name__)
+
+
+def format_frame(event_id, event_type, data):
+    return f"id: {event_id}\nevent: {event_type}\ndata: {json.dumps(data, default=str)}\n\n"
+
+
+class Subscriber:
+    """One connected client: a bounded buffer of frames not yet sent."""
+
+    def __init__(self, max_buffer):
+        self.max_buffer = max_buffer
+        self.frames = deque()
+        self.evicted = False
+        self.last_id = 0
+        self._ready = threading.Condition(threading.Lock())
+
+    def push(self, event_id, frame):
+        """Buffer a frame. Returns False (and marks the client evicted) if full."""
+        with self._ready:
+            if event_id <= self.last_id:
+                # Already replayed from history
+                return True
+            self.last_id = event_id
+            if len(self.frames) >= self.max_buffer:
+                self.evicted = True
+                self.frames.clear()
+            else:
+                self.frames.append(frame)
+            self._ready.notify()
+            return not self.evicted
+
+    def drain(self, timeout):
+        """Wait up to `timeout` seconds for frames; returns (and clears) them."""
+        with self._ready:
+            if not self.frames and not self.evicted:
+                self._ready.wait(timeout)
+            frames = list(self.frames)
+            self.frames.clear()
+            return frames
+
+
+class Broadcaster:
+    """Fans published events out to every subscriber."""
+
+    def __init__(self, max_buffer=100, max_clients=100, history=200):
+        self.max_buffer = max_buffer
+        self.max_clients = max_clients
+        self.relay = None
+        self._history = deque(maxlen=history)
+        self._subscribers = set()
+        self._next_id = 1
+        self._lock = threading.Lock()
+
+    def configure(self, max_buffer, max_clients, history, relay=None):
+        with self._lock:
+            self.max_buffer = max_buffer
+            self.max_clients = max_clients
+            self.relay = relay
+            self._history = deque(self._history, maxlen=history)
+
+    def _missed(self, last_event_id):
+        if self.relay is not None:
+            try:
+                return self.relay.history(last_event_id)
+            except Exception as e:
+                log.warning("Event history unavailable in Redis: %s", e)
+        return [(i, f) for i, f in self._history if i > last_event_id]
+
+    def subscribe(self, last_event_id=None):
+        """Register a client; returns None if max_clients are already connected."""
+        if self.relay is not None:
+            # Before reading the history, so no event falls between the two
+            try:
+                self.relay.start(self)
+            except Exception as e:
+                log.warning("Event relay unavailable, streaming local events: %s", e)
+        with self._lock:
+            if len(self._subscribers) >= self.max_clients:
+                return None
+            subscriber = Subscriber(self.max_buffer)
+            if last_event_id is not None:
+                for event_id, frame in self._missed(last_event_id)[-self.max_buffer :]:
+                    subscriber.push(event_id, frame)
+            self._subscribers.add(subscriber)
+            return subscriber
+
+    def unsubscribe(self, subscriber):
+        with self._lock:
+            self._subscribers.discard(subscriber)
+
+    def client_count(self):
+        return len(self._subscribers)
+
+    def publish(self, event_type, data):
+        """Send an event to all clients (of every process, with a relay); returns its id."""
+        metrics.inc("events_published_total", (("type", event_type),))
+        if self.relay is not None:
+            try:
+                return self.relay.publish(event_type, data)
+            except Exception as e:
+                # Never fail the change that published it
+                log.warning("Event relay unavailable, delivering locally: %s", e)
+
+        with self._lock:
+            event_id = self._next_id
+            self._next_id += 1
+        self.deliver(event_id, event_type, data)
+        return event_id
+
+    def deliver(self, event_id, event_type, data):
+        """Send an event, numbered by publish() or by the relay, to this process's clients."""
+        frame = format_frame(event_id, event_type, data)
+        with self._lock:
+            self._next_id = max(self._next_id, event_id + 1)
+            self._history.append((event_id, frame))
+            subscribers = list(self._subscribers)
+
+        for subscriber in subscribers:
+            if not subscriber.push(event_id, frame):
+                self.unsubscribe(subscriber)
+                metrics.inc("events_evicted_clients_total")
+
+
+# Numbers the event, stores it for replay and publishes it in one step, so
+# every process sees events in id order
+_REDIS_PUBLISH = """
+local id = redis.call('INCR', KEYS[1])
+local message = id .. ' ' .. ARGV[1]
+redis.call('LPUSH', KEYS[2], message)
+redis.call('LTRIM', KEYS[2], 0, tonumber(ARGV[2]) - 1)
+redis.call('PUBLISH', KEYS[3], message)
+return id
+"""
+
+
+class RedisRelay:
+    """Shares events between every process pointing at the same Redis."""
+
+    def __init__(self, url, history, channel="events", timeout=0.5):
+        import redis
+
+        # Publishing runs inline in checkout, verify and check-in: a Redis
+        # that hangs must fail fast so Broadcaster.publish falls back to
+        # local delivery
+        self._client = redis.Redis.from_url(
+            url, socket_timeout=timeout, socket_connect_timeout=timeout
+        )
+        # The listener blocks reading between events, so it gets no read
+        # timeout; health checks find a dead connection instead
+        self._listen_client = redis.Redis.from_url(
+            url, socket_connect_timeout=timeout, health_check_interval=30
+        )
+        self._publish = self._client.register_script(_REDIS_PUBLISH)
+        self.history_size = history
+        self.channel = channel
+        self._keys = [f"{channel}:last_id", f"{channel}:history", channel]
+        self._listener = None
+        self._lock = threading.Lock()
+
+    def publish(self, event_type, data):
+        payload = json.dumps({"type": event_type, "data": data}, default=str)
+        return int(self._publish(keys=self._keys, args=[payload, self.history_size]))
+
+    @staticmethod
+    def _decode(message):
+        event_id, payload = message.decode().split(" ", 1)
+        event = json.loads(payload)
+        return int(event_id), event["type"], event["data"]
+
+    def history(self, last_event_id):
+        """(id, frame) of the stored events after last_event_id, oldest first."""
+        missed = []
+        for message in reversed(self._client.lrange(self._keys[1], 0, -1)):
+            event_id, event_type, data = self._decode(message)
+            if event_id > last_event_id:
+                missed.append((event_id, format_frame(event_id, event_type, data)))
+        return missed
+
+    def _subscribe(self):
+        pubsub = self._listen_client.pubsub()
+        pubsub.subscribe(self.channel)
+        # Wait for the confirmation: events published after it are delivered
+        pubsub.get_message(timeout=5)
+        return pubsub
+
+    def start(self, broadcaster):
+        """Start delivering relayed events to `broadcaster` (once per process)."""
+        with self._lock:
+            if self._listener is not None:
+                return
+            pubsub = self._subscribe()
+            self._listener = threading.Thread(
+                target=self._listen,
+                args=(broadcaster, pubsub),
+                name="events-relay",
+                daemon=True,
+            )
+            self._listener.start()
+
+    def _listen(self, broadcaster, pubsub):
+        while True:
+            try:
+                for message in pubsub.listen():
+                    if message["type"] == "message":
+                        broadcaster.deliver(*self._decode(message["data"]))
+            except Exception as e:
+                # Events published while reconnecting reach clients only
+                # through Last-Event-ID replay
+                log.warning("Event relay disconnected: %s", e)
+                time.sleep(1)
+                try:
+                    pubsub = self._subscribe()
+                except Exception:
+                    pass
+
+
+broadcaster = Broadcaster()
+
+
+def publish(event_type, data):
+    return broadcaster.publish(event_type, data)
+
+
+def stream(subscriber, heartbeat):
+    """Response body generator for one client."""
+    try:
+        # Browsers wait this long (ms) before reconnecting
+        yield "retry: 3000\n\n"
+        while True:
+            frames = subscriber.drain(heartbeat)
+            if subscriber.evicted:
+                yield "event: evicted\ndata: {}\n\n"
+                return
+            # Comment lines keep proxies from closing an idle connection
+            yield "".join(frames) if frames else ": keepalive\n\n"
+    finally:
+        broadcaster.unsubscribe(subscriber)
+
+
+def init_events(app):
+    """Size the broadcaster from config and export the client gauge."""
+    history = app.config.get("EVENTS_HISTORY", 200)
+    url = app.config.get("EVENTS_REDIS_URL")
+    broadcaster.configure(
+        max_buffer=app.config.get("EVENTS_CLIENT_BUFFER", 100),
+        max_clients=app.config.get("EVENTS_MAX_CLIENTS", 100),
+        history=history,
+        relay=(
+            RedisRelay(url, history, timeout=app.config.get("EVENTS_REDIS_TIMEOUT", 0.5))
+            if url
+            else None
+        ),
+    )
+    metrics.register_gauge_callback(
+        lambda: [("events_clients", (), broadcaster.client_count())]
+    )
@@ -0,0 +1,81 @@
+"""
+Run independent pieces of a request concurrently.
+
+submit() hands a function to a small shared thread pool and returns a
+Future. The task runs with a copy of the caller's context, so current_app
+and g work as they do on the request thread, and it is timed as a
+"fanout.<name>" span nested under whatever span submitted it.
+
+Only submit work that needs no database connection (HTTP calls and the
+like): a task checking out a connection while its request holds one can
+exhaust the pool, and with a pool of 1 waits for itself until
+DB_CHECKOUT_TIMEOUT.
+
+The pool is bounded (FANOUT_MAX_WORKERS). When every worker is busy the
+task runs inline on the caller instead of queueing, so a saturated pool
+degrades to the old sequential behaviour rather than adding queueing delay.
+"""
+
+import contextvars
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+
+from flask import current_app
+
+from .metrics import metrics
+from .tracing import current_span, parent_span, span
+
+metrics.describe("fanout_task_seconds", "histogram", "Fan-out task duration by task")
+metrics.describe(
+    "fanout_inline_total", "counter", "Fan-out tasks run inline because the pool was busy"
+)
+
+_executor = None
+_slots = None
+_lock = threading.Lock()
+
+
+def _pool():
+    global _executor, _slots
+    if _executor is None:
+        with _lock:
+            if _executor is None:
+                workers = current_app.config.get("FANOUT_MAX_WORKERS", 8)
+                _slots = threading.BoundedSemaphore(workers)
+                _executor = ThreadPoolExecutor(
+                    max_workers=workers, thread_name_prefix="fanout"
+                )
+    return _executor, _slots
+
+
+def submit(name, fn, *args, **kwargs):
+    """Start fn(*args, **kwargs) concurrently; returns a Future."""
+    executor, slots = _pool()
+    parent = current_span()
+
+    def run(adopt=None):
+        start = time.perf_counter()
+        try:
+            with parent_span(adopt), span(f"fanout.{name}"):
+                return fn(*args, **kwargs)
+        finally:
+            metrics.observe(
+                "fanout_task_seconds", time.perf_counter() - start, (("task", name),)
+            )
+
+    if not slots.acquire(blocking=False):
+        metrics.inc("fanout_inline_total", (("task", name),))
+        future = Future()
+        try:
+            future.set_result(run())
+        except Exception as e:
+            future.set_exception(e)
+        return future
+
+    def release_slot(_):
+        slots.release()
+
+    future = executor.submit(contextvars.copy_context().run, run, parent)
+    future.add_done_callback(release_slot)
+    return future
@@ -0,0 +1,230 @@
+"""
+In-process metrics with a Prometheus text endpoint at /metrics.
+
+Each thread writes to its own shard (a plain dict), so recording a sample
+takes no lock. Shards are only merged when /metrics is scraped; shards of
+finished threads are folded into a single retired shard so thread churn
+doesn't grow memory. Under gevent all greenlets of a worker share one
+shard: they run on one OS thread and only switch on I/O.
+"""
+
+import sys
+import threading
+import time
+from bisect import bisect_left
+
+from flask import Response, current_app, g, request
+
+# Latency buckets in seconds
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+
+
+def _merge(into, shard):
+    for key, value in list(shard.items()):
+        if isinstance(value, list):
+            existing = into.get(key)
+            if existing is None:
+                into[key] = list(value)
+            else:
+                for i, v in enumerate(value):
+                    existing[i] += v
+        else:
+            into[key] = into.get(key, 0) + value
+
+
+def _greenlet_threads():
+    """True once gevent has patched threading (threads are greenlets)."""
+    monkey = sys.modules.get("gevent.monkey")
+    return monkey is not None and monkey.is_module_patched("threading")
+
+
+def _format_labels(labels):
+    if not labels:
+        return ""
+    parts = []
+    for k, v in labels:
+        v = str(v).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+        parts.append(f'{k}="{v}"')
+    return "{" + ",".join(parts) + "}"
+
+
+class Metrics:
+    def __init__(self, buckets=DEFAULT_BUCKETS):
+        self.buckets = tuple(buckets)
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self._shards = []  # (thread, shard)
+        self._retired = {}
+        self._greenlet_shard = {}
+        self._meta = {}  # name -> (type, help)
+        self._gauge_callbacks = []
+
+    def describe(self, name, kind, help_text):
+        self._meta[name] = (kind, help_text)
+
+    def _shard(self):
+        shard = getattr(self._local, "shard", None)
+        if shard is None:
+            if _greenlet_threads():
+                # threading.local is per greenlet here; a shard per request
+                # would never be retired
+                shard = self._local.shard = self._greenlet_shard
+                return shard
+            shard = self._local.shard = {}
+            with self._lock:
+                alive = []
+                for thread, s in self._shards:
+                    if thread.is_alive():
+                        alive.append((thread, s))
+                    else:
+                        _merge(self._retired, s)
+                alive.append((threading.current_thread(), shard))
+                self._shards = alive
+        return shard
+
+    def inc(self, name, labels=(), value=1):
+        """Increment a counter (or a gauge, with a negative value)."""
+        shard = self._shard()
+        key = (name, labels)
+        shard[key] = shard.get(key, 0) + value
+
+    def observe(self, name, value, labels=()):
+        """Record a histogram sample."""
+        shard = self._shard()
+        key = (name, labels)
+        hist = shard.get(key)
+        if hist is None:
+            # one slot per bucket, one for +Inf, then the running sum
+            hist = shard[key] = [0] * (len(self.buckets) + 2)
+        hist[bisect_left(self.buckets, value)] += 1
+        hist[-1] += value
+
+    def register_gauge_callback(self, callback):
+        """`callback()` returns [(name, labels, value)] at scrape time."""
+        self._gauge_callbacks.append(callback)
+
+    def snapshot(self):
+        merged = {}
+        with self._lock:
+            _merge(merged, self._retired)
+            _merge(merged, self._greenlet_shard)
+            for _, shard in self._shards:
+                _merge(merged, shard)
+        for callback in self._gauge_callbacks:
+            try:
+                for name, labels, value in callback():
+                    merged[(name, labels)] = value
+            except Exception:
+                pass
+        return merged
+
+    def render(self):
+        """Render all metrics in the Prometheus text exposition format."""
+        by_name = {}
+        for (name, labels), value in self.snapshot().items():
+            by_name.setdefault(name, []).append((labels, value))
+
+        lines = []
+        for name in sorted(by_name):
+            kind, help_text = self._meta.get(name, ("untyped", ""))
+            if help_text:
+                lines.append(f"# HELP {name} {help_text}")
+            lines.append(f"# TYPE {name} {kind}")
+            for labels, value in sorted(by_name[name]):
+                if kind != "histogram":
+                    lines.append(f"{name}{_format_labels(labels)} {value}")
+                    continue
+                cumulative = 0
+                for bound, count in zip(self.buckets + ("+Inf",), value[:-1]):
+                    cumulative += count
+                    le = labels + (("le", bound),)
+                    lines.append(f"{name}_bucket{_format_labels(le)} {cumulative}")
+                lines.append(f"{name}_sum{_format_labels(labels)} {value[-1]}")
+                lines.append(f"{name}_count{_format_labels(labels)} {cumulative}")
+        return "\n".join(lines) + "\n"
+
+
+metrics = Metrics()
+
+metrics.describe(
+    "http_requests_total", "counter", "Requests by endpoint, method and status"
+)
+metrics.describe(
+    "http_request_duration_seconds", "histogram", "Request latency by endpoint"
+)
+metrics.describe(
+    "db_pool_checkout_seconds", "histogram", "Time spent waiting for a pooled connection"
+)
+metrics.describe("db_pool_size", "gauge", "Configured connections in the pool")
+metrics.describe("db_pool_connections_in_use", "gauge", "Connections checked out")
+metrics.describe("db_replica_pool_size", "gauge", "Configured read replica connections")
+metrics.describe(
+    "db_replica_pool_connections_in_use", "gauge", "Read replica connections checked out"
+)
+metrics.describe("tickets_created_total", "counter", "Tickets created")
+metrics.describe("tickets_paid_total", "counter", "Tickets marked as paid")
+metrics.describe("tickets_checked_in_total", "counter", "Tickets checked in")
+metrics.describe("admissions_checked_in_total", "counter", "Attendees admitted")
+metrics.describe("pending_expired_total", "counter", "Abandoned pending rows archived by kind")
+metrics.describe(
+    "expired_tickets_restored_total", "counter", "Expired tickets restored after a late payment"
+)
+metrics.describe(
+    "expired_manual_payments_restored_total",
+    "counter",
+    "Expired manual payments restored after a late transfer",
+)
+
+
+def _pool_gauges(app):
+    def callback():
+        pool = app.extensions.get("db_pool")
+        if pool is None:
+            return []
+        gauges = [
+            ("db_pool_size", (), pool.pool_size),
+            ("db_pool_connections_in_use", (), pool.in_use()),
+        ]
+        replica = app.extensions.get("db_replica_pool")
+        if replica is not None:
+            gauges.append(("db_replica_pool_size", (), replica.pool_size))
+            gauges.append(("db_replica_pool_connections_in_use", (), replica.in_use()))
+        return gauges
+
+    return callback
+
+
+def init_metrics(app):
+    """Time every request and expose /metrics."""
+    metrics.register_gauge_callback(_pool_gauges(app))
+
+    @app.before_request
+    def _start_timer():
+        g._metrics_start = time.perf_counter()
+
+    @app.after_request
+    def _record_request(response):
+        start = g.pop("_metrics_start", None)
+        if start is not None:
+            endpoint = request.endpoint or "unmatched"
+            metrics.observe(
+                "http_request_duration_seconds",
+                time.perf_counter() - start,
+                (("endpoint", endpoint), ("method", request.method)),
+            )
+            metrics.inc(
+                "http_requests_total",
+                (
+                    ("endpoint", endpoint),
+                    ("method", request.method),
+                    ("status", response.status_code),
+                ),
+            )
+        return response
+
+    @app.route("/metrics", methods=["GET"])
+    def metrics_endpoint():
+        token = current_app.config.get("METRICS_TOKEN")
+        if token and request.headers.get("Authorization") != f"Bearer {token}":
+            return Response("Unauthorized\n", status=401, mimetype="text/plain")
+        return Response(metrics.render(), mimetype="text/plain; version=0.0.4")
@@ -1,57 +1,198 @@
-import mysql.connector
-from mysql.connector import pooling
-from flask import current_app
 import datetime
 import random
+import re
+import secrets
 import string
+from collections import Counter
+
+from .db import (
+    init_db,
+    get_backend,
+    get_conn,
+    is_duplicate_error,
+    on_first_connect,
+    read_only,
+)
+from .events import publish
+from .metrics import metrics
+from .pricing import apply_promo, current_event
+from .search import search_fields
+from .waiters import notify
+
+
+@on_first_connect
+def init_schema():
+    """Create all tables up front so read paths work on an empty database."""
+    conn = get_conn()
+    try:
+        create_waitlist_table(conn)
+        create_tickets_table(conn)
+        create_manual_payments_table(conn)
+        create_ticket_types_table(conn)
+        create_ticket_stats_table(conn)
+        create_sales_rollup_table(conn)
+        conn.commit()
+        add_search_columns(conn)
+        create_archive_tables(conn)
+        add_event_columns(conn)
+        create_admissions_table(conn)
+    finally:
+        conn.close()
 
 
-def init_db(app):
-    # Create a connection pool and store on app.extensions
-    dbconfig = {
-        "host": app.config.get("MYSQL_HOST"),
-        "user": app.config.get("MYSQL_USER"),
-        "password": app.config.get("MYSQL_PASSWORD"),
-        "database": app.config.get("MYSQL_DB"),
-        "charset": "utf8mb4",
-    }
+# Normalized, indexed copies of the contact columns used by /admin/search
+# (see search.py), per table: (email column, name column, phone column)
+SEARCH_TABLES = {
+    "tickets": ("user_email", "name", "phone"),
+    "manual_payments": ("user_email", "name", "phone"),
+    "waitlist": ("email", "name", "phone"),
+}
+SEARCH_COLUMNS = ("email_lc", "name_lc", "surname_lc", "phone_norm")
+
+
+def add_search_columns(conn, batch_size=500):
+    """
+    Add the search columns and their indexes to tables that lack them, and
+    fill them in for rows inserted without them (older rows, or rows
+    written by a process running older code).
+    """
+    backend = get_backend()
+    cursor = conn.cursor()
+    for table, (email, name, phone) in SEARCH_TABLES.items():
+        # Column by column, so a table left half-migrated gets the rest
+        existing = backend.column_names(cursor, table)
+        added = False
+        for column in SEARCH_COLUMNS:
+            if column in existing:
+                continue
+            size = 20 if column == "phone_norm" else 255
+            cursor.execute(f"ALTER TABLE {table} ADD COLUMN {column} VARCHAR({size})")
+            cursor.execute(f"CREATE INDEX idx_{table}_{column} ON {table}({column})")
+            added = True
+        if added:
+            conn.commit()
+
+        # Rows whose source values normalize to NULL (an empty email, a phone
+        # with no digits) stay NULL; walking the ids keeps them from being
+        # picked up again and again
+        missing = " OR ".join(f"{column} IS NULL" for column in SEARCH_COLUMNS)
+        last_id = 0
+        while True:
+            cursor.execute(
+                f"SELECT id, {email}, {name}, {phone}, {', '.join(SEARCH_COLUMNS)} "
+                f"FROM {table} WHERE id > %s AND ({missing}) "
+                f"ORDER BY id LIMIT {int(batch_size)}",
+                (last_id,),
+            )
+            rows = cursor.fetchall()
+            if not rows:
+                break
+            last_id = rows[-1][0]
+            updates = []
+            for row_id, e, n, p, *stored in rows:
+                fields = tuple(search_fields(e, n, p).values())
+                if fields != tuple(stored):
+                    updates.append(fields + (row_id,))
+            if updates:
+                cursor.executemany(
+                    f"UPDATE {table} SET email_lc = %s, name_lc = %s, surname_lc = %s, "
+                    "phone_norm = %s WHERE id = %s",
+                    updates,
+                )
+                conn.commit()
+    cursor.close()
 
-    pool = pooling.MySQLConnectionPool(pool_name="mypool", pool_size=5, **dbconfig)
-    app.extensions = getattr(app, "extensions", {})
-    app.extensions["db_pool"] = pool
 
+def _drop_search_columns(row):
+    # Internal to search; keep SELECT * responses as they were
+    for column in SEARCH_COLUMNS:
+        row.pop(column, None)
+    return row
+
+
+# Columns returned by /admin/search for each table
+_SEARCH_RESULT_COLUMNS = {
+    "tickets": "id, ticket_code, reference, user_email, name, phone, ticket_type, "
+    "quantity, payment_status, checked_in, created_at",
+    "manual_payments": "id, reference_code, user_email, name, phone, ticket_type, "
+    "quantity, payment_status, created_at",
+    "waitlist": "id, email AS user_email, name, phone, created_at",
+}
+
+
+def _like_prefix(prefix):
+    # LIKE pattern (with ESCAPE '!') matching strings that start with prefix.
+    # LIKE rather than a >= / < range: MySQL's default collation
+    # (utf8mb4_0900_ai_ci) doesn't order strings by code point, so the
+    # "successor" of a prefix can sort before it. Both engines still scan
+    # the index range for a pattern with a literal prefix (SQLite with
+    # case_sensitive_like, see sqlite_backend.PRAGMAS).
+    escaped = prefix.replace("!", "!!").replace("%", "!%").replace("_", "!_")
+    return escaped + "%"
+
+
+@read_only
+def search_prefix(lookups, limit):
+    """
+    For each (table, column, prefix) in lookups, up to `limit` rows whose
+    column starts with prefix, as (table, column, prefix, row). Each lookup
+    is one index range scan; all run on one connection.
+    """
+    conn = get_conn()
+    try:
+        cursor = conn.cursor(dictionary=True)
+        hits = []
+        for table, column, prefix in lookups:
+            if not prefix:
+                continue
+            cursor.execute(
+                f"SELECT {_SEARCH_RESULT_COLUMNS[table]}, {column} FROM {table} "
+                f"WHERE {column} LIKE %s ESCAPE '!' ORDER BY {column} LIMIT %s",
+                (_like_prefix(prefix), int(limit)),
+            )
+            hits.extend((table, column, prefix, row) for row in cursor.fetchall())
+        cursor.close()
+        return hits
+    finally:
+        conn.close()
 
-def get_conn():
-    pool = current_app.extensions.get("db_pool")
-    if pool is None:
-        raise RuntimeError("DB pool is not initialized")
-    return pool.get_connection()
+
+def create_waitlist_table(conn):
+    """Create waitlist table if it doesn't exist."""
+    cursor = conn.cursor()
+    cursor.execute(
+        """
+        CREATE TABLE IF NOT EXISTS waitlist (
+            id INT AUTO_INCREMENT PRIMARY KEY,
+            email VARCHAR(255) NOT NULL UNIQUE,
+            name VARCHAR(255),
+            phone VARCHAR(50),
+            referral VARCHAR(255),
+            created_at DATETIME NOT NULL
+        ) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4;
+        """
+    )
+    cursor.close()
 
 
 def insert_waitlist(email, name=None, phone=None, referral=None):
     """Insert into waitlist table. Returns inserted id."""
     conn = get_conn()
     try:
-        cursor = conn.cursor()
-
         # Ensure table exists (simple idempotent create)
-        cursor.execute(
-            """
-            CREATE TABLE IF NOT EXISTS waitlist (
-                id INT AUTO_INCREMENT PRIMARY KEY,
-                email VARCHAR(255) NOT NULL UNIQUE,
-                name VARCHAR(255),
-                phone VARCHAR(50),
-                referral VARCHAR(255),
-                created_at DATETIME NOT NULL
-            ) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4;
-            """
-        )
+        create_waitlist_table(conn)
+        cursor = conn.cursor()
 
         now = datetime.datetime.utcnow()
         cursor.execute(
-            "INSERT INTO waitlist (email, name, phone, referral, created_at) VALUES (%s, %s, %s, %s, %s)",
-            (email, name, phone, referral, now),
+            """
+            INSERT INTO waitlist
+                (email, name, phone, referral, created_at,
+                 email_lc, name_lc, surname_lc, phone_norm)
+            VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s)
+            """,
+            (email, name, phone, referral, now)
+            + tuple(search_fields(email, name, phone).values()),
         )
         conn.commit()
         inserted_id = cursor.lastrowid
@@ -61,6 +202,7 @@ def insert_waitlist(email, name=None, phone=None, referral=None):
         conn.close()
 
 
+@read_only
 def get_all_waitlist():
     """Retrieve all entries from the waitlist table."""
     conn = get_conn()
@@ -71,6 +213,7 @@ def get_all_waitlist():
 
         # Convert datetime objects to string for JSON serialization
         for entry in entries:
+            _drop_search_columns(entry)
             if entry.get("created_at"):
                 entry["created_at"] = entry["created_at"].isoformat()
 
@@ -133,39 +276,247 @@ def create_tickets_table(conn):
     cursor.close()
 
 
-def get_promo_code(code):
-    """Get promo code details and validate it."""
+def create_ticket_types_table(conn):
+    """Create ticket_types table if it doesn't exist."""
+    cursor = conn.cursor()
+    cursor.execute(
+        """
+        CREATE TABLE IF NOT EXISTS ticket_types (
+            id INT AUTO_INCREMENT PRIMARY KEY,
+            code VARCHAR(20) NOT NULL UNIQUE,
+            name VARCHAR(100) NOT NULL,
+            price DECIMAL(10,2) NOT NULL,
+            sale_starts_at DATETIME DEFAULT NULL,
+            sale_ends_at DATETIME DEFAULT NULL,
+            sort_order INT DEFAULT 0,
+            is_active BOOLEAN DEFAULT TRUE,
+            updated_at DATETIME NOT NULL DEFAULT CURRENT_TIMESTAMP
+        ) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4;
+        """
+    )
+    cursor.close()
+
+
+# Counters are spread over a few rows per ticket type so concurrent sales
+# don't all queue on one row lock; readers sum the slots
+STATS_SLOTS = 8
+
+_STATS_UPSERT = """
+    INSERT INTO ticket_stats
+        (ticket_type, slot, pending_orders, paid_orders, paid_quantity, revenue,
+         checked_in_orders)
+    VALUES (%s, %s, %s, %s, %s, %s, %s)
+    ON DUPLICATE KEY UPDATE
+        pending_orders = pending_orders + VALUES(pending_orders),
+        paid_orders = paid_orders + VALUES(paid_orders),
+        paid_quantity = paid_quantity + VALUES(paid_quantity),
+        revenue = revenue + VALUES(revenue),
+        checked_in_orders = checked_in_orders + VALUES(checked_in_orders)
+"""
+
+
+def create_ticket_stats_table(conn):
+    """Create the pre-aggregated ticket_stats table if it doesn't exist."""
+    cursor = conn.cursor()
+    cursor.execute(
+        """
+        CREATE TABLE IF NOT EXISTS ticket_stats (
+            ticket_type VARCHAR(20) NOT NULL,
+            slot TINYINT NOT NULL DEFAULT 0,
+            pending_orders INT NOT NULL DEFAULT 0,
+            paid_orders INT NOT NULL DEFAULT 0,
+            paid_quantity INT NOT NULL DEFAULT 0,
+            revenue DECIMAL(12,2) NOT NULL DEFAULT 0,
+            checked_in_orders INT NOT NULL DEFAULT 0,
+            PRIMARY KEY (ticket_type, slot)
+        ) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4;
+        """
+    )
+    cursor.close()
+
+
+def stats_delta(ticket_type, pending=0, paid=0, quantity=0, revenue=0, checked_in=0):
+    """
+    (sql, params) that add these deltas to ticket_type's counters. Execute
+    it in the same transaction as the change it counts.
+    """
+    slot = random.randrange(STATS_SLOTS)
+    return _STATS_UPSERT, (
+        ticket_type,
+        slot,
+        pending,
+        paid,
+        quantity,
+        revenue,
+        checked_in,
+    )
+
+
+def _status_counts(status, ticket):
+    if status == "pending":
+        return {"pending": 1}
+    if status == "paid":
+        return {
+            "paid": 1,
+            "quantity": ticket["quantity"],
+            "revenue": ticket["final_price"] or 0,
+        }
+    return {}
+
+
+def ticket_deltas(ticket, new_status, old_status=None):
+    """
+    Counter updates, as a list of (sql, params), for a ticket entering
+    new_status (from old_status, or newly created if None). `ticket` needs
+    ticket_type, promo_code, quantity, the price columns and created_at.
+    Execute them in the same transaction as the change.
+    """
+    old = _status_counts(old_status, ticket) if old_status else {}
+    new = _status_counts(new_status, ticket)
+    deltas = {k: new.get(k, 0) - old.get(k, 0) for k in set(old) | set(new)}
+    statements = [stats_delta(ticket["ticket_type"], **deltas)]
+    if old_status:
+        statements.append(rollup_delta(ticket, old_status, -1))
+    statements.append(rollup_delta(ticket, new_status, 1))
+    return statements
+
+
+_ROLLUP_UPSERT = """
+    INSERT INTO sales_rollup_hourly
+        (bucket, ticket_type, promo_code, payment_status, orders, quantity,
+         total_price, discount_amount, final_price)
+    VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s)
+    ON DUPLICATE KEY UPDATE
+        orders = orders + VALUES(orders),
+        quantity = quantity + VALUES(quantity),
+        total_price = total_price + VALUES(total_price),
+        discount_amount = discount_amount + VALUES(discount_amount),
+        final_price = final_price + VALUES(final_price)
+"""
+
+
+def create_sales_rollup_table(conn):
+    """Create the hourly sales rollup table if it doesn't exist."""
+    cursor = conn.cursor()
+    # promo_code is '' rather than NULL for orders without one, since it is
+    # part of the primary key
+    cursor.execute(
+        """
+        CREATE TABLE IF NOT EXISTS sales_rollup_hourly (
+            bucket DATETIME NOT NULL,
+            ticket_type VARCHAR(20) NOT NULL,
+            promo_code VARCHAR(50) NOT NULL DEFAULT '',
+            payment_status VARCHAR(50) NOT NULL,
+            orders INT NOT NULL DEFAULT 0,
+            quantity INT NOT NULL DEFAULT 0,
+            total_price DECIMAL(12,2) NOT NULL DEFAULT 0,
+            discount_amount DECIMAL(12,2) NOT NULL DEFAULT 0,
+            final_price DECIMAL(12,2) NOT NULL DEFAULT 0,
+            PRIMARY KEY (bucket, ticket_type, promo_code, payment_status)
+        ) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4;
+        """
+    )
+    cursor.close()
+
+
+def _rollup_key(ticket, status):
+    bucket = ticket["created_at"].replace(minute=0, second=0, microsecond=0)
+    return (bucket, ticket["ticket_type"], ticket["promo_code"] or "", status)
+
+
+def rollup_delta(ticket, status, sign=1):
+    """(sql, params) adding (sign=1) or removing (-1) a ticket from its hour's bucket."""
+    return _ROLLUP_UPSERT, _rollup_key(ticket, status) + (
+        sign,
+        sign * ticket["quantity"],
+        sign * (ticket["total_price"] or 0),
+        sign * (ticket["discount_amount"] or 0),
+        sign * (ticket["final_price"] or 0),
+    )
+
+
+def _add_to_rollup(buckets, ticket, status, sign=1):
+    totals = buckets.setdefault(_rollup_key(ticket, status), [0, 0, 0, 0, 0])
+    totals[0] += sign
+    totals[1] += sign * ticket["quantity"]
+    totals[2] += sign * (ticket["total_price"] or 0)
+    totals[3] += sign * (ticket["discount_amount"] or 0)
+    totals[4] += sign * (ticket["final_price"] or 0)
+
+
+def batch_ticket_deltas(tickets, new_status, sign=1):
+    """
+    ticket_deltas() for many newly created tickets (or, with sign=-1, for
+    many tickets being removed from new_status), summed per counter row: a
+    list of (sql, [params, ...]) to run with executemany.
+    """
+    counters = {}
+    buckets = {}
+    for ticket in tickets:
+        totals = counters.setdefault(ticket["ticket_type"], {})
+        for name, value in _status_counts(new_status, ticket).items():
+            totals[name] = totals.get(name, 0) + sign * value
+        _add_to_rollup(buckets, ticket, new_status, sign)
+    return [
+        (_STATS_UPSERT, [stats_delta(t, **d)[1] for t, d in counters.items()]),
+        (_ROLLUP_UPSERT, [key + tuple(totals) for key, totals in buckets.items()]),
+    ]
+
+
+@read_only
+def get_sales_rollup(start, end, ticket_type=None, promo_code=None, payment_status=None):
+    """Hourly buckets in [start, end), optionally filtered; reads only that range."""
     conn = get_conn()
     try:
         cursor = conn.cursor(dictionary=True)
-        cursor.execute(
-            """
-            SELECT * FROM promo_codes 
-            WHERE code = %s AND is_active = TRUE 
-            AND (valid_until IS NULL OR valid_until >= UTC_TIMESTAMP())
-            AND (valid_from IS NULL OR valid_from <= UTC_TIMESTAMP())
-            """,
-            (code,),
-        )
-        promo = cursor.fetchone()
+        sql = """
+            SELECT bucket, ticket_type, promo_code, payment_status, orders, quantity,
+                   total_price, discount_amount, final_price
+            FROM sales_rollup_hourly
+            WHERE bucket >= %s AND bucket < %s AND orders <> 0
+        """
+        params = [start, end]
+        for column, value in (
+            ("ticket_type", ticket_type),
+            ("promo_code", promo_code),
+            ("payment_status", payment_status),
+        ):
+            if value is not None:
+                sql += f" AND {column} = %s"
+                params.append(value)
+        cursor.execute(sql + " ORDER BY bucket", params)
+        rows = cursor.fetchall()
         cursor.close()
-        return promo
+        return rows
     finally:
         conn.close()
 
 
-def use_promo_code(code):
-    """Increment the used_count for a promo code."""
+def recount_sales_rollup():
+    """Rebuild sales_rollup_hourly from the tickets table."""
     conn = get_conn()
     try:
-        cursor = conn.cursor()
+        cursor = conn.cursor(dictionary=True)
+        # Bucketed in Python: hour truncation has no portable SQL spelling
         cursor.execute(
-            "UPDATE promo_codes SET used_count = used_count + 1 WHERE code = %s",
-            (code,),
+            """
+            SELECT created_at, ticket_type, promo_code, payment_status, quantity,
+                   total_price, discount_amount, final_price
+            FROM tickets
+            """
         )
+        buckets = {}
+        for ticket in cursor:
+            _add_to_rollup(buckets, ticket, ticket["payment_status"])
+
+        cursor.execute("DELETE FROM sales_rollup_hourly")
+        if buckets:
+            cursor.executemany(
+                _ROLLUP_UPSERT,
+                [key + tuple(totals) for key, totals in buckets.items()],
+            )
         conn.commit()
         cursor.close()
-        return True
     except Exception as e:
         conn.rollback()
         raise e
@@ -173,334 +524,1970 @@ def use_promo_code(code):
         conn.close()
 
 
-def calculate_discounted_price(base_price, promo_code):
-    """Calculate discounted price based on promo code."""
-    if not promo_code:
-        return base_price, 0
-
-    promo = get_promo_code(promo_code)
-    if not promo:
-        return base_price, 0
-
-    # Check if promo code has reached max uses
-    if promo["max_uses"] and promo["used_count"] >= promo["max_uses"]:
-        return base_price, 0
-
-    discount_amount = 0
-    if promo["discount_type"] == "percentage":
-        discount_amount = base_price * (promo["discount_value"] / 100)
-    else:  # fixed amount
-        discount_amount = promo["discount_value"]
-
-    # Ensure discount doesn't make price negative
-    final_price = max(0, base_price - discount_amount)
-    return final_price, discount_amount
+_TICKET_STATS_SQL = """
+    SELECT ticket_type,
+           SUM(pending_orders) AS pending_orders,
+           SUM(paid_orders) AS paid_orders,
+           SUM(paid_quantity) AS paid_quantity,
+           SUM(revenue) AS revenue,
+           SUM(checked_in_orders) AS checked_in_orders
+    FROM ticket_stats
+    GROUP BY ticket_type
+    ORDER BY ticket_type
+"""
+
+
+@read_only
+def get_ticket_stats(primary=False):
+    """
+    Counters per ticket type (a handful of rows, whatever the sales volume).
+    primary=True skips the replica, e.g. to compare with a recount.
+    """
+    conn = get_conn(replica=False) if primary else get_conn()
+    try:
+        cursor = conn.cursor(dictionary=True)
+        cursor.execute(_TICKET_STATS_SQL)
+        rows = cursor.fetchall()
+        cursor.close()
+        return rows
+    finally:
+        conn.close()
 
 
-def insert_ticket(
-    email,
-    name,
-    phone,
-    price,
-    reference,
-    ticket_type="regular",
-    quantity=1,
-    total_price=None,
-    promo_code=None,
-):
-    """Insert a new ticket record."""
+def recount_ticket_stats():
+    """
+    Rebuild ticket_stats from the tickets table (corrects any drift).
+    Returns the counters (get_ticket_stats rows) before and after, both
+    read in the rebuild's transaction, so sales made meanwhile don't show
+    up as a difference.
+    """
     conn = get_conn()
     try:
-        create_tickets_table(conn)
         cursor = conn.cursor(dictionary=True)
-        ticket_code = generate_ticket_code()
-
-        # If total_price is not provided, calculate it
-        if total_price is None:
-            total_price = price * quantity
-
-        # Calculate discount if promo code provided
-        discount_amount = 0
-        final_price = total_price
-
-        if promo_code:
-            final_price, discount_amount = calculate_discounted_price(
-                total_price, promo_code
-            )
-            # Mark promo code as used
-            use_promo_code(promo_code)
-
+        # Locks the counters: ticket changes wait to bump them until the
+        # rebuild commits
+        cursor.execute(f"{_TICKET_STATS_SQL} FOR UPDATE")
+        before = cursor.fetchall()
+        cursor.execute("DELETE FROM ticket_stats")
         cursor.execute(
             """
-            INSERT INTO tickets 
-                (user_email, name, phone, price, total_price, quantity, ticket_type, 
-                 reference, payment_status, ticket_code, promo_code, discount_amount, final_price) 
-            VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s)
-            """,
-            (
-                email,
-                name,
-                phone,
-                price,
-                total_price,
-                quantity,
-                ticket_type,
-                reference,
-                "pending",
-                ticket_code,
-                promo_code,
-                discount_amount,
-                final_price,
-            ),
+            INSERT INTO ticket_stats
+                (ticket_type, slot, pending_orders, paid_orders, paid_quantity, revenue,
+                 checked_in_orders)
+            SELECT ticket_type, 0,
+                   SUM(CASE WHEN payment_status = 'pending' THEN 1 ELSE 0 END),
+                   SUM(CASE WHEN payment_status = 'paid' THEN 1 ELSE 0 END),
+                   SUM(CASE WHEN payment_status = 'paid' THEN quantity ELSE 0 END),
+                   SUM(CASE WHEN payment_status = 'paid' THEN final_price ELSE 0 END),
+                   SUM(CASE WHEN checked_in THEN 1 ELSE 0 END)
+            FROM tickets
+            GROUP BY ticket_type
+            """
         )
+        cursor.execute(_TICKET_STATS_SQL)
+        after = cursor.fetchall()
         conn.commit()
-
-        # Fetch the inserted record
-        cursor.execute(
-            "SELECT id, ticket_code, ticket_type, quantity, price, total_price, discount_amount, final_price, promo_code FROM tickets WHERE reference = %s",
-            (reference,),
-        )
-        result = cursor.fetchone()
         cursor.close()
-        return result
+    except Exception as e:
+        conn.rollback()
+        raise e
     finally:
         conn.close()
+    return before, after
 
 
-def update_ticket_payment_status(reference, status="paid"):
-    """Update ticket payment status."""
+def ticket_stats_is_empty():
+    """True if the stats tables have no rows but tickets does (needs a recount)."""
     conn = get_conn()
     try:
         cursor = conn.cursor()
-        cursor.execute(
-            "UPDATE tickets SET payment_status = %s WHERE reference = %s",
-            (status, reference),
-        )
-        conn.commit()
-        affected_rows = cursor.rowcount
+        cursor.execute("SELECT 1 FROM ticket_stats LIMIT 1")
+        has_stats = cursor.fetchone() is not None
+        cursor.execute("SELECT 1 FROM sales_rollup_hourly LIMIT 1")
+        has_stats = has_stats and cursor.fetchone() is not None
+        cursor.execute("SELECT 1 FROM tickets LIMIT 1")
+        has_tickets = cursor.fetchone() is not None
         cursor.close()
-        return affected_rows > 0
+        return has_tickets and not has_stats
     finally:
         conn.close()
 
 
-def check_waitlist_status(email):
-    """Check if an email exists in waitlist."""
+def seed_ticket_types(defaults):
+    """Insert the default ticket types if the table is empty."""
     conn = get_conn()
     try:
+        create_ticket_types_table(conn)
         cursor = conn.cursor()
-        cursor.execute("SELECT id FROM waitlist WHERE email = %s", (email,))
-        result = cursor.fetchone()
+        cursor.execute("SELECT COUNT(*) FROM ticket_types")
+        (count,) = cursor.fetchone()
+        if count == 0:
+            cursor.executemany(
+                """
+                INSERT INTO ticket_types (code, name, price, sort_order, updated_at)
+                VALUES (%s, %s, %s, %s, UTC_TIMESTAMP())
+                """,
+                [(t.code, t.name, t.price, t.sort_order) for t in defaults],
+            )
+            conn.commit()
         cursor.close()
-        return bool(result)
     finally:
         conn.close()
 
 
-def get_ticket_by_reference(reference):
-    """Get ticket details by reference."""
+def get_ticket_types_version():
+    """Cheap change marker for ticket_types and events (row counts + last updates)."""
     conn = get_conn()
     try:
-        cursor = conn.cursor(dictionary=True)
-        cursor.execute(
-            """
-            SELECT user_email, name, phone, price, total_price, quantity, ticket_type, 
-                   ticket_code, payment_status, promo_code, discount_amount, final_price,
-                   checked_in, checked_in_at, checked_in_by
-            FROM tickets WHERE reference = %s
-            """,
-            (reference,),
-        )
-        result = cursor.fetchone()
+        cursor = conn.cursor()
+        cursor.execute("SELECT COUNT(*), MAX(updated_at) FROM ticket_types")
+        version = tuple(cursor.fetchone())
+        cursor.execute("SELECT COUNT(*), MAX(updated_at) FROM events")
+        version += tuple(cursor.fetchone())
         cursor.close()
-        return result
+        return version
     finally:
         conn.close()
 
 
-def get_ticket_by_code(ticket_code):
-    """Get ticket details by ticket code."""
+def get_active_ticket_types():
+    """Get active ticket types for the pricing snapshot."""
     conn = get_conn()
     try:
         cursor = conn.cursor(dictionary=True)
         cursor.execute(
             """
-            SELECT 
-                id,
-                user_email,
-                name,
-                phone,
-                ticket_type,
-                quantity,
-                price,
-                payment_status,
-                reference,
-                ticket_code,
-                created_at,
-                total_price,
-                promo_code,
-                discount_amount,
-                final_price,
-                checked_in,
-                checked_in_at,
-                checked_in_by
-            FROM tickets WHERE ticket_code = %s
-            """,
-            (ticket_code,),
+            SELECT code, name, price, sale_starts_at, sale_ends_at, sort_order
+            FROM ticket_types WHERE is_active = TRUE
+            ORDER BY sort_order, code
+            """
         )
-        result = cursor.fetchone()
-
-        # Convert datetime objects to ISO format for JSON serialization
-        if result:
-            if result.get("created_at"):
-                result["created_at"] = result["created_at"].isoformat()
-            if result.get("checked_in_at"):
-                result["checked_in_at"] = result["checked_in_at"].isoformat()
-            # Convert tinyint(1) to boolean for checked_in
-            if "checked_in" in result:
-                result["checked_in"] = bool(result["checked_in"])
-
+        rows = cursor.fetchall()
         cursor.close()
-        return result
+        return rows
     finally:
         conn.close()
 
 
-def check_in_ticket(ticket_code, checked_in_by="admin"):
-    """Check in a ticket (mark as used)."""
+def get_all_ticket_types():
+    """Get all ticket types for admin."""
     conn = get_conn()
     try:
-        cursor = conn.cursor()
-        cursor.execute(
-            """
-            UPDATE tickets 
-            SET checked_in = TRUE, checked_in_at = UTC_TIMESTAMP(), checked_in_by = %s 
-            WHERE ticket_code = %s AND checked_in = FALSE
-            """,
-            (checked_in_by, ticket_code),
-        )
-        conn.commit()
-        affected_rows = cursor.rowcount
+        cursor = conn.cursor(dictionary=True)
+        cursor.execute("SELECT * FROM ticket_types ORDER BY sort_order, code")
+        ticket_types = cursor.fetchall()
+
+        # Convert datetime objects to string for JSON serialization
+        for ticket_type in ticket_types:
+            for key in ("sale_starts_at", "sale_ends_at", "updated_at"):
+                if ticket_type.get(key):
+                    ticket_type[key] = ticket_type[key].isoformat()
+            if "is_active" in ticket_type:
+                ticket_type["is_active"] = bool(ticket_type["is_active"])
+
         cursor.close()
-        return affected_rows > 0
+        return ticket_types
     finally:
         conn.close()
 
 
-def create_promo_code(
-    code, discount_type, discount_value, max_uses=None, valid_until=None
+def upsert_ticket_type(
+    code,
+    name,
+    price,
+    sale_starts_at=None,
+    sale_ends_at=None,
+    sort_order=0,
+    is_active=True,
 ):
-    """Create a new promo code."""
+    """Create or update a ticket type."""
     conn = get_conn()
     try:
+        create_ticket_types_table(conn)
         cursor = conn.cursor()
         cursor.execute(
             """
-            INSERT INTO promo_codes (code, discount_type, discount_value, max_uses, valid_until)
-            VALUES (%s, %s, %s, %s, %s)
+            INSERT INTO ticket_types
+                (code, name, price, sale_starts_at, sale_ends_at, sort_order, is_active, updated_at)
+            VALUES (%s, %s, %s, %s, %s, %s, %s, UTC_TIMESTAMP())
+            ON DUPLICATE KEY UPDATE
+                name = VALUES(name), price = VALUES(price),
+                sale_starts_at = VALUES(sale_starts_at), sale_ends_at = VALUES(sale_ends_at),
+                sort_order = VALUES(sort_order), is_active = VALUES(is_active),
+                updated_at = VALUES(updated_at)
             """,
-            (code, discount_type, discount_value, max_uses, valid_until),
+            (code, name, price, sale_starts_at, sale_ends_at, sort_order, is_active),
         )
         conn.commit()
         cursor.close()
         return True
-    except mysql.connector.Error as e:
-        if e.errno == 1062:  # Duplicate entry
-            raise ValueError("Promo code already exists")
+    except Exception as e:
+        conn.rollback()
         raise e
     finally:
         conn.close()
 
 
-def get_all_promo_codes():
-    """Get all promo codes for admin."""
-    conn = get_conn()
-    try:
+def create_events_table(conn):
+    """Create events table if it doesn't exist."""
+    cursor = conn.cursor()
+    cursor.execute(
+        """
+        CREATE TABLE IF NOT EXISTS events (
+            id INT AUTO_INCREMENT PRIMARY KEY,
+            code VARCHAR(50) NOT NULL UNIQUE,
+            title VARCHAR(255) NOT NULL,
+            starts_at DATETIME NOT NULL,
+            venue VARCHAR(255) DEFAULT NULL,
+            is_current BOOLEAN DEFAULT FALSE,
+            archived_at DATETIME DEFAULT NULL,
+            updated_at DATETIME NOT NULL DEFAULT CURRENT_TIMESTAMP
+        ) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4;
+        """
+    )
+    cursor.close()
+
+
+def seed_event(code, title, starts_at, venue):
+    """Insert the default event, as the current one, if the table is empty."""
+    conn = get_conn()
+    try:
+        create_events_table(conn)
+        cursor = conn.cursor()
+        cursor.execute("SELECT COUNT(*) FROM events")
+        (count,) = cursor.fetchone()
+        if count == 0:
+            cursor.execute(
+                """
+                INSERT INTO events (code, title, starts_at, venue, is_current, updated_at)
+                VALUES (%s, %s, %s, %s, TRUE, UTC_TIMESTAMP())
+                """,
+                (code, title, starts_at, venue),
+            )
+            conn.commit()
+        cursor.close()
+    finally:
+        conn.close()
+
+
+def get_events(include_archived=False):
+    """Events in date order (for the pricing snapshot and the events CLI)."""
+    conn = get_conn()
+    try:
+        cursor = conn.cursor(dictionary=True)
+        where = "" if include_archived else "WHERE archived_at IS NULL"
+        cursor.execute(
+            f"""
+            SELECT id, code, title, starts_at, venue, is_current, archived_at
+            FROM events {where} ORDER BY starts_at, id
+            """
+        )
+        events = cursor.fetchall()
+        cursor.close()
+        return events
+    finally:
+        conn.close()
+
+
+def get_event_by_code(code):
+    conn = get_conn()
+    try:
+        cursor = conn.cursor(dictionary=True)
+        cursor.execute(
+            """
+            SELECT id, code, title, starts_at, venue, is_current, archived_at
+            FROM events WHERE code = %s
+            """,
+            (code,),
+        )
+        event = cursor.fetchone()
+        cursor.close()
+        return event
+    finally:
+        conn.close()
+
+
+def create_event(code, title, starts_at, venue=None):
+    """Create a new event (not yet current; see set_current_event)."""
+    conn = get_conn()
+    try:
+        cursor = conn.cursor()
+        cursor.execute(
+            """
+            INSERT INTO events (code, title, starts_at, venue, updated_at)
+            VALUES (%s, %s, %s, %s, UTC_TIMESTAMP())
+            """,
+            (code, title, starts_at, venue),
+        )
+        conn.commit()
+        cursor.close()
+        return True
+    except Exception as e:
+        if is_duplicate_error(e):
+            raise ValueError("Event already exists")
+        raise e
+    finally:
+        conn.close()
+
+
+def set_current_event(code):
+    """Make event `code` the one new tickets are sold for; False if there's no such live event."""
+    conn = get_conn()
+    try:
+        cursor = conn.cursor()
+        cursor.execute(
+            "SELECT id FROM events WHERE code = %s AND archived_at IS NULL", (code,)
+        )
+        if cursor.fetchone() is None:
+            conn.rollback()
+            return False
+        cursor.execute(
+            "UPDATE events SET is_current = (code = %s), updated_at = UTC_TIMESTAMP()",
+            (code,),
+        )
+        conn.commit()
+        cursor.close()
+        return True
+    except Exception as e:
+        conn.rollback()
+        raise e
+    finally:
+        conn.close()
+
+
+def mark_event_archived(event_id):
+    conn = get_conn()
+    try:
+        cursor = conn.cursor()
+        cursor.execute(
+            """
+            UPDATE events
+            SET archived_at = UTC_TIMESTAMP(), is_current = FALSE, updated_at = UTC_TIMESTAMP()
+            WHERE id = %s
+            """,
+            (event_id,),
+        )
+        conn.commit()
+        cursor.close()
+    finally:
+        conn.close()
+
+
+# Tables that carry event_id, and the composite index (leading with
+# event_id) added with it; archive tables only need it to find an event
+EVENT_TABLES = {
+    "tickets": "event_id, created_at",
+    "manual_payments": "event_id, created_at",
+    "tickets_archive": "event_id",
+    "manual_payments_archive": "event_id",
+}
+
+
+def add_event_columns(conn, batch_size=500):
+    """
+    Add event_id and its index to tables that lack it, and assign rows
+    without one (written before events existed, or by older code) to the
+    current event.
+    """
+    cursor = conn.cursor()
+    for table, index_columns in EVENT_TABLES.items():
+        try:
+            cursor.execute(f"SELECT event_id FROM {table} LIMIT 0")
+            cursor.fetchall()
+        except Exception:
+            cursor.execute(f"ALTER TABLE {table} ADD COLUMN event_id INT")
+            index = "_".join(c.strip() for c in index_columns.split(","))
+            cursor.execute(f"CREATE INDEX idx_{table}_{index} ON {table}({index_columns})")
+            conn.commit()
+
+    cursor.execute("SELECT id FROM events WHERE is_current = TRUE ORDER BY id LIMIT 1")
+    row = cursor.fetchone()
+    if row is None:
+        cursor.close()
+        return
+    (event_id,) = row
+    for table in EVENT_TABLES:
+        while True:
+            cursor.execute(
+                f"SELECT id FROM {table} WHERE event_id IS NULL LIMIT {int(batch_size)}"
+            )
+            ids = [row_id for (row_id,) in cursor.fetchall()]
+            if not ids:
+                break
+            placeholders = ", ".join(["%s"] * len(ids))
+            cursor.execute(
+                f"UPDATE {table} SET event_id = %s WHERE id IN ({placeholders})",
+                [event_id] + ids,
+            )
+            conn.commit()
+    cursor.close()
+
+
+# Helpers below take an optional cursor: model functions that already hold
+# a connection pass theirs, so a request never checks out a second one
+# (with a pool of 1 that would wait for itself until DB_CHECKOUT_TIMEOUT)
+
+
+_PROMO_SQL = """
+    SELECT * FROM promo_codes
+    WHERE code = %s AND is_active = TRUE
+    AND (valid_until IS NULL OR valid_until >= UTC_TIMESTAMP())
+    AND (valid_from IS NULL OR valid_from <= UTC_TIMESTAMP())
+"""
+
+_USE_PROMO_SQL = "UPDATE promo_codes SET used_count = used_count + 1 WHERE code = %s"
+
+
+def get_promo_code(code, cursor=None):
+    """Get promo code details and validate it (cursor: a dictionary cursor)."""
+    if cursor is not None:
+        cursor.execute(_PROMO_SQL, (code,))
+        return cursor.fetchone()
+
+    conn = get_conn()
+    try:
+        cursor = conn.cursor(dictionary=True)
+        cursor.execute(_PROMO_SQL, (code,))
+        promo = cursor.fetchone()
+        cursor.close()
+        return promo
+    finally:
+        conn.close()
+
+
+def use_promo_code(code, cursor=None):
+    """
+    Increment the used_count for a promo code. With a cursor the update is
+    part of the caller's transaction, which commits it.
+    """
+    if cursor is not None:
+        cursor.execute(_USE_PROMO_SQL, (code,))
+        return True
+
+    conn = get_conn()
+    try:
+        cursor = conn.cursor()
+        cursor.execute(_USE_PROMO_SQL, (code,))
+        conn.commit()
+        cursor.close()
+        return True
+    except Exception as e:
+        conn.rollback()
+        raise e
+    finally:
+        conn.close()
+
+
+def promo_discount(total_price, promo):
+    """
+    (final_price, discount_amount) for a promo_codes row looked up with
+    _PROMO_SQL; no discount when it is missing or has reached max uses.
+    """
+    if not promo:
+        return total_price, 0
+
+    # Check if promo code has reached max uses
+    if promo["max_uses"] and promo["used_count"] >= promo["max_uses"]:
+        return total_price, 0
+
+    return apply_promo(total_price, promo)
+
+
+def calculate_discounted_price(base_price, promo_code, cursor=None):
+    """Calculate discounted price based on promo code."""
+    if not promo_code:
+        return base_price, 0
+    return promo_discount(base_price, get_promo_code(promo_code, cursor))
+
+
+# Shared with async_models.insert_ticket
+_TICKET_INSERT = """
+    INSERT INTO tickets
+        (user_email, name, phone, price, total_price, quantity, ticket_type,
+         reference, payment_status, ticket_code, promo_code, discount_amount, final_price,
+         event_id, email_lc, name_lc, surname_lc, phone_norm)
+    VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s)
+"""
+
+_INSERTED_TICKET_SQL = """
+    SELECT id, ticket_code, ticket_type, quantity, price, total_price,
+           discount_amount, final_price, promo_code, created_at
+    FROM tickets WHERE reference = %s
+"""
+
+
+def ticket_totals(
+    price, quantity, total_price=None, final_price=None, discount_amount=None
+):
+    """
+    (total_price, final_price, discount_amount) of a new ticket. final_price
+    is None when the promo code still has to be looked up and applied with
+    promo_discount().
+    """
+    # If total_price is not provided, calculate it
+    if total_price is None:
+        total_price = price * quantity
+    if final_price is not None and discount_amount is None:
+        discount_amount = total_price - final_price
+    return total_price, final_price, discount_amount
+
+
+def ticket_insert_params(
+    email,
+    name,
+    phone,
+    price,
+    reference,
+    ticket_type,
+    quantity,
+    total_price,
+    promo_code,
+    ticket_code,
+    final_price,
+    discount_amount,
+    event_id,
+):
+    """Parameters of _TICKET_INSERT for a pending ticket."""
+    return (
+        email,
+        name,
+        phone,
+        price,
+        total_price,
+        quantity,
+        ticket_type,
+        reference,
+        "pending",
+        ticket_code,
+        promo_code,
+        discount_amount,
+        final_price,
+        event_id,
+    ) + tuple(search_fields(email, name, phone).values())
+
+
+def insert_ticket(
+    email,
+    name,
+    phone,
+    price,
+    reference,
+    ticket_type="regular",
+    quantity=1,
+    total_price=None,
+    promo_code=None,
+    ticket_code=None,
+    final_price=None,
+    discount_amount=None,
+    event_id=None,
+):
+    """
+    Insert a new ticket record, for the current event unless event_id is given.
+
+    Callers that already priced the order (see routes.quote_order) or
+    generated the ticket code can pass them in to skip those lookups.
+    """
+    if event_id is None:
+        event_id = current_event().id
+    conn = get_conn()
+    try:
+        create_tickets_table(conn)
+        cursor = conn.cursor(dictionary=True)
+        if ticket_code is None:
+            ticket_code = generate_ticket_code(cursor)
+
+        total_price, final_price, discount_amount = ticket_totals(
+            price, quantity, total_price, final_price, discount_amount
+        )
+        if final_price is None:
+            # Calculate discount if promo code provided
+            final_price, discount_amount = calculate_discounted_price(
+                total_price, promo_code, cursor
+            )
+
+        if promo_code:
+            # Mark promo code as used
+            use_promo_code(promo_code, cursor)
+
+        cursor.execute(
+            _TICKET_INSERT,
+            ticket_insert_params(
+                email,
+                name,
+                phone,
+                price,
+                reference,
+                ticket_type,
+                quantity,
+                total_price,
+                promo_code,
+                ticket_code,
+                final_price,
+                discount_amount,
+                event_id,
+            ),
+        )
+        # Fetch the inserted record (same primary connection, so it sees
+        # the row even when admin reads go to a lagging replica)
+        cursor.execute(_INSERTED_TICKET_SQL, (reference,))
+        result = cursor.fetchone()
+        for statement in ticket_deltas(result, "pending"):
+            cursor.execute(*statement)
+        conn.commit()
+        metrics.inc("tickets_created_total", (("channel", "paystack"),))
+        cursor.close()
+        del result["created_at"]
+        return result
+    finally:
+        conn.close()
+
+
+def paid_event(ticket, reference, channel):
+    """Payload of the ticket.paid admin event."""
+    return {
+        "reference": reference,
+        "ticket_code": ticket["ticket_code"],
+        "ticket_type": ticket["ticket_type"],
+        "quantity": ticket["quantity"],
+        "final_price": ticket["final_price"],
+        "channel": channel,
+    }
+
+
+_LOCK_TICKET_SQL = """
+    SELECT ticket_code, payment_status, ticket_type, promo_code, quantity,
+           total_price, discount_amount, final_price, created_at
+    FROM tickets WHERE reference = %s FOR UPDATE
+"""
+
+# Matches no row if the status is already set, so only one of two
+# concurrent updates reports a change (on either engine)
+_SET_PAYMENT_STATUS_SQL = (
+    "UPDATE tickets SET payment_status = %s WHERE reference = %s AND payment_status <> %s"
+)
+
+
+def payment_status_statements(ticket, status):
+    """
+    Counter updates (and, once paid, admission rows) for moving a ticket
+    locked with _LOCK_TICKET_SQL to `status`.
+    """
+    if ticket["payment_status"] == status:
+        return []
+    statements = list(ticket_deltas(ticket, status, ticket["payment_status"]))
+    if status == "paid":
+        statements.extend(admission_inserts([ticket]))
+    return statements
+
+
+def update_ticket_payment_status(reference, status="paid"):
+    """Update ticket payment status."""
+    conn = get_conn()
+    try:
+        cursor = conn.cursor(dictionary=True)
+        cursor.execute(_LOCK_TICKET_SQL, (reference,))
+        ticket = cursor.fetchone()
+        cursor.execute(_SET_PAYMENT_STATUS_SQL, (status, reference, status))
+        affected_rows = cursor.rowcount
+        if affected_rows > 0:
+            for statement in payment_status_statements(ticket, status):
+                cursor.execute(*statement)
+        conn.commit()
+        cursor.close()
+        if affected_rows > 0 and status == "paid":
+            metrics.inc("tickets_paid_total", (("channel", "paystack"),))
+            publish("ticket.paid", paid_event(ticket, reference, "paystack"))
+        return affected_rows > 0
+    finally:
+        conn.close()
+
+
+_WAITLIST_STATUS_SQL = "SELECT id FROM waitlist WHERE email = %s"
+
+
+def check_waitlist_status(email):
+    """Check if an email exists in waitlist."""
+    conn = get_conn()
+    try:
+        cursor = conn.cursor()
+        cursor.execute(_WAITLIST_STATUS_SQL, (email,))
+        result = cursor.fetchone()
+        cursor.close()
+        return bool(result)
+    finally:
+        conn.close()
+
+
+_TICKET_BY_REFERENCE_SQL = """
+    SELECT user_email, name, phone, price, total_price, quantity, ticket_type,
+           ticket_code, payment_status, promo_code, discount_amount, final_price,
+           checked_in, checked_in_at, checked_in_by, event_id
+    FROM tickets WHERE reference = %s
+"""
+
+
+def get_ticket_by_reference(reference):
+    """Get ticket details by reference."""
+    conn = get_conn()
+    try:
+        cursor = conn.cursor(dictionary=True)
+        cursor.execute(_TICKET_BY_REFERENCE_SQL, (reference,))
+        result = cursor.fetchone()
+        cursor.close()
+        return result
+    finally:
+        conn.close()
+
+
+def get_ticket_by_code(ticket_code):
+    """Get ticket details by ticket code."""
+    conn = get_conn()
+    try:
+        cursor = conn.cursor(dictionary=True)
+        cursor.execute(
+            """
+            SELECT 
+                id,
+                user_email,
+                name,
+                phone,
+                ticket_type,
+                quantity,
+                price,
+                payment_status,
+                reference,
+                ticket_code,
+                created_at,
+                total_price,
+                promo_code,
+                discount_amount,
+                final_price,
+                checked_in,
+                checked_in_at,
+                checked_in_by,
+                admitted
+            FROM tickets WHERE ticket_code = %s
+            """,
+            (ticket_code,),
+        )
+        result = cursor.fetchone()
+
+        # Convert datetime objects to ISO format for JSON serialization
+        if result:
+            if result.get("created_at"):
+                result["created_at"] = result["created_at"].isoformat()
+            if result.get("checked_in_at"):
+                result["checked_in_at"] = result["checked_in_at"].isoformat()
+            # Convert tinyint(1) to boolean for checked_in
+            if "checked_in" in result:
+                result["checked_in"] = bool(result["checked_in"])
+
+        cursor.close()
+        return result
+    finally:
+        conn.close()
+
+
+def check_in_ticket(ticket_code, checked_in_by="admin", admit_all=False):
+    """
+    Check in a ticket (mark as used): every attendee of the order not yet
+    admitted. An order for more than one needs admit_all, the staff
+    override; its guests otherwise check in with their admission codes.
+    """
+    conn = get_conn()
+    try:
+        cursor = conn.cursor(dictionary=True)
+        cursor.execute(
+            "SELECT ticket_type, quantity, admitted FROM tickets WHERE ticket_code = %s FOR UPDATE",
+            (ticket_code,),
+        )
+        ticket = cursor.fetchone()
+        if (
+            not ticket
+            or ticket["admitted"] >= ticket["quantity"]
+            or (ticket["quantity"] > 1 and not admit_all)
+        ):
+            conn.rollback()
+            return False
+
+        cursor.execute(
+            """
+            UPDATE ticket_admissions
+            SET checked_in = TRUE, checked_in_at = UTC_TIMESTAMP(), checked_in_by = %s
+            WHERE ticket_code = %s AND checked_in = FALSE
+            """,
+            (checked_in_by, ticket_code),
+        )
+        cursor.execute(
+            """
+            UPDATE tickets 
+            SET admitted = quantity, checked_in = TRUE,
+                checked_in_at = COALESCE(checked_in_at, UTC_TIMESTAMP()),
+                checked_in_by = COALESCE(checked_in_by, %s)
+            WHERE ticket_code = %s
+            """,
+            (checked_in_by, ticket_code),
+        )
+        if ticket["admitted"] == 0:
+            cursor.execute(*stats_delta(ticket["ticket_type"], checked_in=1))
+        conn.commit()
+        cursor.close()
+    except Exception as e:
+        conn.rollback()
+        raise e
+    finally:
+        conn.close()
+
+    if ticket["admitted"] == 0:
+        metrics.inc("tickets_checked_in_total")
+    metrics.inc("admissions_checked_in_total", value=ticket["quantity"] - ticket["admitted"])
+    publish(
+        "ticket.checked_in",
+        {
+            "ticket_code": ticket_code,
+            "admitted": ticket["quantity"],
+            "quantity": ticket["quantity"],
+            "checked_in_by": checked_in_by,
+        },
+    )
+    return True
+
+
+# Per-attendee admission codes: an order for N people gets N admissions,
+# each with a random code (MA-XXXX-XXXX-XXXX-XXXX, 80 bits, so one can't be
+# guessed from the ticket code or another guest's). At that size they need
+# no uniqueness probe: a batch's codes come from one secrets call and are
+# inserted in one multi-row INSERT in the transaction that marks the order
+# paid; abandoned orders never get any.
+_ADMISSION_CODE = re.compile(r"^MA(?:-[A-HJ-NP-Z2-9]{4}){4}$")
+# No 0/O/1/I; 32 characters, so each random byte maps to one evenly
+_ADMISSION_CODE_CHARS = "ABCDEFGHJKLMNPQRSTUVWXYZ23456789"
+_ADMISSIONS_PER_INSERT = 1000
+
+
+def create_admissions_table(conn):
+    """
+    Create ticket_admissions, and the admitted head count on tickets and
+    tickets_archive, where they are missing (each checked on its own, so a
+    run that stopped part way is finished by the next).
+    """
+    cursor = conn.cursor()
+    try:
+        cursor.execute("SELECT admission_code FROM ticket_admissions LIMIT 0")
+        cursor.fetchall()
+    except Exception:
+        cursor.execute(
+            """
+            CREATE TABLE IF NOT EXISTS ticket_admissions (
+                admission_code VARCHAR(24) NOT NULL PRIMARY KEY,
+                ticket_code VARCHAR(20) NOT NULL,
+                seq INT NOT NULL,
+                checked_in BOOLEAN DEFAULT FALSE,
+                checked_in_at DATETIME DEFAULT NULL,
+                checked_in_by VARCHAR(255) DEFAULT NULL
+            ) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4;
+            """
+        )
+        # Also keeps INSERT IGNORE from adding an order's admissions twice
+        cursor.execute(
+            "CREATE UNIQUE INDEX idx_ticket_admissions_ticket_seq "
+            "ON ticket_admissions(ticket_code, seq)"
+        )
+        conn.commit()
+
+    for table in ("tickets", "tickets_archive"):
+        try:
+            cursor.execute(f"SELECT admitted FROM {table} LIMIT 0")
+            cursor.fetchall()
+        except Exception:
+            cursor.execute(f"ALTER TABLE {table} ADD COLUMN admitted INT NOT NULL DEFAULT 0")
+            # Orders checked in before admissions existed came in as a group
+            cursor.execute(f"UPDATE {table} SET admitted = quantity WHERE checked_in = TRUE")
+            conn.commit()
+    cursor.close()
+
+
+def new_admission_codes(count):
+    """`count` random admission codes."""
+    chars = _ADMISSION_CODE_CHARS
+    data = secrets.token_bytes(16 * count)
+    codes = []
+    for start in range(0, len(data), 16):
+        code = "".join(chars[b % 32] for b in data[start : start + 16])
+        codes.append(f"MA-{code[:4]}-{code[4:8]}-{code[8:12]}-{code[12:]}")
+    return codes
+
+
+def is_admission_code(code):
+    """True if code is shaped like an admission code (not a ticket code)."""
+    return bool(_ADMISSION_CODE.match(code or ""))
+
+
+def admission_inserts(tickets, checked_in=False):
+    """
+    Multi-row INSERTs, as a list of (sql, params), creating the admissions
+    of tickets (dicts with ticket_code and quantity). Existing admissions
+    are left alone.
+    """
+    seqs = [
+        (ticket["ticket_code"], seq)
+        for ticket in tickets
+        for seq in range(1, ticket["quantity"] + 1)
+    ]
+    rows = [
+        (code, ticket_code, seq, checked_in)
+        for (ticket_code, seq), code in zip(seqs, new_admission_codes(len(seqs)))
+    ]
+    statements = []
+    for start in range(0, len(rows), _ADMISSIONS_PER_INSERT):
+        chunk = rows[start : start + _ADMISSIONS_PER_INSERT]
+        values = ", ".join(["(%s, %s, %s, %s)"] * len(chunk))
+        statements.append(
+            (
+                "INSERT IGNORE INTO ticket_admissions "
+                f"(admission_code, ticket_code, seq, checked_in) VALUES {values}",
+                [value for row in chunk for value in row],
+            )
+        )
+    return statements
+
+
+def get_ticket_admissions(ticket_code):
+    conn = get_conn()
+    try:
+        cursor = conn.cursor(dictionary=True)
+        cursor.execute(
+            """
+            SELECT admission_code, seq, checked_in, checked_in_at, checked_in_by
+            FROM ticket_admissions WHERE ticket_code = %s ORDER BY seq
+            """,
+            (ticket_code,),
+        )
+        admissions = cursor.fetchall()
+        cursor.close()
+        for admission in admissions:
+            admission["checked_in"] = bool(admission["checked_in"])
+            if admission["checked_in_at"]:
+                admission["checked_in_at"] = admission["checked_in_at"].isoformat()
+        return admissions
+    finally:
+        conn.close()
+
+
+def get_admission_codes(ticket_codes):
+    """{ticket_code: its admission codes in seq order} for ticket_codes, in one query."""
+    ticket_codes = list(dict.fromkeys(ticket_codes))
+    if not ticket_codes:
+        return {}
+
+    conn = get_conn()
+    try:
+        cursor = conn.cursor()
+        placeholders = ", ".join(["%s"] * len(ticket_codes))
+        cursor.execute(
+            f"""
+            SELECT ticket_code, admission_code FROM ticket_admissions
+            WHERE ticket_code IN ({placeholders}) ORDER BY ticket_code, seq
+            """,
+            ticket_codes,
+        )
+        codes = {}
+        for ticket_code, admission_code in cursor.fetchall():
+            codes.setdefault(ticket_code, []).append(admission_code)
+        cursor.close()
+        return codes
+    finally:
+        conn.close()
+
+
+def get_admission_ticket_code(admission_code):
+    """The ticket code of the order an admission code belongs to, or None."""
+    if not is_admission_code(admission_code):
+        return None
+
+    conn = get_conn()
+    try:
+        cursor = conn.cursor()
+        cursor.execute(
+            "SELECT ticket_code FROM ticket_admissions WHERE admission_code = %s",
+            (admission_code,),
+        )
+        row = cursor.fetchone()
+        cursor.close()
+        return row[0] if row else None
+    finally:
+        conn.close()
+
+
+def check_in_admission(admission_code, checked_in_by="admin"):
+    """
+    Check in one attendee of an order by admission code. Returns
+    (checked in, admitted so far, quantity); False if the code is unknown
+    or was already used.
+    """
+    if not is_admission_code(admission_code):
+        return False, 0, 0
+
+    conn = get_conn()
+    try:
+        cursor = conn.cursor(dictionary=True)
+        cursor.execute(
+            "SELECT ticket_code FROM ticket_admissions WHERE admission_code = %s",
+            (admission_code,),
+        )
+        admission = cursor.fetchone()
+        if not admission:
+            conn.rollback()
+            return False, 0, 0
+        ticket_code = admission["ticket_code"]
+
+        cursor.execute(
+            """
+            SELECT ticket_type, quantity, admitted, payment_status FROM tickets
+            WHERE ticket_code = %s FOR UPDATE
+            """,
+            (ticket_code,),
+        )
+        ticket = cursor.fetchone()
+        if not ticket or ticket["payment_status"] != "paid":
+            conn.rollback()
+            return False, 0, 0
+
+        cursor.execute(
+            """
+            UPDATE ticket_admissions
+            SET checked_in = TRUE, checked_in_at = UTC_TIMESTAMP(), checked_in_by = %s
+            WHERE admission_code = %s AND checked_in = FALSE
+            """,
+            (checked_in_by, admission_code),
+        )
+        if cursor.rowcount == 0:
+            conn.rollback()
+            return False, ticket["admitted"], ticket["quantity"]
+
+        cursor.execute(
+            """
+            UPDATE tickets
+            SET admitted = admitted + 1, checked_in = TRUE,
+                checked_in_at = COALESCE(checked_in_at, UTC_TIMESTAMP()),
+                checked_in_by = COALESCE(checked_in_by, %s)
+            WHERE ticket_code = %s
+            """,
+            (checked_in_by, ticket_code),
+        )
+        if ticket["admitted"] == 0:
+            # The order counts as checked in from its first attendee
+            cursor.execute(*stats_delta(ticket["ticket_type"], checked_in=1))
+        conn.commit()
+        cursor.close()
+    except Exception as e:
+        conn.rollback()
+        raise e
+    finally:
+        conn.close()
+
+    admitted = ticket["admitted"] + 1
+    metrics.inc("admissions_checked_in_total")
+    if ticket["admitted"] == 0:
+        metrics.inc("tickets_checked_in_total")
+    publish(
+        "ticket.checked_in",
+        {
+            "ticket_code": ticket_code,
+            "admission_code": admission_code,
+            "admitted": admitted,
+            "quantity": ticket["quantity"],
+            "checked_in_by": checked_in_by,
+        },
+    )
+    return True, admitted, ticket["quantity"]
+
+
+def create_promo_code(
+    code, discount_type, discount_value, max_uses=None, valid_until=None
+):
+    """Create a new promo code."""
+    conn = get_conn()
+    try:
+        cursor = conn.cursor()
+        cursor.execute(
+            """
+            INSERT INTO promo_codes (code, discount_type, discount_value, max_uses, valid_until)
+            VALUES (%s, %s, %s, %s, %s)
+            """,
+            (code, discount_type, discount_value, max_uses, valid_until),
+        )
+        conn.commit()
+        cursor.close()
+        return True
+    except Exception as e:
+        if is_duplicate_error(e):  # Duplicate entry
+            raise ValueError("Promo code already exists")
+        raise e
+    finally:
+        conn.close()
+
+
+@read_only
+def get_all_promo_codes():
+    """Get all promo codes for admin."""
+    conn = get_conn()
+    try:
+        cursor = conn.cursor(dictionary=True)
+        cursor.execute("SELECT * FROM promo_codes ORDER BY created_at DESC")
+        promos = cursor.fetchall()
+
+        # Convert datetime objects to string for JSON serialization
+        for promo in promos:
+            if promo.get("created_at"):
+                promo["created_at"] = promo["created_at"].isoformat()
+            if promo.get("valid_from"):
+                promo["valid_from"] = (
+                    promo["valid_from"].isoformat() if promo["valid_from"] else None
+                )
+            if promo.get("valid_until"):
+                promo["valid_until"] = (
+                    promo["valid_until"].isoformat() if promo["valid_until"] else None
+                )
+
+        cursor.close()
+        return promos
+    finally:
+        conn.close()
+
+
+@read_only
+def get_all_tickets(event_id=None):
+    """Get all tickets (or one event's tickets) for admin."""
+    conn = get_conn()
+    try:
+        cursor = conn.cursor(dictionary=True)
+        where = "WHERE event_id = %s" if event_id is not None else ""
+        cursor.execute(
+            f"""
+            SELECT id, user_email, name, phone, price, total_price, final_price, discount_amount,
+                   quantity, ticket_type, ticket_code, payment_status, promo_code,
+                   checked_in, checked_in_at, checked_in_by, event_id, created_at
+            FROM tickets {where}
+            ORDER BY created_at DESC
+        """,
+            (event_id,) if event_id is not None else (),
+        )
+        tickets = cursor.fetchall()
+
+        # Convert datetime objects to string for JSON serialization
+        for ticket in tickets:
+            if ticket.get("created_at"):
+                ticket["created_at"] = ticket["created_at"].isoformat()
+            if ticket.get("checked_in_at"):
+                ticket["checked_in_at"] = ticket["checked_in_at"].isoformat()
+
+        cursor.close()
+        return tickets
+    finally:
+        conn.close()
+
+
+def _random_ticket_code():
+    random_chars = "".join(random.choices(string.ascii_uppercase + string.digits, k=6))
+    return f"MM-{random_chars}"
+
+
+def allocate_ticket_codes(conn, count, chunk_size=500):
+    """
+    `count` distinct unused ticket codes. Candidates are checked against
+    tickets and tickets_archive with one IN query per chunk rather than one
+    probe per code; only the (rare) collisions are redrawn.
+    """
+    cursor = conn.cursor()
+    codes = set()
+    while len(codes) < count:
+        candidates = list(
+            {_random_ticket_code() for _ in range(min(count - len(codes), chunk_size))}
+            - codes
+        )
+        placeholders = ", ".join(["%s"] * len(candidates))
+        cursor.execute(
+            f"SELECT ticket_code FROM tickets WHERE ticket_code IN ({placeholders}) "
+            f"UNION ALL SELECT ticket_code FROM tickets_archive "
+            f"WHERE ticket_code IN ({placeholders})",
+            candidates * 2,
+        )
+        taken = {row[0] for row in cursor.fetchall()}
+        codes.update(c for c in candidates if c not in taken)
+    cursor.close()
+    return list(codes)
+
+
+# Comp (guest list) tickets: free, issued as paid, one per guest per list
+_COMP_TICKET_INSERT = """
+    INSERT INTO tickets
+        (user_email, name, phone, price, total_price, quantity, ticket_type,
+         reference, payment_status, ticket_code, promo_code, discount_amount, final_price,
+         event_id, created_at, email_lc, name_lc, surname_lc, phone_norm)
+    VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s)
+"""
+
+
+def comp_reference(list_name, email):
+    """Reference of a guest's comp ticket; re-issuing a list skips guests already issued."""
+    return f"COMP-{list_name}-{email.strip().lower()}"
+
+
+def issue_comp_tickets(guests, list_name, event_id=None, chunk_size=500):
+    """
+    Issue paid, zero-price tickets to guests (dicts with name, email,
+    phone, ticket_type and quantity) in one transaction: existing
+    references are found with chunked IN queries, ticket codes are
+    allocated in bulk and all tickets go in one multi-row INSERT.
+
+    Returns (issued ticket dicts, emails that already had a ticket from
+    this list).
+    """
+    if event_id is None:
+        event_id = current_event().id
+    by_reference = {comp_reference(list_name, g["email"]): g for g in guests}
+    references = list(by_reference)
+
+    conn = get_conn()
+    try:
+        cursor = conn.cursor()
+        existing = set()
+        for start in range(0, len(references), chunk_size):
+            chunk = references[start : start + chunk_size]
+            placeholders = ", ".join(["%s"] * len(chunk))
+            cursor.execute(
+                f"SELECT reference FROM tickets WHERE reference IN ({placeholders})",
+                chunk,
+            )
+            existing.update(row[0] for row in cursor.fetchall())
+
+        new = [r for r in references if r not in existing]
+        tickets = []
+        if new:
+            # Set here rather than defaulted, so the counters don't need it read back
+            created_at = datetime.datetime.utcnow().replace(microsecond=0)
+            for reference, ticket_code in zip(new, allocate_ticket_codes(conn, len(new))):
+                guest = by_reference[reference]
+                tickets.append(
+                    {
+                        "user_email": guest["email"],
+                        "name": guest["name"],
+                        "phone": guest.get("phone"),
+                        "price": 0,
+                        "total_price": 0,
+                        "quantity": guest["quantity"],
+                        "ticket_type": guest["ticket_type"],
+                        "reference": reference,
+                        "ticket_code": ticket_code,
+                        "promo_code": None,
+                        "discount_amount": 0,
+                        "final_price": 0,
+                        "event_id": event_id,
+                        "created_at": created_at,
+                    }
+                )
+            # mysql.connector sends this as a single multi-row INSERT
+            cursor.executemany(
+                _COMP_TICKET_INSERT,
+                [
+                    (
+                        t["user_email"],
+                        t["name"],
+                        t["phone"],
+                        0,
+                        0,
+                        t["quantity"],
+                        t["ticket_type"],
+                        t["reference"],
+                        "paid",
+                        t["ticket_code"],
+                        None,
+                        0,
+                        0,
+                        event_id,
+                        created_at,
+                    )
+                    + tuple(search_fields(t["user_email"], t["name"], t["phone"]).values())
+                    for t in tickets
+                ],
+            )
+            for sql, params in batch_ticket_deltas(tickets, "paid"):
+                cursor.executemany(sql, params)
+            for statement in admission_inserts(tickets):
+                cursor.execute(*statement)
+        conn.commit()
+        cursor.close()
+    except Exception as e:
+        conn.rollback()
+        raise e
+    finally:
+        conn.close()
+
+    if tickets:
+        metrics.inc("tickets_created_total", (("channel", "comp"),), len(tickets))
+        publish("comps.issued", {"list": list_name, "count": len(tickets)})
+    already_issued = [by_reference[r]["email"] for r in references if r in existing]
+    return tickets, already_issued
+
+
+def generate_ticket_code(cursor=None):
+    """Generate a unique ticket code in the format MM-XXXXXX."""
+    if cursor is not None:
+        return _unused_ticket_code(cursor)
+
+    conn = get_conn()
+    try:
+        cursor = conn.cursor()
+        ticket_code = _unused_ticket_code(cursor)
+        cursor.close()
+        return ticket_code
+    finally:
+        conn.close()
+
+
+# Archived tickets keep their codes (an expired one can be restored)
+_TICKET_CODE_EXISTS_SQL = (
+    "SELECT 1 FROM tickets WHERE ticket_code = %s "
+    "UNION ALL SELECT 1 FROM tickets_archive WHERE ticket_code = %s"
+)
+
+
+def _unused_ticket_code(cursor):
+    while True:
+        ticket_code = _random_ticket_code()
+
+        # Check if code exists
+        cursor.execute(_TICKET_CODE_EXISTS_SQL, (ticket_code, ticket_code))
+        if not cursor.fetchone():
+            return ticket_code
+
+
+# Add this function to models.py after the existing functions
+
+
+def create_manual_payments_table(conn):
+    """Create manual_payments table if it doesn't exist."""
+    cursor = conn.cursor()
+    cursor.execute(
+        """
+        CREATE TABLE IF NOT EXISTS manual_payments (
+            id INT AUTO_INCREMENT PRIMARY KEY,
+            user_email VARCHAR(255) NOT NULL,
+            name VARCHAR(255) NOT NULL,
+            phone VARCHAR(50) NOT NULL,
+            ticket_type VARCHAR(20) NOT NULL,
+            quantity INT NOT NULL,
+            price DECIMAL(10,2) NOT NULL,
+            total_price DECIMAL(10,2) NOT NULL,
+            final_price DECIMAL(10,2) NOT NULL,
+            discount_amount DECIMAL(10,2) DEFAULT 0,
+            promo_code VARCHAR(50) DEFAULT NULL,
+            reference_code VARCHAR(10) NOT NULL UNIQUE,
+            payment_status ENUM('pending', 'confirmed', 'rejected') DEFAULT 'pending',
+            momo_number VARCHAR(20) NOT NULL,
+            admin_notes TEXT DEFAULT NULL,
+            confirmed_by VARCHAR(255) DEFAULT NULL,
+            confirmed_at DATETIME DEFAULT NULL,
+            created_at DATETIME NOT NULL DEFAULT CURRENT_TIMESTAMP
+        ) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4;
+        """
+    )
+    cursor.close()
+
+
+def insert_manual_payment(
+    email,
+    name,
+    phone,
+    ticket_type,
+    quantity,
+    price,
+    total_price,
+    final_price,
+    discount_amount,
+    promo_code,
+    momo_number,
+    event_id=None,
+):
+    """Insert a new manual payment record, for the current event unless event_id is given."""
+    if event_id is None:
+        event_id = current_event().id
+    conn = get_conn()
+    try:
+        create_manual_payments_table(conn)
         cursor = conn.cursor(dictionary=True)
-        cursor.execute("SELECT * FROM promo_codes ORDER BY created_at DESC")
-        promos = cursor.fetchall()
 
-        # Convert datetime objects to string for JSON serialization
-        for promo in promos:
-            if promo.get("created_at"):
-                promo["created_at"] = promo["created_at"].isoformat()
-            if promo.get("valid_from"):
-                promo["valid_from"] = (
-                    promo["valid_from"].isoformat() if promo["valid_from"] else None
-                )
-            if promo.get("valid_until"):
-                promo["valid_until"] = (
-                    promo["valid_until"].isoformat() if promo["valid_until"] else None
-                )
+        # Generate unique short reference code (6 characters)
+        reference_code = generate_short_reference_code(cursor)
+
+        cursor.execute(
+            """
+            INSERT INTO manual_payments 
+                (user_email, name, phone, ticket_type, quantity, price, total_price, 
+                 final_price, discount_amount, promo_code, reference_code, momo_number,
+                 event_id, email_lc, name_lc, surname_lc, phone_norm)
+            VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s)
+            """,
+            (
+                email,
+                name,
+                phone,
+                ticket_type,
+                quantity,
+                price,
+                total_price,
+                final_price,
+                discount_amount,
+                promo_code,
+                reference_code,
+                momo_number,
+                event_id,
+            )
+            + tuple(search_fields(email, name, phone).values()),
+        )
+        conn.commit()
+        publish(
+            "manual_payment.created",
+            {
+                "reference_code": reference_code,
+                "name": name,
+                "ticket_type": ticket_type,
+                "quantity": quantity,
+                "final_price": final_price,
+                "momo_number": momo_number,
+            },
+        )
+
+        # Return the reference code
+        return reference_code
+    finally:
+        conn.close()
 
+
+def generate_short_reference_code(cursor=None):
+    """Generate a unique short reference code (4 characters)."""
+    if cursor is not None:
+        return _unused_reference_code(cursor)
+
+    conn = get_conn()
+    try:
+        cursor = conn.cursor()
+        reference_code = _unused_reference_code(cursor)
         cursor.close()
-        return promos
+        return reference_code
+    finally:
+        conn.close()
+
+
+_REFERENCE_CODE_EXISTS_SQL = (
+    "SELECT 1 FROM manual_payments WHERE reference_code = %s "
+    "UNION ALL SELECT 1 FROM manual_payments_archive WHERE reference_code = %s"
+)
+
+
+def _unused_reference_code(cursor):
+    while True:
+        # Generate even shorter code (4 characters)
+        chars = string.ascii_uppercase + string.digits
+        # Remove similar-looking characters: 0, O, 1, I
+        chars = (
+            chars.replace("0", "")
+            .replace("O", "")
+            .replace("1", "")
+            .replace("I", "")
+        )
+        reference_code = "".join(random.choices(chars, k=4))
+
+        # Check if code exists in manual_payments, or in the archive (an
+        # expired payment can be restored under its code)
+        cursor.execute(_REFERENCE_CODE_EXISTS_SQL, (reference_code, reference_code))
+        if not cursor.fetchone():
+            return reference_code
+
+
+def manual_payment_key(reference_code):
+    """waiters key notified when this manual payment is confirmed or rejected."""
+    return f"manual_payment:{reference_code}"
+
+
+def get_manual_payment_by_reference(reference_code):
+    """Get manual payment details by reference code."""
+    conn = get_conn()
+    try:
+        cursor = conn.cursor(dictionary=True)
+        cursor.execute(
+            """
+            SELECT * FROM manual_payments WHERE reference_code = %s
+            """,
+            (reference_code,),
+        )
+        result = cursor.fetchone()
+
+        # Convert datetime objects to ISO format
+        if result:
+            _drop_search_columns(result)
+            if result.get("created_at"):
+                result["created_at"] = result["created_at"].isoformat()
+            if result.get("confirmed_at"):
+                result["confirmed_at"] = result["confirmed_at"].isoformat()
+
+        cursor.close()
+        return result
+    finally:
+        conn.close()
+
+
+@read_only
+def get_all_manual_payments(event_id=None):
+    """Get all manual payments (or one event's) for admin."""
+    conn = get_conn()
+    try:
+        cursor = conn.cursor(dictionary=True)
+        where = "WHERE event_id = %s" if event_id is not None else ""
+        cursor.execute(
+            f"""
+            SELECT * FROM manual_payments {where} ORDER BY created_at DESC
+            """,
+            (event_id,) if event_id is not None else (),
+        )
+        payments = cursor.fetchall()
+
+        # Convert datetime objects
+        for payment in payments:
+            _drop_search_columns(payment)
+            if payment.get("created_at"):
+                payment["created_at"] = payment["created_at"].isoformat()
+            if payment.get("confirmed_at"):
+                payment["confirmed_at"] = payment["confirmed_at"].isoformat()
+
+        cursor.close()
+        return payments
+    finally:
+        conn.close()
+
+
+_MANUAL_TICKET_INSERT = """
+    INSERT INTO tickets
+        (user_email, name, phone, price, total_price, quantity, ticket_type,
+         reference, payment_status, ticket_code, promo_code, discount_amount, final_price,
+         event_id, email_lc, name_lc, surname_lc, phone_norm)
+    VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s)
+"""
+
+
+def _manual_ticket_row(payment, ticket_code):
+    # Tickets from manual payments use MANUAL-<reference_code> as reference
+    return (
+        payment["user_email"],
+        payment["name"],
+        payment["phone"],
+        payment["price"],
+        payment["total_price"],
+        payment["quantity"],
+        payment["ticket_type"],
+        f"MANUAL-{payment['reference_code']}",
+        "paid",
+        ticket_code,
+        payment["promo_code"],
+        payment["discount_amount"],
+        payment["final_price"],
+        payment["event_id"],
+        payment["email_lc"],
+        payment["name_lc"],
+        payment["surname_lc"],
+        payment["phone_norm"],
+    )
+
+
+def get_pending_manual_payments():
+    """
+    Pending manual payments (the fields needed to match a MoMo statement).
+    Read from the primary: on a lagging replica a payment created a moment
+    ago would be missing from the match index, and one just confirmed would
+    still look pending.
+    """
+    conn = get_conn()
+    try:
+        cursor = conn.cursor(dictionary=True)
+        cursor.execute(
+            """
+            SELECT reference_code, final_price, momo_number, name, created_at
+            FROM manual_payments WHERE payment_status = 'pending'
+            """
+        )
+        payments = cursor.fetchall()
+        cursor.close()
+        return payments
+    finally:
+        conn.close()
+
+
+def get_expired_manual_payments(reference_codes):
+    """
+    The expired (archived) payments among reference_codes, with the fields
+    get_pending_manual_payments returns, so a late transfer can still be
+    matched (and its payment restored).
+    """
+    reference_codes = list(dict.fromkeys(reference_codes))
+    if not reference_codes:
+        return []
+
+    conn = get_conn()
+    try:
+        cursor = conn.cursor(dictionary=True)
+        placeholders = ", ".join(["%s"] * len(reference_codes))
+        cursor.execute(
+            f"""
+            SELECT reference_code, final_price, momo_number, name, created_at
+            FROM manual_payments_archive
+            WHERE reference_code IN ({placeholders}) AND archive_reason = 'expired'
+            """,
+            reference_codes,
+        )
+        payments = cursor.fetchall()
+        cursor.close()
+        return payments
+    finally:
+        conn.close()
+
+
+def confirm_manual_payments(reference_codes, confirmed_by, admin_notes=None):
+    """
+    Confirm many manual payments in one transaction: one SELECT ... FOR
+    UPDATE, one UPDATE, bulk-allocated ticket codes and a multi-row tickets
+    INSERT. Returns {reference_code: payment row + ticket_code} for the
+    payments confirmed; codes not found or no longer pending are left out.
+    """
+    reference_codes = list(dict.fromkeys(reference_codes))
+    if not reference_codes:
+        return {}
+
+    conn = get_conn()
+    try:
+        cursor = conn.cursor(dictionary=True)
+        placeholders = ", ".join(["%s"] * len(reference_codes))
+        cursor.execute(
+            f"""
+            SELECT * FROM manual_payments
+            WHERE reference_code IN ({placeholders}) AND payment_status = 'pending'
+            FOR UPDATE
+            """,
+            reference_codes,
+        )
+        payments = cursor.fetchall()
+        if not payments:
+            conn.rollback()
+            return {}
+
+        found = [p["reference_code"] for p in payments]
+        placeholders = ", ".join(["%s"] * len(found))
+        cursor.execute(
+            f"""
+            UPDATE manual_payments
+            SET payment_status = 'confirmed', confirmed_by = %s, confirmed_at = UTC_TIMESTAMP(),
+                admin_notes = %s
+            WHERE reference_code IN ({placeholders})
+            """,
+            [confirmed_by, admin_notes] + found,
+        )
+
+        ticket_codes = allocate_ticket_codes(conn, len(payments))
+        # mysql.connector sends this as a single multi-row INSERT
+        cursor.executemany(
+            _MANUAL_TICKET_INSERT,
+            [_manual_ticket_row(p, code) for p, code in zip(payments, ticket_codes)],
+        )
+
+        cursor.execute(
+            f"SELECT reference, created_at FROM tickets WHERE reference IN ({placeholders})",
+            [f"MANUAL-{code}" for code in found],
+        )
+        created_at = {row["reference"]: row["created_at"] for row in cursor.fetchall()}
+        tickets = [
+            dict(p, created_at=created_at[f"MANUAL-{p['reference_code']}"])
+            for p in payments
+        ]
+        for sql, params in batch_ticket_deltas(tickets, "paid"):
+            cursor.executemany(sql, params)
+        for statement in admission_inserts(
+            {"ticket_code": code, "quantity": p["quantity"]}
+            for p, code in zip(payments, ticket_codes)
+        ):
+            cursor.execute(*statement)
+
+        conn.commit()
+        cursor.close()
+    except Exception as e:
+        conn.rollback()
+        raise e
+    finally:
+        conn.close()
+
+    metrics.inc("tickets_created_total", (("channel", "manual"),), len(payments))
+    metrics.inc("tickets_paid_total", (("channel", "manual"),), len(payments))
+    confirmed = {}
+    for payment, ticket_code in zip(payments, ticket_codes):
+        notify(manual_payment_key(payment["reference_code"]))
+        confirmed[payment["reference_code"]] = dict(
+            _drop_search_columns(payment), ticket_code=ticket_code
+        )
+    # One event for the whole batch so a large import can't overflow (and
+    # evict) every admin event stream
+    publish(
+        "manual_payments.confirmed",
+        {
+            "confirmed_by": confirmed_by,
+            "payments": [
+                {"reference_code": code, "ticket_code": p["ticket_code"]}
+                for code, p in confirmed.items()
+            ],
+        },
+    )
+    return confirmed
+
+
+def confirm_manual_payment(reference_code, confirmed_by, admin_notes=None):
+    """Confirm a manual payment and create ticket."""
+    conn = get_conn()
+    try:
+        cursor = conn.cursor(dictionary=True)
+
+        # Get the manual payment
+        cursor.execute(
+            "SELECT * FROM manual_payments WHERE reference_code = %s AND payment_status = 'pending'",
+            (reference_code,),
+        )
+        payment = cursor.fetchone()
+
+        if not payment:
+            return False, "Payment not found or already processed"
+
+        # Update manual payment status
+        cursor.execute(
+            """
+            UPDATE manual_payments 
+            SET payment_status = 'confirmed', confirmed_by = %s, confirmed_at = UTC_TIMESTAMP(),
+                admin_notes = %s
+            WHERE reference_code = %s
+            """,
+            (confirmed_by, admin_notes, reference_code),
+        )
+
+        # Generate ticket code
+        ticket_code = generate_ticket_code(cursor)
+
+        # Insert into tickets table
+        cursor.execute(_MANUAL_TICKET_INSERT, _manual_ticket_row(payment, ticket_code))
+        cursor.execute(
+            "SELECT created_at FROM tickets WHERE id = %s", (cursor.lastrowid,)
+        )
+        ticket = dict(payment, **cursor.fetchone())
+        for statement in ticket_deltas(ticket, "paid"):
+            cursor.execute(*statement)
+        for statement in admission_inserts([dict(ticket, ticket_code=ticket_code)]):
+            cursor.execute(*statement)
+
+        conn.commit()
+        cursor.close()
+        metrics.inc("tickets_created_total", (("channel", "manual"),))
+        metrics.inc("tickets_paid_total", (("channel", "manual"),))
+        notify(manual_payment_key(reference_code))
+        publish(
+            "manual_payment.confirmed",
+            {
+                "reference_code": reference_code,
+                "ticket_code": ticket_code,
+                "confirmed_by": confirmed_by,
+            },
+        )
+        publish(
+            "ticket.paid",
+            paid_event(
+                dict(ticket, ticket_code=ticket_code),
+                f"MANUAL-{reference_code}",
+                "manual",
+            ),
+        )
+        return True, ticket_code
+
+    except Exception as e:
+        conn.rollback()
+        raise e
     finally:
         conn.close()
 
 
-def get_all_tickets():
-    """Get all tickets for admin."""
+def reject_manual_payments(reference_codes, confirmed_by, admin_notes=None):
+    """
+    Reject many pending manual payments with one UPDATE. Returns the set of
+    reference codes rejected; codes not found or no longer pending are left
+    out.
+    """
+    reference_codes = list(dict.fromkeys(reference_codes))
+    if not reference_codes:
+        return set()
+
     conn = get_conn()
     try:
-        cursor = conn.cursor(dictionary=True)
+        cursor = conn.cursor()
+        placeholders = ", ".join(["%s"] * len(reference_codes))
         cursor.execute(
-            """
-            SELECT id, user_email, name, phone, price, total_price, final_price, discount_amount,
-                   quantity, ticket_type, ticket_code, payment_status, promo_code,
-                   checked_in, checked_in_at, checked_in_by, created_at
-            FROM tickets 
-            ORDER BY created_at DESC
-        """
+            f"""
+            SELECT reference_code FROM manual_payments
+            WHERE reference_code IN ({placeholders}) AND payment_status = 'pending'
+            FOR UPDATE
+            """,
+            reference_codes,
         )
-        tickets = cursor.fetchall()
+        rejected = [row[0] for row in cursor.fetchall()]
+        if rejected:
+            placeholders = ", ".join(["%s"] * len(rejected))
+            cursor.execute(
+                f"""
+                UPDATE manual_payments
+                SET payment_status = 'rejected', confirmed_by = %s,
+                    confirmed_at = UTC_TIMESTAMP(), admin_notes = %s
+                WHERE reference_code IN ({placeholders})
+                """,
+                [confirmed_by, admin_notes] + rejected,
+            )
+        conn.commit()
+        cursor.close()
+    except Exception as e:
+        conn.rollback()
+        raise e
+    finally:
+        conn.close()
+
+    for code in rejected:
+        notify(manual_payment_key(code))
+    if rejected:
+        publish(
+            "manual_payments.rejected",
+            {"confirmed_by": confirmed_by, "reference_codes": rejected},
+        )
+    return set(rejected)
 
-        # Convert datetime objects to string for JSON serialization
-        for ticket in tickets:
-            if ticket.get("created_at"):
-                ticket["created_at"] = ticket["created_at"].isoformat()
-            if ticket.get("checked_in_at"):
-                ticket["checked_in_at"] = ticket["checked_in_at"].isoformat()
 
+def get_manual_payment_statuses(reference_codes):
+    """{reference_code: payment_status} for the codes that exist."""
+    conn = get_conn()
+    try:
+        cursor = conn.cursor()
+        placeholders = ", ".join(["%s"] * len(reference_codes))
+        cursor.execute(
+            f"SELECT reference_code, payment_status FROM manual_payments "
+            f"WHERE reference_code IN ({placeholders})",
+            list(reference_codes),
+        )
+        statuses = dict(cursor.fetchall())
         cursor.close()
-        return tickets
+        return statuses
     finally:
         conn.close()
 
 
-def generate_ticket_code():
-    """Generate a unique ticket code in the format MM-XXXXXX."""
+def reject_manual_payment(reference_code, confirmed_by, admin_notes=None):
+    """Reject a manual payment."""
     conn = get_conn()
     try:
         cursor = conn.cursor()
-        while True:
-            # Generate random code
-            random_chars = "".join(
-                random.choices(string.ascii_uppercase + string.digits, k=6)
-            )
-            ticket_code = f"MM-{random_chars}"
-
-            # Check if code exists
-            cursor.execute(
-                "SELECT 1 FROM tickets WHERE ticket_code = %s", (ticket_code,)
+        cursor.execute(
+            """
+            UPDATE manual_payments 
+            SET payment_status = 'rejected', confirmed_by = %s, confirmed_at = UTC_TIMESTAMP(),
+                admin_notes = %s
+            WHERE reference_code = %s
+            """,
+            (confirmed_by, admin_notes, reference_code),
+        )
+        conn.commit()
+        affected_rows = cursor.rowcount
+        cursor.close()
+        if affected_rows > 0:
+            notify(manual_payment_key(reference_code))
+            publish(
+                "manual_payment.rejected",
+                {"reference_code": reference_code, "confirmed_by": confirmed_by},
             )
-            if not cursor.fetchone():
-                cursor.close()
-                return ticket_code
+        return affected_rows > 0
     finally:
         conn.close()
 
 
-# Add this function to models.py after the existing functions
-
-
-def create_manual_payments_table(conn):
-    """Create manual_payments table if it doesn't exist."""
+# Expired (abandoned) pending rows are moved to these archive tables by
+# sweeper.py, and a finished event's rows by `flask events archive`. Column
+# lists are shared by the INSERT ... SELECT that moves rows in and the one
+# that restores a ticket paid after it expired.
+_TICKET_ARCHIVE_COLUMNS = (
+    "id, user_email, name, phone, price, total_price, quantity, ticket_type, "
+    "reference, payment_status, ticket_code, promo_code, discount_amount, final_price, "
+    "checked_in, checked_in_at, checked_in_by, created_at, event_id, admitted, "
+    "email_lc, name_lc, surname_lc, phone_norm"
+)
+_MANUAL_PAYMENT_ARCHIVE_COLUMNS = (
+    "id, user_email, name, phone, ticket_type, quantity, price, total_price, "
+    "final_price, discount_amount, promo_code, reference_code, payment_status, "
+    "momo_number, admin_notes, confirmed_by, confirmed_at, created_at, event_id, "
+    "email_lc, name_lc, surname_lc, phone_norm"
+)
+
+
+def create_archive_tables(conn):
+    """
+    Create the archive tables, and the (payment_status, created_at) indexes
+    the sweeper scans, on databases that don't have them yet.
+    """
     cursor = conn.cursor()
+    try:
+        cursor.execute("SELECT id FROM tickets_archive LIMIT 0")
+        cursor.fetchall()
+    except Exception:
+        pass
+    else:
+        cursor.close()
+        # Archives from before new ticket codes were checked against them
+        _add_missing_index(
+            conn,
+            "CREATE INDEX idx_tickets_archive_ticket_code ON tickets_archive(ticket_code)",
+        )
+        return
+
     cursor.execute(
         """
-        CREATE TABLE IF NOT EXISTS manual_payments (
-            id INT AUTO_INCREMENT PRIMARY KEY,
+        CREATE TABLE IF NOT EXISTS tickets_archive (
+            id INT NOT NULL PRIMARY KEY,
+            user_email VARCHAR(255) NOT NULL,
+            name VARCHAR(255),
+            phone VARCHAR(50),
+            price DECIMAL(10,2) NOT NULL,
+            total_price DECIMAL(10,2) NOT NULL,
+            quantity INT NOT NULL,
+            ticket_type VARCHAR(20) NOT NULL,
+            reference VARCHAR(255) NOT NULL,
+            payment_status VARCHAR(50) NOT NULL,
+            ticket_code VARCHAR(20) NOT NULL,
+            promo_code VARCHAR(50) DEFAULT NULL,
+            discount_amount DECIMAL(10,2) DEFAULT 0,
+            final_price DECIMAL(10,2) DEFAULT 0,
+            checked_in BOOLEAN DEFAULT FALSE,
+            checked_in_at DATETIME DEFAULT NULL,
+            checked_in_by VARCHAR(255) DEFAULT NULL,
+            created_at DATETIME NOT NULL,
+            email_lc VARCHAR(255),
+            name_lc VARCHAR(255),
+            surname_lc VARCHAR(255),
+            phone_norm VARCHAR(20),
+            archived_at DATETIME NOT NULL,
+            archive_reason VARCHAR(20) NOT NULL
+        ) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4;
+        """
+    )
+    cursor.execute(
+        """
+        CREATE TABLE IF NOT EXISTS manual_payments_archive (
+            id INT NOT NULL PRIMARY KEY,
             user_email VARCHAR(255) NOT NULL,
             name VARCHAR(255) NOT NULL,
             phone VARCHAR(50) NOT NULL,
@@ -511,234 +2498,327 @@ def create_manual_payments_table(conn):
             final_price DECIMAL(10,2) NOT NULL,
             discount_amount DECIMAL(10,2) DEFAULT 0,
             promo_code VARCHAR(50) DEFAULT NULL,
-            reference_code VARCHAR(10) NOT NULL UNIQUE,
-            payment_status ENUM('pending', 'confirmed', 'rejected') DEFAULT 'pending',
+            reference_code VARCHAR(10) NOT NULL,
+            payment_status VARCHAR(20) NOT NULL,
             momo_number VARCHAR(20) NOT NULL,
             admin_notes TEXT DEFAULT NULL,
             confirmed_by VARCHAR(255) DEFAULT NULL,
             confirmed_at DATETIME DEFAULT NULL,
-            created_at DATETIME NOT NULL DEFAULT CURRENT_TIMESTAMP
+            created_at DATETIME NOT NULL,
+            email_lc VARCHAR(255),
+            name_lc VARCHAR(255),
+            surname_lc VARCHAR(255),
+            phone_norm VARCHAR(20),
+            archived_at DATETIME NOT NULL,
+            archive_reason VARCHAR(20) NOT NULL
         ) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4;
         """
     )
+    cursor.execute("CREATE INDEX idx_tickets_archive_reference ON tickets_archive(reference)")
+    cursor.execute(
+        "CREATE INDEX idx_tickets_archive_ticket_code ON tickets_archive(ticket_code)"
+    )
+    cursor.execute(
+        "CREATE INDEX idx_manual_payments_archive_reference_code "
+        "ON manual_payments_archive(reference_code)"
+    )
+    # The sweeper's range scan: pending rows in creation order
+    cursor.execute(
+        "CREATE INDEX idx_tickets_status_created ON tickets(payment_status, created_at)"
+    )
+    cursor.execute(
+        "CREATE INDEX idx_manual_payments_status_created "
+        "ON manual_payments(payment_status, created_at)"
+    )
+    conn.commit()
     cursor.close()
 
 
-def insert_manual_payment(
-    email,
-    name,
-    phone,
-    ticket_type,
-    quantity,
-    price,
-    total_price,
-    final_price,
-    discount_amount,
-    promo_code,
-    momo_number,
-):
-    """Insert a new manual payment record."""
-    conn = get_conn()
+def _add_missing_index(conn, create_index_sql):
+    """Run a CREATE INDEX for tables created without it; a no-op if it exists."""
+    cursor = conn.cursor()
     try:
-        create_manual_payments_table(conn)
-        cursor = conn.cursor(dictionary=True)
+        cursor.execute(create_index_sql)
+        conn.commit()
+    except Exception:
+        # Already there
+        conn.rollback()
+    finally:
+        cursor.close()
 
-        # Generate unique short reference code (6 characters)
-        reference_code = generate_short_reference_code()
 
-        cursor.execute(
-            """
-            INSERT INTO manual_payments 
-                (user_email, name, phone, ticket_type, quantity, price, total_price, 
-                 final_price, discount_amount, promo_code, reference_code, momo_number) 
-            VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s)
-            """,
-            (
-                email,
-                name,
-                phone,
-                ticket_type,
-                quantity,
-                price,
-                total_price,
-                final_price,
-                discount_amount,
-                promo_code,
-                reference_code,
-                momo_number,
-            ),
-        )
-        conn.commit()
+_ARCHIVE_COLUMNS = {
+    "tickets": _TICKET_ARCHIVE_COLUMNS,
+    "manual_payments": _MANUAL_PAYMENT_ARCHIVE_COLUMNS,
+}
 
-        # Return the reference code
-        return reference_code
-    finally:
-        conn.close()
+
+def _move_to_archive(cursor, table, ids, reason):
+    """Copy rows `ids` of table into its archive table and delete them."""
+    columns = _ARCHIVE_COLUMNS[table]
+    placeholders = ", ".join(["%s"] * len(ids))
+    cursor.execute(
+        f"""
+        INSERT INTO {table}_archive ({columns}, archived_at, archive_reason)
+        SELECT {columns}, UTC_TIMESTAMP(), %s FROM {table} WHERE id IN ({placeholders})
+        """,
+        [reason] + list(ids),
+    )
+    cursor.execute(f"DELETE FROM {table} WHERE id IN ({placeholders})", list(ids))
 
 
-def generate_short_reference_code():
-    """Generate a unique short reference code (4 characters)."""
+def expire_pending_tickets(older_than, limit):
+    """
+    Archive up to `limit` tickets still pending since before older_than,
+    release their promo code uses and take them out of the counters, in one
+    short transaction. Returns the number of tickets expired.
+    """
     conn = get_conn()
     try:
-        cursor = conn.cursor()
-        while True:
-            # Generate even shorter code (4 characters)
-            chars = string.ascii_uppercase + string.digits
-            # Remove similar-looking characters: 0, O, 1, I
-            chars = (
-                chars.replace("0", "")
-                .replace("O", "")
-                .replace("1", "")
-                .replace("I", "")
+        cursor = conn.cursor(dictionary=True)
+        cursor.execute(
+            """
+            SELECT id, reference, ticket_code, ticket_type, promo_code, quantity,
+                   total_price, discount_amount, final_price, created_at
+            FROM tickets
+            WHERE payment_status = 'pending' AND created_at < %s
+            ORDER BY created_at LIMIT %s
+            FOR UPDATE
+            """,
+            (older_than, int(limit)),
+        )
+        tickets = cursor.fetchall()
+        if not tickets:
+            conn.rollback()
+            return 0
+
+        _move_to_archive(cursor, "tickets", [t["id"] for t in tickets], "expired")
+
+        promo_uses = Counter(t["promo_code"] for t in tickets if t["promo_code"])
+        if promo_uses:
+            cursor.executemany(
+                "UPDATE promo_codes SET used_count = GREATEST(used_count - %s, 0) "
+                "WHERE code = %s",
+                [(uses, code) for code, uses in promo_uses.items()],
             )
-            reference_code = "".join(random.choices(chars, k=4)) 
+        for sql, params in batch_ticket_deltas(tickets, "pending", sign=-1):
+            cursor.executemany(sql, params)
 
-            # Check if code exists in manual_payments
-            cursor.execute(
-                "SELECT 1 FROM manual_payments WHERE reference_code = %s",
-                (reference_code,),
-            )
-            if not cursor.fetchone():
-                cursor.close()
-                return reference_code
+        conn.commit()
+        cursor.close()
+    except Exception as e:
+        conn.rollback()
+        raise e
     finally:
         conn.close()
 
+    metrics.inc("pending_expired_total", (("kind", "ticket"),), len(tickets))
+    publish(
+        "tickets.expired",
+        {"references": [t["reference"] for t in tickets]},
+    )
+    return len(tickets)
 
-def get_manual_payment_by_reference(reference_code):
-    """Get manual payment details by reference code."""
+
+def expire_pending_manual_payments(older_than, limit):
+    """
+    Archive up to `limit` manual payments still pending since before
+    older_than, in one short transaction. Returns the number expired.
+    """
     conn = get_conn()
     try:
         cursor = conn.cursor(dictionary=True)
         cursor.execute(
             """
-            SELECT * FROM manual_payments WHERE reference_code = %s
+            SELECT id, reference_code FROM manual_payments
+            WHERE payment_status = 'pending' AND created_at < %s
+            ORDER BY created_at LIMIT %s
+            FOR UPDATE
             """,
-            (reference_code,),
+            (older_than, int(limit)),
         )
-        result = cursor.fetchone()
-
-        # Convert datetime objects to ISO format
-        if result:
-            if result.get("created_at"):
-                result["created_at"] = result["created_at"].isoformat()
-            if result.get("confirmed_at"):
-                result["confirmed_at"] = result["confirmed_at"].isoformat()
+        payments = cursor.fetchall()
+        if not payments:
+            conn.rollback()
+            return 0
 
+        _move_to_archive(cursor, "manual_payments", [p["id"] for p in payments], "expired")
+        conn.commit()
         cursor.close()
-        return result
+    except Exception as e:
+        conn.rollback()
+        raise e
     finally:
         conn.close()
 
+    metrics.inc("pending_expired_total", (("kind", "manual_payment"),), len(payments))
+    codes = [p["reference_code"] for p in payments]
+    for code in codes:
+        notify(manual_payment_key(code))
+    publish("manual_payments.expired", {"reference_codes": codes})
+    return len(payments)
+
 
-def get_all_manual_payments():
-    """Get all manual payments for admin."""
+def restore_expired_ticket(reference):
+    """
+    Move an expired ticket back from the archive as pending, for a Paystack
+    payment that completed after the sweeper expired it. Returns True if a
+    ticket was restored.
+    """
     conn = get_conn()
     try:
         cursor = conn.cursor(dictionary=True)
         cursor.execute(
             """
-            SELECT * FROM manual_payments ORDER BY created_at DESC
-            """
+            SELECT id, ticket_type, promo_code, quantity, total_price, discount_amount,
+                   final_price, created_at
+            FROM tickets_archive
+            WHERE reference = %s AND archive_reason = 'expired'
+            FOR UPDATE
+            """,
+            (reference,),
         )
-        payments = cursor.fetchall()
-
-        # Convert datetime objects
-        for payment in payments:
-            if payment.get("created_at"):
-                payment["created_at"] = payment["created_at"].isoformat()
-            if payment.get("confirmed_at"):
-                payment["confirmed_at"] = payment["confirmed_at"].isoformat()
+        ticket = cursor.fetchone()
+        if not ticket:
+            conn.rollback()
+            return False
 
+        cursor.execute(
+            f"""
+            INSERT INTO tickets ({_TICKET_ARCHIVE_COLUMNS})
+            SELECT {_TICKET_ARCHIVE_COLUMNS} FROM tickets_archive WHERE id = %s
+            """,
+            (ticket["id"],),
+        )
+        cursor.execute("DELETE FROM tickets_archive WHERE id = %s", (ticket["id"],))
+        if ticket["promo_code"]:
+            # Paid at the discounted price, so it counts as a use even if
+            # the code has since run out
+            cursor.execute(
+                "UPDATE promo_codes SET used_count = used_count + 1 WHERE code = %s",
+                (ticket["promo_code"],),
+            )
+        for statement in ticket_deltas(ticket, "pending"):
+            cursor.execute(*statement)
+        conn.commit()
         cursor.close()
-        return payments
+    except Exception as e:
+        conn.rollback()
+        if is_duplicate_error(e):
+            # Restored by a concurrent request
+            return True
+        raise e
     finally:
         conn.close()
 
+    metrics.inc("expired_tickets_restored_total")
+    return True
+
+
+def restore_expired_manual_payments(reference_codes):
+    """
+    Move expired manual payments back from the archive as pending, for MoMo
+    transfers that arrived after the sweeper expired them. Returns the
+    reference codes restored.
+    """
+    reference_codes = list(dict.fromkeys(reference_codes))
+    if not reference_codes:
+        return []
 
-def confirm_manual_payment(reference_code, confirmed_by, admin_notes=None):
-    """Confirm a manual payment and create ticket."""
     conn = get_conn()
     try:
         cursor = conn.cursor(dictionary=True)
-
-        # Get the manual payment
+        placeholders = ", ".join(["%s"] * len(reference_codes))
         cursor.execute(
-            "SELECT * FROM manual_payments WHERE reference_code = %s AND payment_status = 'pending'",
-            (reference_code,),
+            f"""
+            SELECT id, reference_code FROM manual_payments_archive
+            WHERE reference_code IN ({placeholders}) AND archive_reason = 'expired'
+            ORDER BY archived_at DESC
+            FOR UPDATE
+            """,
+            reference_codes,
         )
-        payment = cursor.fetchone()
-
-        if not payment:
-            return False, "Payment not found or already processed"
+        ids = {}
+        for row in cursor.fetchall():
+            # Codes from before the archive was checked for reuse may have
+            # been archived more than once: restore the latest
+            ids.setdefault(row["reference_code"], row["id"])
+        if ids:
+            # ... or be taken by a newer payment
+            cursor.execute(
+                f"SELECT reference_code FROM manual_payments "
+                f"WHERE reference_code IN ({', '.join(['%s'] * len(ids))})",
+                list(ids),
+            )
+            for row in cursor.fetchall():
+                del ids[row["reference_code"]]
+        if not ids:
+            conn.rollback()
+            return []
 
-        # Update manual payment status
+        placeholders = ", ".join(["%s"] * len(ids))
         cursor.execute(
-            """
-            UPDATE manual_payments 
-            SET payment_status = 'confirmed', confirmed_by = %s, confirmed_at = UTC_TIMESTAMP(),
-                admin_notes = %s
-            WHERE reference_code = %s
+            f"""
+            INSERT INTO manual_payments ({_MANUAL_PAYMENT_ARCHIVE_COLUMNS})
+            SELECT {_MANUAL_PAYMENT_ARCHIVE_COLUMNS} FROM manual_payments_archive
+            WHERE id IN ({placeholders})
             """,
-            (confirmed_by, admin_notes, reference_code),
+            list(ids.values()),
         )
-
-        # Generate ticket code
-        ticket_code = generate_ticket_code()
-
-        # Insert into tickets table
         cursor.execute(
-            """
-            INSERT INTO tickets 
-                (user_email, name, phone, price, total_price, quantity, ticket_type, 
-                 reference, payment_status, ticket_code, promo_code, discount_amount, final_price) 
-            VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s)
-            """,
-            (
-                payment["user_email"],
-                payment["name"],
-                payment["phone"],
-                payment["price"],
-                payment["total_price"],
-                payment["quantity"],
-                payment["ticket_type"],
-                f"MANUAL-{reference_code}",  # Use manual reference format
-                "paid",
-                ticket_code,
-                payment["promo_code"],
-                payment["discount_amount"],
-                payment["final_price"],
-            ),
+            f"DELETE FROM manual_payments_archive WHERE id IN ({placeholders})",
+            list(ids.values()),
         )
-
         conn.commit()
         cursor.close()
-        return True, ticket_code
-
     except Exception as e:
         conn.rollback()
+        if is_duplicate_error(e):
+            # Restored by a concurrent request
+            return list(ids)
         raise e
     finally:
         conn.close()
 
+    metrics.inc("expired_manual_payments_restored_total", value=len(ids))
+    return list(ids)
 
-def reject_manual_payment(reference_code, confirmed_by, admin_notes=None):
-    """Reject a manual payment."""
+
+def restore_expired_manual_payment(reference_code):
+    """restore_expired_manual_payments for one code; returns True if it was restored."""
+    return bool(restore_expired_manual_payments([reference_code]))
+
+
+def archive_event_rows(table, event_id, limit):
+    """
+    Move up to `limit` of an event's tickets or manual_payments rows to the
+    archive table in one short transaction. Returns the number moved.
+    """
     conn = get_conn()
     try:
         cursor = conn.cursor()
         cursor.execute(
-            """
-            UPDATE manual_payments 
-            SET payment_status = 'rejected', confirmed_by = %s, confirmed_at = UTC_TIMESTAMP(),
-                admin_notes = %s
-            WHERE reference_code = %s
-            """,
-            (confirmed_by, admin_notes, reference_code),
+            f"SELECT id FROM {table} WHERE event_id = %s ORDER BY id LIMIT %s FOR UPDATE",
+            (event_id, int(limit)),
         )
+        ids = [row_id for (row_id,) in cursor.fetchall()]
+        if ids and table == "tickets":
+            # Only the head count (tickets.admitted) is kept for archived orders
+            placeholders = ", ".join(["%s"] * len(ids))
+            cursor.execute(
+                f"""
+                DELETE FROM ticket_admissions WHERE ticket_code IN
+                    (SELECT ticket_code FROM tickets WHERE id IN ({placeholders}))
+                """,
+                ids,
+            )
+        if ids:
+            _move_to_archive(cursor, table, ids, "event_ended")
         conn.commit()
-        affected_rows = cursor.rowcount
         cursor.close()
-        return affected_rows > 0
+        return len(ids)
+    except Exception as e:
+        conn.rollback()
+        raise e
     finally:
         conn.close()
@@ -0,0 +1,139 @@
+"""
+MoMo statement import.
+
+parse_statement() reads a MoMo statement export (CSV). Exports differ in
+their column names, so the reference/message and amount columns are found
+by header (or named explicitly). match_statement() indexes the pending
+manual payments by reference code and pairs each credit line with the
+payment whose code appears in its reference and whose final_price equals
+the amount paid.
+"""
+
+import csv
+import io
+import re
+from decimal import Decimal, InvalidOperation
+
+REFERENCE_HEADERS = ("reference", "message", "narration", "note", "description", "details")
+AMOUNT_HEADERS = ("amount", "credit", "amount (ghs)", "credit amount")
+TRANSACTION_HEADERS = ("transaction id", "financial transaction id", "transaction_id", "id")
+
+# Manual payment reference codes: 4 characters without 0/O/1/I (see
+# models.generate_short_reference_code)
+_REFERENCE_CODE = re.compile(r"\b[A-HJ-NP-Z2-9]{4}\b")
+
+
+class StatementError(ValueError):
+    """Raised when a statement can't be read."""
+
+
+def find_column(headers, candidates, override=None):
+    by_name = {h.strip().lower(): h for h in headers if h}
+    if override:
+        column = by_name.get(override.strip().lower())
+        if column is None:
+            raise StatementError(f"Column '{override}' not found in statement")
+        return column
+    for candidate in candidates:
+        if candidate in by_name:
+            return by_name[candidate]
+    # e.g. "Amount Received" or "Transaction Reference"
+    for candidate in candidates:
+        for name, column in by_name.items():
+            if candidate in name:
+                return column
+    return None
+
+
+def parse_amount(text):
+    """'GHS 1,500.00' -> Decimal('1500.00'); None if there is no number."""
+    cleaned = re.sub(r"[^\d.\-]", "", text or "")
+    try:
+        return Decimal(cleaned)
+    except InvalidOperation:
+        return None
+
+
+def parse_statement(text, reference_column=None, amount_column=None):
+    """Statement lines as dicts with line, transaction_id, reference and amount."""
+    reader = csv.DictReader(io.StringIO(text.lstrip("\ufeff")))
+    if not reader.fieldnames:
+        raise StatementError("Statement is empty")
+
+    reference = find_column(reader.fieldnames, REFERENCE_HEADERS, reference_column)
+    amount = find_column(reader.fieldnames, AMOUNT_HEADERS, amount_column)
+    if reference is None or amount is None:
+        raise StatementError(
+            "Could not find the reference and amount columns; "
+            "pass reference_column and amount_column"
+        )
+    transaction = find_column(reader.fieldnames, TRANSACTION_HEADERS)
+
+    return [
+        {
+            "line": number,
+            "transaction_id": row.get(transaction) if transaction else None,
+            "reference": (row.get(reference) or "").strip(),
+            "amount": parse_amount(row.get(amount)),
+        }
+        # Line 1 is the header
+        for number, row in enumerate(reader, start=2)
+    ]
+
+
+def statement_reference_codes(lines):
+    """Every string in the lines' references that could be a reference code."""
+    return {
+        code for line in lines for code in _REFERENCE_CODE.findall(line["reference"].upper())
+    }
+
+
+def match_statement(lines, pending):
+    """
+    Pair statement lines with pending manual payments.
+
+    Returns (matches, outcomes): matches maps reference_code to the line
+    that paid it; outcomes has one entry per line with its status
+    (matched, not_a_credit, no_matching_reference, ambiguous_reference,
+    duplicate or amount_mismatch).
+    """
+    by_code = {p["reference_code"]: p for p in pending}
+    matches = {}
+    outcomes = []
+    for line in lines:
+        amount = line["amount"]
+        outcome = {
+            "line": line["line"],
+            "transaction_id": line["transaction_id"],
+            "amount": str(amount) if amount is not None else None,
+        }
+        outcomes.append(outcome)
+        if amount is None or amount <= 0:
+            outcome["status"] = "not_a_credit"
+            continue
+
+        codes = {
+            code
+            for code in _REFERENCE_CODE.findall(line["reference"].upper())
+            if code in by_code
+        }
+        if not codes:
+            outcome["status"] = "no_matching_reference"
+            continue
+        if len(codes) > 1:
+            outcome["status"] = "ambiguous_reference"
+            outcome["reference_codes"] = sorted(codes)
+            continue
+
+        code = codes.pop()
+        outcome["reference_code"] = code
+        expected = Decimal(str(by_code[code]["final_price"]))
+        if code in matches:
+            outcome["status"] = "duplicate"
+        elif amount != expected:
+            outcome["status"] = "amount_mismatch"
+            outcome["expected"] = str(expected)
+        else:
+            outcome["status"] = "matched"
+            matches[code] = line
+    return matches, outcomes
@@ -0,0 +1,246 @@
+"""
+MySQL storage backend.
+
+A small connection manager tuned for serverless containers, used instead of
+mysql.connector's MySQLConnectionPool:
+
+* connections are opened on demand, up to DB_POOL_SIZE (1 with
+  DB_SINGLE_CONNECTION, so a fleet of lambdas holds one connection each);
+* checkout waits up to DB_CHECKOUT_TIMEOUT for a free connection instead
+  of failing as soon as the pool is busy;
+* a connection that sat idle longer than DB_PING_AFTER_SECONDS is pinged
+  (and reconnected) before use, while recently used ones are handed out
+  without a round trip;
+* if the server dropped the connection anyway, a statement that hits
+  "server has gone away" is retried once on a fresh connection, as long
+  as nothing has been written or locked in the current transaction.
+"""
+
+import queue
+import re
+import threading
+import time
+
+# 2006: server has gone away, 2013: lost connection during query,
+# 2055: lost connection to server
+LOST_CONNECTION_ERRNOS = (2006, 2013, 2055)
+
+# Reads that take row locks: after one, a reconnect would silently drop the lock
+_LOCKING_READ = re.compile(r"\bFOR\s+(?:UPDATE|SHARE)\b|\bLOCK\s+IN\s+SHARE\s+MODE\b", re.I)
+
+
+def _is_lost_connection(error):
+    import mysql.connector
+
+    return (
+        isinstance(error, (mysql.connector.OperationalError, mysql.connector.InterfaceError))
+        and error.errno in LOST_CONNECTION_ERRNOS
+    )
+
+
+class ManagedCursor:
+    """Cursor that retries once on a dropped connection when it is safe."""
+
+    def __init__(self, conn, kwargs):
+        self._conn = conn
+        self._kwargs = kwargs
+        self._cursor = conn._cnx.cursor(**kwargs)
+
+    def __getattr__(self, name):
+        return getattr(self._cursor, name)
+
+    def __iter__(self):
+        return iter(self._cursor)
+
+    def _run(self, method, sql, params):
+        is_read = sql.lstrip()[:6].upper() == "SELECT" and not _LOCKING_READ.search(sql)
+        try:
+            result = getattr(self._cursor, method)(sql, params)
+        except Exception as e:
+            if self._conn._dirty or not _is_lost_connection(e):
+                raise
+            self._conn._reconnect()
+            self._cursor = self._conn._cnx.cursor(**self._kwargs)
+            result = getattr(self._cursor, method)(sql, params)
+        if not is_read:
+            self._conn._dirty = True
+        return result
+
+    def execute(self, sql, params=None):
+        return self._run("execute", sql, params)
+
+    def executemany(self, sql, seq_params):
+        return self._run("executemany", sql, seq_params)
+
+
+class ManagedConnection:
+    """A checked-out connection; close() hands it back to the manager."""
+
+    def __init__(self, backend, cnx):
+        self._backend = backend
+        self._cnx = cnx
+        # Uncommitted writes or row locks since the last commit/rollback
+        self._dirty = False
+
+    def __getattr__(self, name):
+        return getattr(self._cnx, name)
+
+    def cursor(self, **kwargs):
+        return ManagedCursor(self, kwargs)
+
+    def commit(self):
+        self._cnx.commit()
+        self._dirty = False
+
+    def rollback(self):
+        self._cnx.rollback()
+        self._dirty = False
+
+    def _reconnect(self):
+        self._backend.reconnects += 1
+        self._cnx.reconnect(attempts=2, delay=0)
+
+    def close(self):
+        cnx, self._cnx = self._cnx, None
+        if cnx is not None:
+            self._backend._release(cnx)
+
+
+class ServerLock:
+    """A GET_LOCK lock, held for as long as its connection stays open."""
+
+    def __init__(self, cnx, name):
+        self._cnx = cnx
+        self.name = name
+
+    def held(self):
+        """False once the connection (and with it the lock) was lost."""
+        try:
+            cursor = self._cnx.cursor()
+            cursor.execute("SELECT IS_USED_LOCK(%s) = CONNECTION_ID()", (self.name,))
+            (held,) = cursor.fetchone()
+            cursor.close()
+            return held == 1
+        except Exception:
+            return False
+
+    def release(self):
+        try:
+            self._cnx.close()
+        except Exception:
+            pass
+
+
+class MySQLBackend:
+    """Bounded, lazily filled set of MySQL connections."""
+
+    name = "mysql"
+
+    def __init__(
+        self,
+        dbconfig,
+        pool_size=5,
+        checkout_timeout=10,
+        ping_after_seconds=30,
+        single_connection=False,
+    ):
+        self.dbconfig = dbconfig
+        self.pool_size = 1 if single_connection else pool_size
+        self.checkout_timeout = checkout_timeout
+        self.ping_after_seconds = ping_after_seconds
+        self.reconnects = 0
+        self._idle = queue.LifoQueue()  # (cnx, last_used); LIFO keeps a warm few
+        self._slots = threading.BoundedSemaphore(self.pool_size)
+        self._lock = threading.Lock()
+        self._in_use = 0
+
+    def _connect(self):
+        import mysql.connector
+
+        return mysql.connector.connect(**self.dbconfig)
+
+    def get_connection(self):
+        if not self._slots.acquire(timeout=self.checkout_timeout):
+            raise RuntimeError(
+                f"No database connection free after {self.checkout_timeout}s"
+            )
+        try:
+            try:
+                cnx, last_used = self._idle.get_nowait()
+            except queue.Empty:
+                cnx = self._connect()
+            else:
+                if time.monotonic() - last_used > self.ping_after_seconds:
+                    # Idle long enough that the server may have dropped it
+                    try:
+                        cnx.ping(reconnect=True, attempts=2, delay=0)
+                    except Exception:
+                        cnx = self._connect()
+                        self.reconnects += 1
+        except Exception:
+            self._slots.release()
+            raise
+
+        with self._lock:
+            self._in_use += 1
+        return ManagedConnection(self, cnx)
+
+    def _release(self, cnx):
+        try:
+            if cnx.in_transaction:
+                cnx.rollback()
+            self._idle.put((cnx, time.monotonic()))
+        except Exception:
+            # Broken connection: drop it, a new one is opened on demand
+            try:
+                cnx.close()
+            except Exception:
+                pass
+        finally:
+            with self._lock:
+                self._in_use -= 1
+            self._slots.release()
+
+    def in_use(self):
+        return self._in_use
+
+    def column_names(self, cursor, table):
+        """Names of `table`'s columns, from information_schema."""
+        cursor.execute(
+            "SELECT COLUMN_NAME FROM information_schema.COLUMNS "
+            "WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = %s",
+            (table,),
+        )
+        return {row[0] for row in cursor.fetchall()}
+
+    def is_connection_error(self, error):
+        """True if get_connection() failed to reach the server (not a busy pool)."""
+        import mysql.connector
+
+        return isinstance(error, (mysql.connector.Error, OSError))
+
+    def try_lock(self, name):
+        """
+        Take the lock `name` for this database (GET_LOCK, whose names are
+        server-wide) on a connection of its own, outside the pool. Returns a
+        ServerLock, or None if another session holds it.
+        """
+        name = f"{self.dbconfig.get('database')}.{name}"
+        cnx = self._connect()
+        try:
+            cursor = cnx.cursor()
+            cursor.execute("SELECT GET_LOCK(%s, 0)", (name,))
+            (acquired,) = cursor.fetchone()
+            cursor.close()
+        except Exception:
+            cnx.close()
+            raise
+        if acquired != 1:
+            cnx.close()
+            return None
+        return ServerLock(cnx, name)
+
+    def is_duplicate_error(self, error):
+        import mysql.connector
+
+        return isinstance(error, mysql.connector.Error) and error.errno == 1062
@@ -0,0 +1,291 @@
+"""
+Ticket pricing.
+
+Ticket types live in the `ticket_types` table but are served from an
+immutable in-memory snapshot, so quoting a price never touches the database
+(apart from loading the snapshot the first time it is needed).
+The snapshot is swapped atomically whenever the table changes (admin edits
+call reload_pricing(); a background refresher picks up edits made elsewhere).
+
+The snapshot also holds the live rows of the `events` table, so stamping a
+new ticket with the current event, or filling in an event's title, date and
+venue in its confirmation email, doesn't cost a query either.
+"""
+
+import datetime
+import threading
+import time
+from collections import namedtuple
+from decimal import Decimal
+from types import MappingProxyType
+
+from flask import current_app
+
+from .db import on_first_connect
+
+
+TicketType = namedtuple(
+    "TicketType",
+    ["code", "name", "price", "sale_starts_at", "sale_ends_at", "sort_order"],
+)
+
+# Used to seed an empty ticket_types table and as a fallback if it can't be read
+DEFAULT_TICKET_TYPES = (
+    TicketType("early_bird", "Early Bird", 100, None, None, 0),
+    TicketType("regular", "Regular", 150, None, None, 1),
+    TicketType("late", "Late", 200, None, None, 2),
+)
+
+
+Event = namedtuple("Event", ["id", "code", "title", "starts_at", "venue"])
+
+
+class PricingError(ValueError):
+    """Raised when a quote can't be produced (unknown type, bad promo, ...)."""
+
+
+class PricingSnapshot:
+    """Read-only view of the ticket types at a point in time."""
+
+    __slots__ = ("ticket_types", "events", "current_event", "version", "loaded_at")
+
+    def __init__(self, ticket_types, version=None, events=(), current_event=None):
+        ordered = sorted(ticket_types, key=lambda t: (t.sort_order, t.code))
+        self.ticket_types = MappingProxyType({t.code: t for t in ordered})
+        self.events = MappingProxyType({e.id: e for e in events})
+        self.current_event = current_event
+        self.version = version
+        self.loaded_at = datetime.datetime.utcnow()
+
+
+_snapshot = PricingSnapshot(DEFAULT_TICKET_TYPES)
+_refresher = None
+_loaded = False
+_load_lock = threading.Lock()
+
+
+def current_snapshot():
+    return _snapshot
+
+
+def _as_number(value):
+    # Keep whole-cedi prices as ints so API responses look the same as before
+    if isinstance(value, Decimal) and value == value.to_integral_value():
+        return int(value)
+    return value
+
+
+def _row_to_ticket_type(row):
+    return TicketType(
+        code=row["code"],
+        name=row["name"],
+        price=_as_number(row["price"]),
+        sale_starts_at=row.get("sale_starts_at"),
+        sale_ends_at=row.get("sale_ends_at"),
+        sort_order=row.get("sort_order") or 0,
+    )
+
+
+def _row_to_event(row):
+    return Event(
+        id=row["id"],
+        code=row["code"],
+        title=row["title"],
+        starts_at=row["starts_at"],
+        venue=row["venue"],
+    )
+
+
+def reload_pricing():
+    """Rebuild the snapshot from the database and swap it in."""
+    global _snapshot
+    from .models import get_active_ticket_types, get_events, get_ticket_types_version
+
+    version = get_ticket_types_version()
+    rows = get_active_ticket_types()
+    event_rows = get_events()
+    events = [_row_to_event(r) for r in event_rows]
+    current = next((e for e, r in zip(events, event_rows) if r["is_current"]), None)
+    if not rows:
+        current_app.logger.warning("No active ticket types, using defaults")
+        _snapshot = PricingSnapshot(DEFAULT_TICKET_TYPES, version, events, current)
+        return _snapshot
+
+    _snapshot = PricingSnapshot(
+        [_row_to_ticket_type(r) for r in rows], version, events, current
+    )
+    return _snapshot
+
+
+def _refresh_loop(app, interval):
+    from .models import get_ticket_types_version
+
+    while True:
+        time.sleep(interval)
+        try:
+            with app.app_context():
+                if get_ticket_types_version() != _snapshot.version:
+                    reload_pricing()
+                    app.logger.info("Pricing snapshot reloaded")
+        except Exception as e:
+            app.logger.warning(f"Pricing refresh failed: {e}")
+
+
+def init_pricing(app):
+    """Note the refresh interval; the snapshot itself loads on first use."""
+    app.extensions["pricing_refresh_seconds"] = (
+        app.config.get("PRICING_REFRESH_SECONDS") or 0
+    )
+
+
+@on_first_connect
+def _seed_ticket_types():
+    from .models import seed_ticket_types
+
+    seed_ticket_types(DEFAULT_TICKET_TYPES)
+
+
+def default_event():
+    """The event configured by EVENT_* settings, used to seed the events table."""
+    config = current_app.config
+    return Event(
+        id=None,
+        code=config["EVENT_CODE"],
+        title=config["EVENT_TITLE"],
+        starts_at=datetime.datetime.fromisoformat(config["EVENT_DATE"]),
+        venue=config["EVENT_VENUE"],
+    )
+
+
+@on_first_connect
+def _seed_event():
+    from .models import seed_event
+
+    event = default_event()
+    seed_event(event.code, event.title, event.starts_at, event.venue)
+
+
+def _ensure_loaded():
+    """Load the snapshot from the database once per process."""
+    global _loaded, _refresher
+    if _loaded:
+        return
+
+    with _load_lock:
+        if _loaded:
+            return
+        app = current_app._get_current_object()
+        interval = app.extensions.get("pricing_refresh_seconds", 0)
+        if interval > 0 and _refresher is None:
+            _refresher = threading.Thread(
+                target=_refresh_loop, args=(app, interval), daemon=True
+            )
+            _refresher.start()
+        try:
+            reload_pricing()
+        except Exception as e:
+            # Serve the defaults for now; the next call tries again
+            current_app.logger.warning(f"Failed to load ticket pricing: {e}")
+            return
+        _loaded = True
+
+
+def current_event():
+    """The event new tickets are sold for."""
+    _ensure_loaded()
+    return _snapshot.current_event or default_event()
+
+
+def get_event(event_id):
+    """A live event by id, falling back to the current event."""
+    _ensure_loaded()
+    return _snapshot.events.get(event_id) or current_event()
+
+
+def format_event_date(event):
+    """October 31, 2025"""
+    return f"{event.starts_at:%B} {event.starts_at.day}, {event.starts_at.year}"
+
+
+def is_on_sale(ticket_type, now=None):
+    now = now or datetime.datetime.utcnow()
+    if ticket_type.sale_starts_at and now < ticket_type.sale_starts_at:
+        return False
+    if ticket_type.sale_ends_at and now >= ticket_type.sale_ends_at:
+        return False
+    return True
+
+
+def get_ticket_type(code):
+    _ensure_loaded()
+    return _snapshot.ticket_types.get(code)
+
+
+def available_ticket_types(now=None):
+    """Ticket types currently on sale, in display order."""
+    _ensure_loaded()
+    return [t for t in _snapshot.ticket_types.values() if is_on_sale(t, now)]
+
+
+def default_ticket_type(now=None):
+    """The first tier on sale, e.g. early bird until its window closes."""
+    available = available_ticket_types(now)
+    if available:
+        return available[0].code
+    return "regular"
+
+
+def check_promo(promo):
+    """Validate a promo_codes row fetched with get_promo_code()."""
+    if not promo:
+        raise PricingError("Invalid or expired promo code")
+
+    # Check if promo code has reached max uses
+    if promo["max_uses"] and promo["used_count"] >= promo["max_uses"]:
+        raise PricingError("Promo code has reached maximum uses")
+
+
+def apply_promo(total_price, promo):
+    """Return (final_price, discount_amount) for a validated promo."""
+    discount_value = promo["discount_value"]
+    if isinstance(total_price, float):
+        # JSON amounts arrive as floats; DECIMAL columns come back as Decimal
+        discount_value = float(discount_value)
+
+    if promo["discount_type"] == "percentage":
+        discount_amount = total_price * (discount_value / 100)
+    else:  # fixed amount
+        discount_amount = discount_value
+
+    # Ensure discount doesn't make price negative
+    final_price = max(0, total_price - discount_amount)
+    return final_price, discount_amount
+
+
+def quote(ticket_type, quantity=1, promo=None, now=None):
+    """
+    Price an order from the in-memory snapshot.
+
+    `promo` is the promo_codes row (or None); pass it through check_promo()
+    first if the caller wants promo errors reported.
+    """
+    tier = get_ticket_type(ticket_type)
+    if tier is None:
+        raise PricingError("Invalid ticket type")
+    if not is_on_sale(tier, now):
+        raise PricingError("Ticket type is not on sale")
+
+    price = tier.price
+    total_price = price * quantity
+
+    discount_amount = 0
+    final_price = total_price
+    if promo:
+        final_price, discount_amount = apply_promo(total_price, promo)
+
+    return {
+        "price": price,
+        "total_price": total_price,
+        "discount_amount": discount_amount,
+        "final_price": final_price,
+    }
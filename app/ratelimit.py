@@ -0,0 +1,162 @@
+"""
+Token-bucket rate limiting for the public endpoints.
+
+Buckets are keyed by (route, client IP) and kept in an in-process LRU dict,
+so a check is O(1) and never touches the MySQL pool. Setting
+RATELIMIT_STORAGE_URL to a redis:// URL shares the buckets between
+processes instead (requires the `redis` package).
+"""
+
+import functools
+import inspect
+import threading
+import time
+from collections import OrderedDict
+
+from flask import current_app, jsonify, request
+
+
+class MemoryStore:
+    """Per-process bucket store, bounded to `max_keys` entries (LRU)."""
+
+    def __init__(self, max_keys=10000):
+        self.max_keys = max_keys
+        self._buckets = OrderedDict()
+        self._lock = threading.Lock()
+
+    def take(self, key, rate, burst):
+        """Take one token. Returns seconds to wait, or 0 if allowed."""
+        now = time.monotonic()
+        with self._lock:
+            bucket = self._buckets.get(key)
+            if bucket is None:
+                tokens = burst
+                if len(self._buckets) >= self.max_keys:
+                    self._buckets.popitem(last=False)
+            else:
+                tokens, last = bucket
+                tokens = min(burst, tokens + (now - last) * rate)
+                self._buckets.move_to_end(key)
+
+            if tokens >= 1:
+                self._buckets[key] = (tokens - 1, now)
+                return 0
+            self._buckets[key] = (tokens, now)
+            return (1 - tokens) / rate
+
+
+# Same algorithm as MemoryStore.take, run atomically inside Redis
+_REDIS_TAKE = """
+local now = tonumber(ARGV[1])
+local rate = tonumber(ARGV[2])
+local burst = tonumber(ARGV[3])
+local bucket = redis.call('HMGET', KEYS[1], 'tokens', 'last')
+local tokens = tonumber(bucket[1]) or burst
+local last = tonumber(bucket[2]) or now
+tokens = math.min(burst, tokens + (now - last) * rate)
+local wait = 0
+if tokens >= 1 then
+    tokens = tokens - 1
+else
+    wait = (1 - tokens) / rate
+end
+redis.call('HSET', KEYS[1], 'tokens', tokens, 'last', now)
+redis.call('EXPIRE', KEYS[1], math.ceil(burst / rate) + 1)
+return tostring(wait)
+"""
+
+
+class RedisStore:
+    """Bucket store shared by every process pointing at the same Redis."""
+
+    def __init__(self, url):
+        import redis
+
+        self._client = redis.Redis.from_url(url)
+        self._take = self._client.register_script(_REDIS_TAKE)
+
+    def take(self, key, rate, burst):
+        wait = self._take(keys=[f"ratelimit:{key}"], args=[time.time(), rate, burst])
+        return float(wait)
+
+
+def init_rate_limiter(app):
+    """Create the bucket store and store it on app.extensions."""
+    url = app.config.get("RATELIMIT_STORAGE_URL")
+    if url:
+        store = RedisStore(url)
+    else:
+        store = MemoryStore(max_keys=app.config.get("RATELIMIT_MAX_KEYS", 10000))
+    app.extensions["rate_limiter"] = store
+
+
+def client_ip(req=None):
+    # X-Forwarded-For is resolved by ProxyFix (TRUSTED_PROXY_HOPS, see
+    # create_app; asgi.PathDispatcher does the same for the async app), which
+    # only trusts the hops our own proxies appended; the left-most hops are
+    # whatever the client sent
+    req = request if req is None else req
+    return req.remote_addr or "unknown"
+
+
+def _wait(app, req, name, rate, burst, methods):
+    """Seconds before `req` may go ahead (0: now), taking a token if it may."""
+    store = app.extensions.get("rate_limiter")
+    if (
+        store is None
+        or not app.config.get("RATELIMIT_ENABLED", True)
+        or (methods and req.method not in methods)
+    ):
+        return 0
+
+    try:
+        return store.take(f"{name}:{client_ip(req)}", rate, burst)
+    except Exception as e:
+        # Never fail a request because the shared backend is down
+        app.logger.warning(f"Rate limiter unavailable: {e}")
+        return 0
+
+
+def _too_many(response, wait):
+    response.status_code = 429
+    response.headers["Retry-After"] = str(int(wait) + 1)
+    return response
+
+
+def rate_limit(name, per_minute, burst=None, methods=None):
+    """
+    Reject requests over `per_minute` (with bursts of up to `burst`) per client
+    IP with a 429, before the view runs. `methods` limits which HTTP methods
+    are counted; by default all of them are.
+
+    Coroutine views (the Quart app in asgi.py) are limited the same way,
+    sharing the Flask app's bucket store.
+    """
+    rate = per_minute / 60.0
+    burst = burst or per_minute
+    body = {"success": False, "error": "Too many requests, slow down"}
+
+    def decorator(view):
+        if inspect.iscoroutinefunction(view):
+            import quart
+
+            @functools.wraps(view)
+            async def wrapped_async(*args, **kwargs):
+                app = quart.current_app
+                wait = _wait(app, quart.request, name, rate, burst, methods)
+                if wait:
+                    return _too_many(quart.jsonify(body), wait)
+                return await view(*args, **kwargs)
+
+            return wrapped_async
+
+        @functools.wraps(view)
+        def wrapped(*args, **kwargs):
+            wait = _wait(current_app, request, name, rate, burst, methods)
+            if wait:
+                return _too_many(jsonify(body), wait)
+            return view(*args, **kwargs)
+
+        return wrapped
+
+    return decorator
@@ -1,4 +1,4 @@
-from flask import Blueprint, request, jsonify, current_app
+from flask import Blueprint, Response, request, jsonify, current_app
 from .models import (
     insert_waitlist,
     get_all_waitlist,
@@ -18,10 +18,39 @@ from .models import (
     confirm_manual_payment,
     reject_manual_payment,
     get_all_manual_payments,
+    get_all_ticket_types,
+    upsert_ticket_type,
+    manual_payment_key,
+    get_pending_manual_payments,
+    confirm_manual_payments,
+    reject_manual_payments,
+    get_manual_payment_statuses,
+    restore_expired_ticket,
+    get_expired_manual_payments,
+    restore_expired_manual_payment,
+    restore_expired_manual_payments,
+    check_in_admission,
+    get_admission_codes,
+    get_admission_ticket_code,
+    get_ticket_admissions,
 )
-from .email import send_ticket_confirmation_email, send_manual_payment_notification
+from . import comps, events, fanout, pricing, search, stats, sweeper, waiters
+from .metrics import metrics
+from .ratelimit import rate_limit
+from .tracing import span
+from .email import (
+    queue_ticket_confirmation_emails,
+    send_ticket_confirmation_email,
+    send_manual_payment_notification,
+)
+from .momo_import import (
+    StatementError,
+    match_statement,
+    parse_statement,
+    statement_reference_codes,
+)
+import csv
 import re
-import requests
 import os
 import datetime
 
@@ -42,6 +71,7 @@ def index():
 
 
 @bp.route("/waitlist", methods=["GET", "POST", "OPTIONS"])
+@rate_limit("waitlist", per_minute=10, methods=["POST"])
 def waitlist():
     # Handle preflight OPTIONS request
     if request.method == "OPTIONS":
@@ -91,44 +121,58 @@ def waitlist():
         return jsonify({"success": False, "error": "Server error"}), 500
 
 
+def quote_order(ticket_type, quantity, promo_code=None):
+    """Price an order, validating the promo code if one was given."""
+    promo = None
+    if promo_code:
+        promo = get_promo_code(promo_code)
+        pricing.check_promo(promo)
+    return pricing.quote(ticket_type, quantity, promo)
+
+
+@bp.route("/ticket-types", methods=["GET"])
+def ticket_types():
+    """List the ticket types currently on sale."""
+    data = [
+        {"code": t.code, "name": t.name, "price": t.price}
+        for t in pricing.available_ticket_types()
+    ]
+    return jsonify({"success": True, "data": data}), 200
+
+
 PAYSTACK_SECRET_KEY = os.getenv("PAYSTACK_SECRET_KEY")
+PAYSTACK_BASE_URL = os.getenv("PAYSTACK_BASE_URL", "https://api.paystack.co")
 FRONTEND_URL = os.getenv("FRONTEND_URL")
 
 
-@bp.route("/buy-ticket", methods=["POST"])
-def buy_ticket():
-    if not request.is_json:
-        return jsonify({"success": False, "error": "JSON body required"}), 400
-
-    data = request.get_json()
+def validate_purchase(data):
+    """
+    Check a buy-ticket body; returns (purchase, None) or (None, error).
+    Shared with the async endpoints in async_routes.py.
+    """
     email = data.get("email")
     name = data.get("name")
     phone = data.get("phone")
-    ticket_type = data.get("ticket_type", "regular").lower()
+    ticket_type = (data.get("ticket_type") or pricing.default_ticket_type()).lower()
     quantity = data.get("quantity", 1)
     promo_code = data.get("promo_code")
 
     if not email:
-        return jsonify({"success": False, "error": "Email is required"}), 400
+        return None, "Email is required"
 
     if not is_valid_email(email):
-        return jsonify({"success": False, "error": "Invalid email format"}), 400
+        return None, "Invalid email format"
 
     # Validate required fields
     if not name:
-        return jsonify({"success": False, "error": "Name is required"}), 400
+        return None, "Name is required"
 
     if not phone:
-        return jsonify({"success": False, "error": "Phone is required"}), 400
+        return None, "Phone is required"
 
     # Validate phone format
     if phone and not re.match(r"^[0-9 +\-()]+$", phone):
-        return jsonify({"success": False, "error": "Invalid phone format"}), 400
-
-    # Validate ticket_type
-    prices = {"early_bird": 100, "regular": 150, "late": 200}
-    if ticket_type not in prices:
-        return jsonify({"success": False, "error": "Invalid ticket type"}), 400
+        return None, "Invalid phone format"
 
     # Validate quantity
     try:
@@ -138,41 +182,19 @@ def buy_ticket():
     except (TypeError, ValueError):
         quantity = 1
 
-    # Get base price
-    price = prices[ticket_type]
-
-    # Calculate total price
-    total_price = price * quantity
-
-    # Validate and apply promo code
-    discount_amount = 0
-    final_price = total_price
-
-    if promo_code:
-        promo = get_promo_code(promo_code)
-        if not promo:
-            return (
-                jsonify({"success": False, "error": "Invalid or expired promo code"}),
-                400,
-            )
-
-        # Check if promo code has reached max uses
-        if promo["max_uses"] and promo["used_count"] >= promo["max_uses"]:
-            return (
-                jsonify(
-                    {"success": False, "error": "Promo code has reached maximum uses"}
-                ),
-                400,
-            )
-
-        # Calculate discount
-        if promo["discount_type"] == "percentage":
-            discount_amount = total_price * (promo["discount_value"] / 100)
-        else:  # fixed amount
-            discount_amount = promo["discount_value"]
+    purchase = {
+        "email": email,
+        "name": name,
+        "phone": phone,
+        "ticket_type": ticket_type,
+        "quantity": quantity,
+        "promo_code": promo_code,
+    }
+    return purchase, None
 
-        final_price = max(0, total_price - discount_amount)
 
+def paystack_initialize_request(purchase, final_price):
+    """(headers, payload) for Paystack's /transaction/initialize."""
     amount_pesewas = int(final_price * 100)  # convert to pesewas for Paystack
 
     headers = {
@@ -181,7 +203,7 @@ def buy_ticket():
     }
 
     payload = {
-        "email": email,
+        "email": purchase["email"],
         "amount": amount_pesewas,
         "currency": "GHS",
         "callback_url": f"{FRONTEND_URL}/verify",
@@ -190,30 +212,85 @@ def buy_ticket():
                 {
                     "display_name": "Full Name",
                     "variable_name": "full_name",
-                    "value": name,
+                    "value": purchase["name"],
+                },
+                {
+                    "display_name": "Phone",
+                    "variable_name": "phone",
+                    "value": purchase["phone"],
                 },
-                {"display_name": "Phone", "variable_name": "phone", "value": phone},
                 {
                     "display_name": "Ticket Type",
                     "variable_name": "ticket_type",
-                    "value": ticket_type,
+                    "value": purchase["ticket_type"],
                 },
                 {
                     "display_name": "Quantity",
                     "variable_name": "quantity",
-                    "value": quantity,
+                    "value": purchase["quantity"],
                 },
             ]
         },
     }
+    return headers, payload
+
+
+def purchase_response(purchase, order, paystack_data, ticket_info, waitlisted):
+    return {
+        "success": True,
+        "data": {
+            "access_code": paystack_data["data"]["access_code"],  # ✅ Return access_code instead of checkout_url
+            "reference": paystack_data["data"]["reference"],  # ✅ Also return reference for tracking
+            "price": order["price"],
+            "total_price": order["total_price"],
+            "final_price": order["final_price"],
+            "discount_amount": order["discount_amount"],
+            "quantity": purchase["quantity"],
+            "ticket_type": purchase["ticket_type"],
+            "waitlisted": waitlisted,
+            "ticket_code": ticket_info["ticket_code"],
+            "promo_code": purchase["promo_code"],
+        },
+    }
+
+
+# Checkouts and verifications call Paystack; shared with async_routes.py
+# (same bucket names, so both apps draw on one budget per client)
+limit_buy_ticket = rate_limit("buy_ticket", per_minute=30, burst=10)
+limit_verify_payment = rate_limit(
+    "verify_payment", per_minute=60, burst=20, methods=["GET"]
+)
 
+
+@bp.route("/buy-ticket", methods=["POST"])
+@limit_buy_ticket
+def buy_ticket():
+    if not request.is_json:
+        return jsonify({"success": False, "error": "JSON body required"}), 400
+
+    purchase, error = validate_purchase(request.get_json())
+    if error:
+        return jsonify({"success": False, "error": error}), 400
+
+    # Price the order (ticket type, quantity and promo code)
     try:
-        response = requests.post(
-            "https://api.paystack.co/transaction/initialize",
-            headers=headers,
-            json=payload,
+        order = quote_order(
+            purchase["ticket_type"], purchase["quantity"], purchase["promo_code"]
         )
-        paystack_data = response.json()
+    except pricing.PricingError as e:
+        return jsonify({"success": False, "error": str(e)}), 400
+
+    headers, payload = paystack_initialize_request(purchase, order["final_price"])
+
+    # The Paystack call needs no database connection, so it runs in the
+    # fan-out pool while this thread checks the waitlist. Pool tasks never
+    # check out connections: a request holding one while its tasks wait for
+    # more can exhaust a small pool.
+    initialize = fanout.submit("paystack", paystack_initialize, headers, payload)
+
+    try:
+        waitlisted = check_waitlist_status(purchase["email"])
+        paystack_data = initialize.result()
 
         if not paystack_data.get("status"):
             return (
@@ -221,45 +298,28 @@ def buy_ticket():
                 400,
             )
 
-        reference = paystack_data["data"]["reference"]
-        access_code = paystack_data["data"]["access_code"]  # ✅ Get the access_code
-
         # Insert ticket record and get ticket info
         ticket_info = insert_ticket(
-            email=email,
-            name=name,
-            phone=phone,
-            price=price,
-            total_price=total_price,
-            quantity=quantity,
-            ticket_type=ticket_type,
-            reference=reference,
-            promo_code=promo_code,
+            email=purchase["email"],
+            name=purchase["name"],
+            phone=purchase["phone"],
+            price=order["price"],
+            total_price=order["total_price"],
+            quantity=purchase["quantity"],
+            ticket_type=purchase["ticket_type"],
+            reference=paystack_data["data"]["reference"],
+            promo_code=purchase["promo_code"],
+            final_price=order["final_price"],
+            discount_amount=order["discount_amount"],
         )
 
-        # Check waitlist status
-        waitlisted = check_waitlist_status(email)
-
         return jsonify(
-            {
-                "success": True,
-                "data": {
-                    "access_code": access_code,  # ✅ Return access_code instead of checkout_url
-                    "reference": reference,  # ✅ Also return reference for tracking
-                    "price": price,
-                    "total_price": total_price,
-                    "final_price": final_price,
-                    "discount_amount": discount_amount,
-                    "quantity": quantity,
-                    "ticket_type": ticket_type,
-                    "waitlisted": waitlisted,
-                    "ticket_code": ticket_info["ticket_code"],
-                    "promo_code": promo_code,
-                },
-            }
+            purchase_response(purchase, order, paystack_data, ticket_info, waitlisted)
         )
 
     except Exception as e:
+        # Drop the Paystack call if it has not started yet
+        initialize.cancel()
         current_app.logger.exception("Error processing ticket purchase")
         return (
             jsonify(
@@ -269,7 +329,59 @@ def buy_ticket():
         )
 
 
+def paystack_initialize(headers, payload):
+    """POST /transaction/initialize; returns Paystack's JSON body."""
+    # Imported here so cold starts don't pay for it on unrelated routes
+    import requests
+
+    with span("paystack.initialize"):
+        response = requests.post(
+            f"{PAYSTACK_BASE_URL}/transaction/initialize",
+            headers=headers,
+            json=payload,
+        )
+        return response.json()
+
+
+def ticket_email_data(ticket, admission_codes=None):
+    """
+    Confirmation email fields for a verified tickets (or manual_payments)
+    row. A group order's admission codes are read unless passed in.
+    """
+    if admission_codes is None and ticket["quantity"] > 1:
+        admission_codes = get_admission_codes([ticket["ticket_code"]])
+        admission_codes = admission_codes.get(ticket["ticket_code"])
+    event = pricing.get_event(ticket.get("event_id"))
+    return {
+        "email": ticket["user_email"],
+        "name": ticket.get("name", ""),
+        "ticket_code": ticket["ticket_code"],
+        "price": ticket["price"],
+        "total_price": ticket["total_price"],
+        "final_price": ticket.get("final_price", ticket["total_price"]),
+        "discount_amount": ticket.get("discount_amount", 0),
+        "quantity": ticket["quantity"],
+        "admission_codes": admission_codes or [],
+        "ticket_type": ticket["ticket_type"],
+        "promo_code": ticket.get("promo_code"),
+        "event_title": event.title,
+        "event_date": pricing.format_event_date(event),
+        "event_venue": event.venue,
+    }
+
+
+def tickets_email_data(tickets):
+    """ticket_email_data for many tickets, reading their admission codes in one query."""
+    admission_codes = get_admission_codes(
+        t["ticket_code"] for t in tickets if t["quantity"] > 1
+    )
+    return [
+        ticket_email_data(t, admission_codes.get(t["ticket_code"], [])) for t in tickets
+    ]
+
+
 @bp.route("/verify-payment", methods=["GET", "OPTIONS"])
+@limit_verify_payment
 def verify_payment():
     if request.method == "OPTIONS":
         return jsonify({"success": True}), 200
@@ -284,15 +396,23 @@ def verify_payment():
     headers = {"Authorization": f"Bearer {PAYSTACK_SECRET_KEY}"}
 
     try:
+        import requests
+
         # ✅ Verify payment with Paystack API
-        response = requests.get(
-            f"https://api.paystack.co/transaction/verify/{reference}", headers=headers
-        )
-        result = response.json()
+        with span("paystack.verify"):
+            response = requests.get(
+                f"{PAYSTACK_BASE_URL}/transaction/verify/{reference}",
+                headers=headers,
+            )
+            result = response.json()
 
         if result.get("data", {}).get("status") == "success":
             # ✅ Get ticket first to check current status
             ticket = get_ticket_by_reference(reference)
+            if not ticket and restore_expired_ticket(reference):
+                # Paid after the sweeper expired the abandoned checkout
+                current_app.logger.warning(f"Restored expired ticket {reference}")
+                ticket = get_ticket_by_reference(reference)
 
             if not ticket:
                 return (
@@ -313,23 +433,9 @@ def verify_payment():
                     ticket = get_ticket_by_reference(reference)
 
                     # ✅ Send confirmation email only for newly verified payments
-                    email_data = {
-                        "email": ticket["user_email"],
-                        "name": ticket.get("name", ""),
-                        "ticket_code": ticket["ticket_code"],
-                        "price": ticket["price"],
-                        "total_price": ticket["total_price"],
-                        "final_price": ticket.get("final_price", ticket["total_price"]),
-                        "discount_amount": ticket.get("discount_amount", 0),
-                        "quantity": ticket["quantity"],
-                        "ticket_type": ticket["ticket_type"],
-                        "promo_code": ticket.get("promo_code"),
-                        "event_title": "MIDNIGHT MADNESS III",
-                        "event_date": "October 31, 2025",
-                        "event_venue": "[Redacted], Accra",
-                    }
-
-                    email_sent = send_ticket_confirmation_email(email_data)
+                    email_sent = send_ticket_confirmation_email(
+                        ticket_email_data(ticket)
+                    )
                 else:
                     return (
                         jsonify(
@@ -378,9 +484,11 @@ def verify_payment():
 
 
 @bp.route("/check-ticket/<ticket_code>", methods=["GET"])
+@rate_limit("check_ticket", per_minute=30, burst=10)
 def check_ticket(ticket_code):
-    """Check ticket details and validity."""
+    """Check ticket details and validity (by ticket or admission code)."""
     try:
+        ticket_code = get_admission_ticket_code(ticket_code) or ticket_code
         ticket = get_ticket_by_code(ticket_code)
         if not ticket:
             return jsonify({"success": False, "error": "Ticket not found"}), 404
@@ -407,6 +515,8 @@ def check_ticket(ticket_code):
                     "checked_in": ticket["checked_in"],
                     "checked_in_at": ticket["checked_in_at"],
                     "checked_in_by": ticket["checked_in_by"],
+                    "admitted": ticket["admitted"],
+                    "admissions": get_ticket_admissions(ticket_code),
                 },
             }
         )
@@ -417,43 +527,77 @@ def check_ticket(ticket_code):
 
 @bp.route("/check-in/<ticket_code>", methods=["POST"])
 def check_in_ticket_route(ticket_code):
-    """Check in a ticket (mark as used)."""
+    """
+    Check in a ticket (mark as used). An admission code
+    (MA-XXXX-XXXX-XXXX-XXXX) admits one attendee of the order. The ticket
+    code admits a one-person order, or, with "admit_all": true (the staff
+    override), everyone in the order not yet checked in.
+    """
     try:
         # Get admin/staff identifier from request
         data = request.get_json() or {}
         checked_in_by = data.get("checked_in_by", "admin")
+        admit_all = data.get("admit_all") is True
 
-        ticket = get_ticket_by_code(ticket_code)
+        parent_code = get_admission_ticket_code(ticket_code)
+        admission = parent_code is not None
+        if not admission:
+            parent_code = ticket_code
+        ticket = get_ticket_by_code(parent_code)
         if not ticket:
             return jsonify({"success": False, "error": "Ticket not found"}), 404
 
         if ticket["payment_status"] != "paid":
             return jsonify({"success": False, "error": "Ticket not paid"}), 400
 
-        if ticket["checked_in"]:
+        if ticket["admitted"] >= ticket["quantity"]:
             return (
                 jsonify({"success": False, "error": "Ticket already checked in"}),
                 400,
             )
 
-        success = check_in_ticket(ticket_code, checked_in_by)
+        if not admission and ticket["quantity"] > 1 and not admit_all:
+            return (
+                jsonify(
+                    {
+                        "success": False,
+                        "error": "Group ticket: scan each guest's code, "
+                        "or check in with admit_all to admit the whole group",
+                        "admitted": ticket["admitted"],
+                        "quantity": ticket["quantity"],
+                    }
+                ),
+                400,
+            )
+
+        if admission:
+            success, admitted, quantity = check_in_admission(ticket_code, checked_in_by)
+            error = "Admission already checked in"
+        else:
+            success = check_in_ticket(ticket_code, checked_in_by, admit_all=admit_all)
+            if success and ticket["quantity"] > 1:
+                current_app.logger.info(
+                    f"{checked_in_by} admitted the whole group of {parent_code}"
+                )
+            admitted = quantity = ticket["quantity"]
+            error = "Ticket already checked in"
         if success:
             return jsonify(
                 {
                     "success": True,
                     "message": "Ticket checked in successfully",
                     "data": {
-                        "ticket_code": ticket_code,
+                        "ticket_code": parent_code,
+                        "admission_code": ticket_code if admission else None,
+                        "admitted": admitted,
+                        "quantity": quantity,
                         "checked_in_at": datetime.datetime.utcnow().isoformat(),
                         "checked_in_by": checked_in_by,
                     },
                 }
             )
         else:
-            return (
-                jsonify({"success": False, "error": "Failed to check in ticket"}),
-                500,
-            )
+            return jsonify({"success": False, "error": error}), 400
 
     except Exception as e:
         current_app.logger.exception("Error checking in ticket")
@@ -544,18 +688,209 @@ def promo_codes_route():
             return jsonify({"success": False, "error": "Server error"}), 500
 
 
+@bp.route("/admin/ticket-types", methods=["GET", "POST"])
+def admin_ticket_types_route():
+    """Admin endpoints for ticket types and their sale windows."""
+    if request.method == "GET":
+        try:
+            ticket_types = get_all_ticket_types()
+            return jsonify({"success": True, "data": ticket_types}), 200
+        except Exception as e:
+            current_app.logger.exception("Error retrieving ticket types")
+            return jsonify({"success": False, "error": "Server error"}), 500
+
+    if not request.is_json:
+        return jsonify({"success": False, "error": "JSON body required"}), 400
+
+    data = request.get_json()
+    code = (data.get("code") or "").lower()
+    name = data.get("name")
+    price = data.get("price")
+
+    if not code or not name or price is None:
+        return (
+            jsonify({"success": False, "error": "Code, name, and price are required"}),
+            400,
+        )
+
+    try:
+        price = float(price)
+        if price < 0:
+            raise ValueError
+    except (TypeError, ValueError):
+        return (
+            jsonify({"success": False, "error": "Price must be a non-negative number"}),
+            400,
+        )
+
+    try:
+        upsert_ticket_type(
+            code,
+            name,
+            price,
+            sale_starts_at=data.get("sale_starts_at"),
+            sale_ends_at=data.get("sale_ends_at"),
+            sort_order=int(data.get("sort_order", 0)),
+            is_active=bool(data.get("is_active", True)),
+        )
+        pricing.reload_pricing()
+        return jsonify({"success": True, "message": "Ticket type saved successfully"})
+    except Exception as e:
+        current_app.logger.exception("Error saving ticket type")
+        return jsonify({"success": False, "error": "Server error"}), 500
+
+
 @bp.route("/admin/tickets", methods=["GET"])
 def admin_tickets_route():
-    """Admin endpoint to get all tickets."""
+    """Admin endpoint to get all tickets (?event_id= for one event's)."""
     try:
-        tickets = get_all_tickets()
+        tickets = get_all_tickets(request.args.get("event_id", type=int))
         return jsonify({"success": True, "data": tickets}), 200
     except Exception as e:
         current_app.logger.exception("Error retrieving tickets")
         return jsonify({"success": False, "error": "Server error"}), 500
 
 
+@bp.route("/admin/stats", methods=["GET"])
+def admin_stats_route():
+    """Admin endpoint for sales, revenue and check-in counts per ticket type."""
+    try:
+        return jsonify({"success": True, "data": stats.get_stats()}), 200
+    except Exception as e:
+        current_app.logger.exception("Error retrieving stats")
+        return jsonify({"success": False, "error": "Server error"}), 500
+
+
+@bp.route("/admin/stats/recount", methods=["POST"])
+def admin_stats_recount_route():
+    """Admin endpoint to rebuild the stats counters from the tickets table."""
+    try:
+        stats.recount()
+        return jsonify({"success": True, "data": stats.get_stats()}), 200
+    except Exception as e:
+        current_app.logger.exception("Error recounting stats")
+        return jsonify({"success": False, "error": "Server error"}), 500
+
+
+@bp.route("/admin/sweep-expired", methods=["POST"])
+def admin_sweep_expired_route():
+    """Admin endpoint to expire abandoned pending tickets and manual payments now."""
+    try:
+        return jsonify({"success": True, "data": sweeper.sweep()}), 200
+    except Exception as e:
+        current_app.logger.exception("Error expiring pending rows")
+        return jsonify({"success": False, "error": "Server error"}), 500
+
+
+# Longest range /admin/stats/sales will return, per granularity
+MAX_SALES_RANGE = {
+    "hour": datetime.timedelta(days=31),
+    "day": datetime.timedelta(days=366),
+}
+
+
+@bp.route("/admin/stats/sales", methods=["GET"])
+def admin_sales_series_route():
+    """
+    Admin endpoint for sales per hour or day, from the hourly rollups.
+
+    Query params: granularity (hour|day), from/to (ISO datetimes, UTC,
+    default the last 48 hours or 30 days), group_by (comma separated subset
+    of ticket_type, promo_code, payment_status; empty for totals) and
+    ticket_type / promo_code / payment_status filters.
+    """
+    granularity = request.args.get("granularity", "hour")
+    if granularity not in stats.GRANULARITIES:
+        return jsonify({"success": False, "error": "granularity must be hour or day"}), 400
+
+    try:
+        start, end = stats.default_range(granularity)
+        if request.args.get("from"):
+            start = datetime.datetime.fromisoformat(request.args["from"])
+        if request.args.get("to"):
+            end = datetime.datetime.fromisoformat(request.args["to"])
+    except ValueError:
+        return jsonify({"success": False, "error": "from/to must be ISO datetimes"}), 400
+    start = stats.truncate(start.replace(tzinfo=None), granularity)
+    end = end.replace(tzinfo=None)
+    if end <= start or end - start > MAX_SALES_RANGE[granularity]:
+        return jsonify({"success": False, "error": "Invalid or too large range"}), 400
+
+    group_by = request.args.get("group_by")
+    group_by = (
+        stats.ROLLUP_DIMENSIONS
+        if group_by is None
+        else tuple(d for d in group_by.split(",") if d)
+    )
+    filters = {
+        d: request.args[d] for d in stats.ROLLUP_DIMENSIONS if d in request.args
+    }
+
+    try:
+        series = stats.sales_series(start, end, granularity, group_by, **filters)
+    except ValueError as e:
+        return jsonify({"success": False, "error": str(e)}), 400
+    except Exception as e:
+        current_app.logger.exception("Error retrieving sales series")
+        return jsonify({"success": False, "error": "Server error"}), 500
+
+    return (
+        jsonify(
+            {
+                "success": True,
+                "data": {
+                    "granularity": granularity,
+                    "from": start.isoformat(),
+                    "to": end.isoformat(),
+                    "group_by": list(group_by),
+                    "series": series,
+                },
+            }
+        ),
+        200,
+    )
+
+
+@bp.route("/admin/events", methods=["GET"])
+def admin_events_route():
+    """Server-Sent Events stream of payments, manual payments and check-ins."""
+    last_event_id = request.headers.get("Last-Event-ID", type=int)
+    if last_event_id is None:
+        last_event_id = request.args.get("last_event_id", type=int)
+
+    subscriber = events.broadcaster.subscribe(last_event_id)
+    if subscriber is None:
+        return jsonify({"success": False, "error": "Too many event stream clients"}), 503
+
+    return Response(
+        events.stream(subscriber, current_app.config["EVENTS_HEARTBEAT_SECONDS"]),
+        mimetype="text/event-stream",
+        # Tell nginx-style proxies not to buffer the stream
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
+@bp.route("/admin/search", methods=["GET"])
+def admin_search_route():
+    """
+    Admin search by email, name, phone, ticket code or manual payment
+    reference (prefix match), across tickets, manual payments and the
+    waitlist. ?limit= caps the results (default 20, max 50).
+    """
+    q = request.args.get("q", "")
+    limit = max(1, min(request.args.get("limit", 20, type=int), 50))
+    if len(q.strip()) < 2:
+        return jsonify({"success": False, "error": "q must be at least 2 characters"}), 400
+
+    try:
+        return jsonify({"success": True, "data": search.search(q, limit)}), 200
+    except Exception as e:
+        current_app.logger.exception("Error searching")
+        return jsonify({"success": False, "error": "Server error"}), 500
+
+
 @bp.route("/validate-promo", methods=["POST"])
+@rate_limit("validate_promo", per_minute=10)
 def validate_promo():
     """Validate a promo code and return discount details."""
     if not request.is_json:
@@ -570,29 +905,12 @@ def validate_promo():
 
     try:
         promo = get_promo_code(promo_code)
-        if not promo:
-            return (
-                jsonify({"success": False, "error": "Invalid or expired promo code"}),
-                400,
-            )
-
-        # Check if promo code has reached max uses
-        if promo["max_uses"] and promo["used_count"] >= promo["max_uses"]:
-            return (
-                jsonify(
-                    {"success": False, "error": "Promo code has reached maximum uses"}
-                ),
-                400,
-            )
-
-        # Calculate discount
-        discount_amount = 0
-        if promo["discount_type"] == "percentage":
-            discount_amount = total_amount * (promo["discount_value"] / 100)
-        else:  # fixed amount
-            discount_amount = promo["discount_value"]
+        try:
+            pricing.check_promo(promo)
+        except pricing.PricingError as e:
+            return jsonify({"success": False, "error": str(e)}), 400
 
-        final_price = max(0, total_amount - discount_amount)
+        final_price, discount_amount = pricing.apply_promo(total_amount, promo)
 
         return jsonify(
             {
@@ -624,7 +942,7 @@ def buy_ticket_manual():
     email = data.get("email")
     name = data.get("name")
     phone = data.get("phone")
-    ticket_type = data.get("ticket_type", "regular").lower()
+    ticket_type = (data.get("ticket_type") or pricing.default_ticket_type()).lower()
     quantity = data.get("quantity", 1)
     promo_code = data.get("promo_code")
     momo_number = "0592076527"
@@ -636,20 +954,17 @@ def buy_ticket_manual():
     if not is_valid_email(email):
         return jsonify({"success": False, "error": "Invalid email format"}), 400
 
+    # Validate required fields
     if not name:
         return jsonify({"success": False, "error": "Name is required"}), 400
 
     if not phone:
         return jsonify({"success": False, "error": "Phone is required"}), 400
 
+    # Validate phone format
     if phone and not re.match(r"^[0-9 +\-()]+$", phone):
         return jsonify({"success": False, "error": "Invalid phone format"}), 400
 
-    # Validate ticket_type
-    prices = {"early_bird": 100, "regular": 150, "late": 200}
-    if ticket_type not in prices:
-        return jsonify({"success": False, "error": "Invalid ticket type"}), 400
-
     # Validate quantity
     try:
         quantity = int(quantity)
@@ -658,39 +973,16 @@ def buy_ticket_manual():
     except (TypeError, ValueError):
         quantity = 1
 
-    # Get base price
-    price = prices[ticket_type]
-
-    # Calculate total price
-    total_price = price * quantity
-
-    # Validate and apply promo code
-    discount_amount = 0
-    final_price = total_price
-
-    if promo_code:
-        promo = get_promo_code(promo_code)
-        if not promo:
-            return (
-                jsonify({"success": False, "error": "Invalid or expired promo code"}),
-                400,
-            )
-
-        if promo["max_uses"] and promo["used_count"] >= promo["max_uses"]:
-            return (
-                jsonify(
-                    {"success": False, "error": "Promo code has reached maximum uses"}
-                ),
-                400,
-            )
-
-        # Calculate discount
-        if promo["discount_type"] == "percentage":
-            discount_amount = total_price * (promo["discount_value"] / 100)
-        else:  # fixed amount
-            discount_amount = promo["discount_value"]
+    # Price the order (ticket type, quantity and promo code)
+    try:
+        order = quote_order(ticket_type, quantity, promo_code)
+    except pricing.PricingError as e:
+        return jsonify({"success": False, "error": str(e)}), 400
 
-        final_price = max(0, total_price - discount_amount)
+    price = order["price"]
+    total_price = order["total_price"]
+    discount_amount = order["discount_amount"]
+    final_price = order["final_price"]
 
     try:
         # Create manual payment record
@@ -759,11 +1051,45 @@ def buy_ticket_manual():
         )
 
 
+def wait_for_manual_payment(reference_code, timeout):
+    """Return the payment once it leaves 'pending', or as it is after timeout."""
+    with waiters.watch(manual_payment_key(reference_code)) as changed:
+        # Watching before the read means a confirmation landing in between
+        # still wakes us
+        payment = get_manual_payment_by_reference(reference_code)
+        if not payment or payment["payment_status"] != "pending":
+            outcome = "ready"
+        elif changed is None:
+            outcome = "full"
+        elif changed.wait(timeout):
+            outcome = "notified"
+            payment = get_manual_payment_by_reference(reference_code)
+        else:
+            outcome = "timeout"
+    metrics.inc("longpoll_total", (("outcome", outcome),))
+    return payment
+
+
 @bp.route("/check-manual-payment/<reference_code>", methods=["GET"])
+@rate_limit("check_manual_payment", per_minute=20, burst=5)
 def check_manual_payment(reference_code):
-    """Check the status of a manual payment."""
+    """
+    Check the status of a manual payment.
+
+    With ?wait=<seconds> a pending payment is held open until it is
+    confirmed or rejected, or the wait (capped at LONGPOLL_MAX_SECONDS)
+    runs out, so the buyer's page can poll in a loop without hammering
+    the database.
+    """
+    wait = min(
+        request.args.get("wait", 0, type=float),
+        current_app.config["LONGPOLL_MAX_SECONDS"],
+    )
     try:
-        payment = get_manual_payment_by_reference(reference_code)
+        if wait > 0:
+            payment = wait_for_manual_payment(reference_code, wait)
+        else:
+            payment = get_manual_payment_by_reference(reference_code)
         if not payment:
             return (
                 jsonify({"success": False, "error": "Payment reference not found"}),
@@ -778,9 +1104,9 @@ def check_manual_payment(reference_code):
 
 @bp.route("/admin/manual-payments", methods=["GET"])
 def admin_manual_payments():
-    """Admin endpoint to get all manual payments."""
+    """Admin endpoint to get all manual payments (?event_id= for one event's)."""
     try:
-        payments = get_all_manual_payments()
+        payments = get_all_manual_payments(request.args.get("event_id", type=int))
         return jsonify({"success": True, "data": payments}), 200
     except Exception as e:
         current_app.logger.exception("Error retrieving manual payments")
@@ -804,26 +1130,20 @@ def admin_confirm_manual_payment(reference_code):
         success, ticket_code_or_error = confirm_manual_payment(
             reference_code, confirmed_by, admin_notes
         )
+        if not success and restore_expired_manual_payment(reference_code):
+            # Paid after the sweeper expired it
+            current_app.logger.warning(f"Restored expired manual payment {reference_code}")
+            success, ticket_code_or_error = confirm_manual_payment(
+                reference_code, confirmed_by, admin_notes
+            )
 
         if success:
             # Get the payment details to send email
             payment = get_manual_payment_by_reference(reference_code)
             if payment:
-                email_data = {
-                    "email": payment["user_email"],
-                    "name": payment["name"],
-                    "ticket_code": ticket_code_or_error,
-                    "price": payment["price"],
-                    "total_price": payment["total_price"],
-                    "final_price": payment["final_price"],
-                    "discount_amount": payment["discount_amount"],
-                    "quantity": payment["quantity"],
-                    "ticket_type": payment["ticket_type"],
-                    "promo_code": payment.get("promo_code"),
-                    "event_title": "MIDNIGHT MADNESS III",
-                    "event_date": "October 31, 2025",
-                    "event_venue": "[Redacted], Accra",
-                }
+                email_data = ticket_email_data(
+                    dict(payment, ticket_code=ticket_code_or_error)
+                )
 
                 email_sent = send_ticket_confirmation_email(email_data)
 
@@ -846,6 +1166,275 @@ def admin_confirm_manual_payment(reference_code):
         )
 
 
+# Most reference codes one /admin/manual-payments/batch call may carry
+MAX_BATCH_REFERENCE_CODES = 1000
+
+
+def queue_confirmation_emails(tickets):
+    """
+    Queue confirmation emails for tickets already committed. Returns False
+    (and logs) if that failed, so callers still report what was committed.
+    """
+    try:
+        queue_ticket_confirmation_emails(tickets_email_data(tickets))
+        return True
+    except Exception:
+        current_app.logger.exception("Error queueing confirmation emails")
+        return False
+
+
+def process_manual_payments_batch(action, reference_codes, confirmed_by, admin_notes):
+    """
+    Confirm or reject reference_codes, MANUAL_BATCH_CHUNK_SIZE per
+    transaction. Returns one outcome per code, in order. A chunk that fails
+    is reported as "error" and the remaining chunks still run; confirmed
+    payments whose emails could not be queued are marked email_error.
+    """
+    chunk_size = current_app.config["MANUAL_BATCH_CHUNK_SIZE"]
+    outcomes = {}
+    for start in range(0, len(reference_codes), chunk_size):
+        chunk = reference_codes[start : start + chunk_size]
+        try:
+            if action == "confirm":
+                done = confirm_manual_payments(chunk, confirmed_by, admin_notes)
+                # Paid after the sweeper expired them
+                restored = restore_expired_manual_payments(
+                    [code for code in chunk if code not in done]
+                )
+                if restored:
+                    current_app.logger.warning(f"Restored expired manual payments {restored}")
+                    done.update(confirm_manual_payments(restored, confirmed_by, admin_notes))
+                # Committed: record them before anything else can fail
+                for code, payment in done.items():
+                    outcomes[code] = {
+                        "status": "confirmed",
+                        "ticket_code": payment["ticket_code"],
+                    }
+                if not queue_confirmation_emails(done.values()):
+                    for code in done:
+                        outcomes[code]["email_error"] = True
+            else:
+                done = reject_manual_payments(chunk, confirmed_by, admin_notes)
+                outcomes.update((code, {"status": "rejected"}) for code in done)
+
+            leftovers = [code for code in chunk if code not in done]
+            if leftovers:
+                statuses = get_manual_payment_statuses(leftovers)
+                for code in leftovers:
+                    status = statuses.get(code)
+                    outcomes[code] = (
+                        {"status": "already_processed", "payment_status": status}
+                        if status
+                        else {"status": "not_found"}
+                    )
+        except Exception:
+            current_app.logger.exception(f"Error processing manual payments batch ({action})")
+            for code in chunk:
+                outcomes.setdefault(code, {"status": "error"})
+
+    return [dict(reference_code=code, **outcomes[code]) for code in reference_codes]
+
+
+@bp.route("/admin/manual-payments/batch", methods=["POST"])
+def admin_manual_payments_batch():
+    """
+    Admin endpoint to confirm or reject many manual payments at once.
+
+    Body: {"action": "confirm" | "reject", "reference_codes": [...],
+    "confirmed_by": ..., "admin_notes": ...}. Responds with one outcome per
+    code: confirmed (with ticket_code, and email_error if its confirmation
+    email could not be queued), rejected, already_processed, not_found or
+    error.
+    """
+    if not request.is_json:
+        return jsonify({"success": False, "error": "JSON body required"}), 400
+
+    data = request.get_json()
+    action = data.get("action")
+    reference_codes = data.get("reference_codes")
+    confirmed_by = data.get("confirmed_by", "admin")
+    admin_notes = data.get("admin_notes")
+
+    if action not in ("confirm", "reject"):
+        return jsonify({"success": False, "error": "action must be confirm or reject"}), 400
+    if not isinstance(reference_codes, list) or not all(
+        isinstance(code, str) for code in reference_codes
+    ):
+        return (
+            jsonify({"success": False, "error": "reference_codes must be a list of strings"}),
+            400,
+        )
+    reference_codes = list(dict.fromkeys(code.strip().upper() for code in reference_codes))
+    if not reference_codes or len(reference_codes) > MAX_BATCH_REFERENCE_CODES:
+        return (
+            jsonify(
+                {
+                    "success": False,
+                    "error": f"Send between 1 and {MAX_BATCH_REFERENCE_CODES} reference codes",
+                }
+            ),
+            400,
+        )
+    if not confirmed_by:
+        return jsonify({"success": False, "error": "confirmed_by is required"}), 400
+
+    outcomes = process_manual_payments_batch(
+        action, reference_codes, confirmed_by, admin_notes
+    )
+    summary = {}
+    for outcome in outcomes:
+        summary[outcome["status"]] = summary.get(outcome["status"], 0) + 1
+    return jsonify({"success": "error" not in summary, "summary": summary, "data": outcomes})
+
+
+@bp.route("/admin/import-momo-statement", methods=["POST"])
+def admin_import_momo_statement():
+    """
+    Admin endpoint to confirm manual payments from a MoMo statement export.
+
+    Takes the CSV as a multipart "file" upload (or as the raw request
+    body). Credit lines whose reference contains a pending payment's code
+    (or an expired one's, which is restored) and whose amount equals its
+    final price are confirmed together in one transaction, and their
+    confirmation emails are queued (a confirmed line whose email could not
+    be queued gets email_error). Form/query
+    fields: confirmed_by, dry_run=true (only report the matches), and
+    reference_column / amount_column if the headers aren't recognized.
+    """
+    if (request.content_length or 0) > current_app.config["MOMO_IMPORT_MAX_BYTES"]:
+        return jsonify({"success": False, "error": "Statement too large"}), 413
+
+    upload = request.files.get("file")
+    raw = upload.read() if upload else request.get_data()
+    options = request.values
+    confirmed_by = options.get("confirmed_by", "admin")
+    dry_run = options.get("dry_run", "false").lower() == "true"
+
+    try:
+        lines = parse_statement(
+            raw.decode("utf-8-sig", errors="replace"),
+            reference_column=options.get("reference_column"),
+            amount_column=options.get("amount_column"),
+        )
+    except (StatementError, csv.Error) as e:
+        return jsonify({"success": False, "error": str(e)}), 400
+
+    try:
+        pending = get_pending_manual_payments()
+        # Transfers that arrived after the sweeper expired their payment
+        expired = get_expired_manual_payments(
+            statement_reference_codes(lines) - {p["reference_code"] for p in pending}
+        )
+        matches, outcomes = match_statement(lines, pending + expired)
+
+        confirmed = {}
+        if matches and not dry_run:
+            late = [p["reference_code"] for p in expired if p["reference_code"] in matches]
+            if late:
+                restore_expired_manual_payments(late)
+            confirmed = confirm_manual_payments(
+                list(matches), confirmed_by, "Matched by MoMo statement import"
+            )
+            emails_queued = queue_confirmation_emails(confirmed.values())
+            for outcome in outcomes:
+                code = outcome.get("reference_code")
+                if outcome["status"] != "matched":
+                    continue
+                if code in confirmed:
+                    outcome["status"] = "confirmed"
+                    outcome["ticket_code"] = confirmed[code]["ticket_code"]
+                    if not emails_queued:
+                        outcome["email_error"] = True
+                else:
+                    # Confirmed or rejected by someone else since matching
+                    outcome["status"] = "already_processed"
+
+        summary = {}
+        for outcome in outcomes:
+            summary[outcome["status"]] = summary.get(outcome["status"], 0) + 1
+        return jsonify(
+            {
+                "success": True,
+                "dry_run": dry_run,
+                "summary": summary,
+                "confirmed": len(confirmed),
+                "data": outcomes,
+            }
+        )
+    except Exception as e:
+        current_app.logger.exception("Error importing MoMo statement")
+        return (
+            jsonify({"success": False, "error": "Server error importing statement"}),
+            500,
+        )
+
+
+@bp.route("/admin/comps", methods=["POST"])
+def admin_issue_comps():
+    """
+    Admin endpoint to issue comp (guest list) tickets from a CSV.
+
+    Takes the CSV as a multipart "file" upload (or as the raw request body)
+    with name and email columns, and optionally phone, ticket_type and
+    quantity. All valid guests are issued paid, zero-price tickets in one
+    transaction and their confirmation emails are queued (email_error is
+    true if that failed; the tickets are issued either way). Form/query
+    fields: list_name (required; a guest gets one ticket per list),
+    ticket_type (default comp), dry_run=true, send_emails=false.
+    """
+    if (request.content_length or 0) > current_app.config["COMP_LIST_MAX_BYTES"]:
+        return jsonify({"success": False, "error": "Guest list too large"}), 413
+
+    upload = request.files.get("file")
+    raw = upload.read() if upload else request.get_data()
+    options = request.values
+    dry_run = options.get("dry_run", "false").lower() == "true"
+    send_emails = options.get("send_emails", "true").lower() == "true"
+
+    try:
+        result = comps.issue_guest_list(
+            raw.decode("utf-8-sig", errors="replace"),
+            options.get("list_name"),
+            ticket_type=options.get("ticket_type", comps.COMP_TICKET_TYPE),
+            dry_run=dry_run,
+            max_rows=current_app.config["COMP_LIST_MAX_ROWS"],
+        )
+    except (comps.GuestListError, csv.Error) as e:
+        return jsonify({"success": False, "error": str(e)}), 400
+    except Exception as e:
+        current_app.logger.exception("Error issuing comp tickets")
+        return (
+            jsonify({"success": False, "error": "Server error issuing comp tickets"}),
+            500,
+        )
+
+    tickets = result["tickets"]
+    email_error = False
+    if tickets:
+        current_app.logger.info(
+            f"Issued {len(tickets)} comp tickets for list {result['list_name']}"
+        )
+        if send_emails:
+            email_error = not queue_confirmation_emails(tickets)
+
+    return jsonify(
+        {
+            "success": True,
+            "dry_run": dry_run,
+            "email_error": email_error,
+            "list_name": result["list_name"],
+            "valid": len(result["guests"]),
+            "issued": len(tickets),
+            "already_issued": result["already_issued"],
+            "errors": result["errors"],
+            "data": [
+                {"email": t["user_email"], "name": t["name"], "ticket_code": t["ticket_code"]}
+                for t in tickets
+            ],
+        }
+    )
+
+
 @bp.route("/admin/reject-manual-payment/<reference_code>", methods=["POST"])
 def admin_reject_manual_payment(reference_code):
     """Admin endpoint to reject a manual payment."""
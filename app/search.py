@@ -0,0 +1,134 @@
+"""
+Admin search across tickets, manual payments and the waitlist.
+
+Each row carries normalized copies of its contact details (lowercased
+email, name and surname, phone digits in local 0XXXXXXXXX form), filled in
+on insert and indexed. A query is normalized the same way and every
+applicable column is searched by prefix with an index range scan
+(col LIKE 'prefix%'), so the cost depends on the number of matches, not
+the size of the tables. Hits are then ranked:
+exact matches before prefix matches, codes before contact details before
+names, newest first.
+"""
+
+import re
+
+# Which columns a query is tried against, by what it looks like
+_CODE = re.compile(r"^[A-Z0-9-]{2,20}$")
+_PHONE = re.compile(r"^\+?[\d\s()-]{3,20}$")
+
+# Lower sorts first
+_FIELD_RANK = {
+    "ticket_code": 0,
+    "reference_code": 0,
+    "email_lc": 1,
+    "phone_norm": 1,
+    "name_lc": 2,
+    "surname_lc": 2,
+}
+_KINDS = {"tickets": "ticket", "manual_payments": "manual_payment", "waitlist": "waitlist"}
+_KIND_RANK = {"tickets": 0, "manual_payments": 1, "waitlist": 2}
+# Search-only columns, reported by the field they were derived from
+_NORMALIZED = {
+    "email_lc": "email",
+    "phone_norm": "phone",
+    "name_lc": "name",
+    "surname_lc": "name",
+}
+
+
+def normalize_email(email):
+    return email.strip().lower() if email else None
+
+
+def normalize_phone(phone):
+    """Digits only, in local form: +233 24 123 4567 -> 0241234567."""
+    if not phone:
+        return None
+    digits = re.sub(r"\D", "", phone)
+    if digits.startswith("233") and len(digits) >= 12:
+        digits = "0" + digits[3:]
+    elif len(digits) == 9 and not digits.startswith("0"):
+        digits = "0" + digits
+    return digits or None
+
+
+def normalize_name(name):
+    """(full name, last word of the name), lowercased with spaces collapsed."""
+    if not name:
+        return None, None
+    words = name.lower().split()
+    if not words:
+        return None, None
+    return " ".join(words), words[-1]
+
+
+def search_fields(email, name, phone):
+    """Values of the normalized search columns for a row."""
+    name_lc, surname_lc = normalize_name(name)
+    return {
+        "email_lc": normalize_email(email),
+        "name_lc": name_lc,
+        "surname_lc": surname_lc,
+        "phone_norm": normalize_phone(phone),
+    }
+
+
+def _lookups(q):
+    """(table, column, prefix) to try for query q."""
+    lookups = []
+    upper = q.upper()
+    if _CODE.match(upper):
+        code = upper if upper.startswith("MM-") else f"MM-{upper}"
+        lookups.append(("tickets", "ticket_code", code))
+        lookups.append(("manual_payments", "reference_code", upper))
+    if _PHONE.match(q) and sum(c.isdigit() for c in q) >= 3:
+        phone = normalize_phone(q)
+        for table in ("tickets", "manual_payments", "waitlist"):
+            lookups.append((table, "phone_norm", phone))
+        return lookups
+
+    email = normalize_email(q)
+    name, _ = normalize_name(q)
+    for table in ("tickets", "manual_payments", "waitlist"):
+        lookups.append((table, "email_lc", email))
+        if "@" not in q:
+            lookups.append((table, "name_lc", name))
+            lookups.append((table, "surname_lc", name))
+    return lookups
+
+
+def _rank(hit):
+    table, column, prefix, row = hit
+    created_at = row.get("created_at")
+    return (
+        0 if row[column] == prefix else 1,
+        _FIELD_RANK[column],
+        _KIND_RANK[table],
+        -created_at.timestamp() if created_at else 0,
+    )
+
+
+def search(q, limit=20):
+    """Up to `limit` ranked matches for q, as dicts with "kind" and "matched" keys."""
+    from .models import search_prefix
+
+    q = q.strip()
+    if len(q) < 2:
+        return []
+
+    results = []
+    seen = set()
+    for table, column, prefix, row in sorted(search_prefix(_lookups(q), limit), key=_rank):
+        if (table, row["id"]) in seen:
+            continue
+        seen.add((table, row["id"]))
+        result = {k: v for k, v in row.items() if k not in _NORMALIZED}
+        result["kind"] = _KINDS[table]
+        result["matched"] = _NORMALIZED.get(column, column)
+        if result.get("created_at"):
+            result["created_at"] = result["created_at"].isoformat()
+        results.append(result)
+        if len(results) == limit:
+            break
+    return results
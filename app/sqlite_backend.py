@@ -0,0 +1,277 @@
+"""
+Embedded SQLite storage backend.
+
+Model functions are written against MySQL (`%s` placeholders,
+UTC_TIMESTAMP(), ENUM, ON DUPLICATE KEY UPDATE, GREATEST(), ...).
+Connections from this backend translate each statement to SQLite once
+(cached) and return rows in the same shapes mysql.connector does: tuples
+or dicts, DECIMAL columns as Decimal and DATETIME columns as datetime.
+"""
+
+import datetime
+import fcntl
+import queue
+import re
+import sqlite3
+import threading
+from decimal import Decimal
+from functools import lru_cache
+
+PRAGMAS = (
+    "PRAGMA journal_mode = WAL",
+    "PRAGMA synchronous = NORMAL",
+    "PRAGMA foreign_keys = ON",
+    "PRAGMA temp_store = MEMORY",
+    "PRAGMA cache_size = -20000",  # ~20MB page cache per connection
+    "PRAGMA mmap_size = 268435456",
+    # Lets LIKE 'prefix%' use an index on a (default BINARY) text column;
+    # search columns are stored lowercased, so nothing relies on ci matching
+    "PRAGMA case_sensitive_like = ON",
+)
+
+_CENTS = Decimal("0.01")
+
+
+def _adapt_datetime(value):
+    return value.isoformat(" ")
+
+
+def _convert_datetime(value):
+    return datetime.datetime.fromisoformat(value.decode())
+
+
+def _convert_decimal(value):
+    return Decimal(value.decode()).quantize(_CENTS)
+
+
+sqlite3.register_adapter(datetime.datetime, _adapt_datetime)
+sqlite3.register_adapter(Decimal, str)
+sqlite3.register_converter("DATETIME", _convert_datetime)
+sqlite3.register_converter("DECIMAL", _convert_decimal)
+
+
+_REWRITES = (
+    (re.compile(r"%s"), "?"),
+    (re.compile(r"\bUTC_TIMESTAMP\(\)|\bNOW\(\)", re.I), "CURRENT_TIMESTAMP"),
+    (re.compile(r"\bINT\s+AUTO_INCREMENT\s+PRIMARY\s+KEY\b", re.I), "INTEGER PRIMARY KEY AUTOINCREMENT"),
+    (re.compile(r"\bENUM\s*\([^)]*\)", re.I), "TEXT"),
+    (re.compile(r"\)\s*ENGINE\s*=\s*\w+[^;]*", re.I), ")"),
+    (re.compile(r"\bINSERT\s+IGNORE\b", re.I), "INSERT OR IGNORE"),
+    (re.compile(r"\s+FOR\s+UPDATE\b", re.I), ""),
+    # Two-argument MAX() is SQLite's scalar GREATEST()
+    (re.compile(r"\bGREATEST\(", re.I), "MAX("),
+)
+# A locking read; see SQLiteCursor.execute
+_FOR_UPDATE = re.compile(r"\bFOR\s+UPDATE\b", re.I)
+_UPSERT = re.compile(r"\bON\s+DUPLICATE\s+KEY\s+UPDATE\b", re.I)
+_UPSERT_VALUES = re.compile(r"\bVALUES\s*\(\s*(\w+)\s*\)", re.I)
+
+
+@lru_cache(maxsize=512)
+def translate(sql):
+    """Rewrite a MySQL statement for SQLite."""
+    for pattern, replacement in _REWRITES:
+        sql = pattern.sub(replacement, sql)
+
+    match = _UPSERT.search(sql)
+    if match:
+        head, tail = sql[: match.start()], sql[match.end():]
+        tail = _UPSERT_VALUES.sub(r"excluded.\1", tail)
+        sql = f"{head}ON CONFLICT DO UPDATE SET{tail}"
+    return sql
+
+
+def is_duplicate_error(error):
+    return isinstance(error, sqlite3.IntegrityError) and "UNIQUE" in str(error)
+
+
+class SQLiteCursor:
+    """mysql.connector-style cursor over a sqlite3 cursor."""
+
+    def __init__(self, cursor, dictionary=False):
+        self._cursor = cursor
+        self._dictionary = dictionary
+        self._rows = None
+        self._index = 0
+        self.rowcount = -1
+
+    @property
+    def lastrowid(self):
+        return self._cursor.lastrowid
+
+    @property
+    def description(self):
+        return self._cursor.description
+
+    def _shape(self, rows):
+        if not self._dictionary or not rows:
+            return rows
+        columns = [d[0] for d in self._cursor.description]
+        return [dict(zip(columns, row)) for row in rows]
+
+    def execute(self, sql, params=None):
+        if _FOR_UPDATE.search(sql) and not self._cursor.connection.in_transaction:
+            # SQLite has no row locks: take the database's write lock before
+            # the read, so read-then-write is atomic as it is on MySQL. (An
+            # open transaction already holds it; sqlite3 only opens one
+            # before a write.)
+            self._cursor.execute("BEGIN IMMEDIATE")
+        self._cursor.execute(translate(sql), tuple(params or ()))
+        if self._cursor.description is not None:
+            # Result sets are always buffered, like buffered=True in MySQL
+            self._rows = self._shape(self._cursor.fetchall())
+            self._index = 0
+            self.rowcount = len(self._rows)
+        else:
+            self._rows = None
+            self.rowcount = self._cursor.rowcount
+
+    def executemany(self, sql, seq_params):
+        self._cursor.executemany(translate(sql), [tuple(p) for p in seq_params])
+        self._rows = None
+        self.rowcount = self._cursor.rowcount
+
+    def fetchone(self):
+        if not self._rows or self._index >= len(self._rows):
+            return None
+        row = self._rows[self._index]
+        self._index += 1
+        return row
+
+    def fetchall(self):
+        if self._rows is None:
+            return []
+        rows = self._rows[self._index:]
+        self._index = len(self._rows)
+        return rows
+
+    def __iter__(self):
+        return iter(self.fetchall())
+
+    def close(self):
+        self._cursor.close()
+
+
+class SQLiteConnection:
+    """A pooled sqlite3 connection; close() hands it back to the pool."""
+
+    def __init__(self, conn, pool):
+        self._conn = conn
+        self._pool = pool
+
+    def cursor(self, dictionary=False, buffered=True, **kwargs):
+        return SQLiteCursor(self._conn.cursor(), dictionary=dictionary)
+
+    def commit(self):
+        self._conn.commit()
+
+    def rollback(self):
+        self._conn.rollback()
+
+    def ping(self, reconnect=False):
+        self._conn.execute("SELECT 1")
+
+    def is_connected(self):
+        return True
+
+    def close(self):
+        if self._conn.in_transaction:
+            self._conn.rollback()
+        self._pool._release(self._conn)
+
+
+class FileLock:
+    """An flock, held until release() closes its file."""
+
+    def __init__(self, handle):
+        self._handle = handle
+
+    def held(self):
+        return True
+
+    def release(self):
+        if self._handle is not None:
+            self._handle.close()
+
+
+class SQLiteBackend:
+    """Fixed-size pool of WAL-mode connections to one database file."""
+
+    name = "sqlite"
+
+    def __init__(self, path, pool_size=5, busy_timeout_ms=5000, timeout=30):
+        self.path = path
+        self.pool_size = pool_size
+        self.busy_timeout_ms = busy_timeout_ms
+        self.timeout = timeout
+        self._idle = queue.LifoQueue()
+        self._created = 0
+        self._lock = threading.Lock()
+
+    def _connect(self):
+        conn = sqlite3.connect(
+            self.path,
+            detect_types=sqlite3.PARSE_DECLTYPES,
+            check_same_thread=False,
+            uri=True,
+            timeout=self.busy_timeout_ms / 1000,
+        )
+        for pragma in PRAGMAS:
+            conn.execute(pragma)
+        return conn
+
+    def get_connection(self):
+        try:
+            conn = self._idle.get_nowait()
+        except queue.Empty:
+            conn = None
+            with self._lock:
+                if self._created < self.pool_size:
+                    self._created += 1
+                    create = True
+                else:
+                    create = False
+            if create:
+                try:
+                    conn = self._connect()
+                except Exception:
+                    with self._lock:
+                        self._created -= 1
+                    raise
+            else:
+                try:
+                    conn = self._idle.get(timeout=self.timeout)
+                except queue.Empty:
+                    raise RuntimeError("SQLite pool exhausted")
+        return SQLiteConnection(conn, self)
+
+    def _release(self, conn):
+        self._idle.put(conn)
+
+    def in_use(self):
+        return self._created - self._idle.qsize()
+
+    def column_names(self, cursor, table):
+        """Names of `table`'s columns."""
+        cursor.execute(f"PRAGMA table_info({table})")
+        return {row[1] for row in cursor.fetchall()}
+
+    def try_lock(self, name):
+        """
+        Take the lock `name` for this database file (an flock on a file next
+        to it). Returns a FileLock, or None if another process holds it.
+        """
+        path = self.path.split("?", 1)[0].removeprefix("file:")
+        if path in ("", ":memory:"):
+            # Nothing else can open this database
+            return FileLock(None)
+        handle = open(f"{path}.{name}.lock", "a")
+        try:
+            fcntl.flock(handle, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except BlockingIOError:
+            handle.close()
+            return None
+        return FileLock(handle)
+
+    def is_duplicate_error(self, error):
+        return is_duplicate_error(error)
@@ -0,0 +1,174 @@
+"""
+Sales and check-in statistics.
+
+The counters in `ticket_stats` and the hourly buckets in
+`sales_rollup_hourly` are bumped by the model functions in the same
+transaction as the ticket change they count, so reading them costs a few
+rows per ticket type (or per type and hour) however many tickets have been
+sold. A background recount (STATS_RECOUNT_SECONDS) rebuilds both from
+`tickets` to correct any drift, e.g. from rows edited by hand. Every worker
+process runs the loop, but only the one holding the backend's recount lock
+rebuilds (see sweeper.py); on Vercel, where threads don't run between
+requests, the interval defaults to 0 and POST /admin/stats/recount can be
+called on a schedule instead.
+"""
+
+import datetime
+import threading
+import time
+from decimal import Decimal
+
+from flask import current_app
+
+from .db import get_backend, on_first_connect
+from .models import (
+    get_sales_rollup,
+    get_ticket_stats,
+    recount_sales_rollup,
+    recount_ticket_stats,
+    ticket_stats_is_empty,
+)
+
+_COUNTERS = (
+    "pending_orders",
+    "paid_orders",
+    "paid_quantity",
+    "revenue",
+    "checked_in_orders",
+)
+
+_ROLLUP_MEASURES = ("orders", "quantity", "total_price", "discount_amount", "final_price")
+ROLLUP_DIMENSIONS = ("ticket_type", "promo_code", "payment_status")
+GRANULARITIES = ("hour", "day")
+
+# Held by the one process that recounts
+RECOUNT_LOCK = "808api_recount"
+
+_recounter = None
+_recounter_lock = threading.Lock()
+
+
+def _as_number(value):
+    if value is None:
+        return 0
+    # SUM() comes back as Decimal on MySQL and int/float on SQLite
+    return round(float(value), 2) if isinstance(value, (Decimal, float)) else value
+
+
+def summarize(rows):
+    """Shape get_ticket_stats() rows into the /admin/stats response body."""
+    by_type = []
+    totals = dict.fromkeys(_COUNTERS, 0)
+    for row in rows:
+        counters = {name: _as_number(row[name]) for name in _COUNTERS}
+        counters["paid_quantity"] = int(counters["paid_quantity"])
+        for name in _COUNTERS:
+            totals[name] += counters[name]
+        by_type.append({"ticket_type": row["ticket_type"], **counters})
+
+    totals["revenue"] = round(totals["revenue"], 2)
+    totals["check_in_rate"] = (
+        round(totals["checked_in_orders"] / totals["paid_orders"], 4)
+        if totals["paid_orders"]
+        else 0
+    )
+    return {"by_type": by_type, "totals": totals}
+
+
+def get_stats():
+    return summarize(get_ticket_stats())
+
+
+def sales_series(start, end, granularity="hour", group_by=ROLLUP_DIMENSIONS, **filters):
+    """
+    Sales per hour or day in [start, end), one point per bucket and
+    combination of the group_by dimensions. filters are ticket_type,
+    promo_code and payment_status ('' means orders without a promo).
+    """
+    if granularity not in GRANULARITIES:
+        raise ValueError(f"granularity must be one of {', '.join(GRANULARITIES)}")
+    unknown = set(group_by) - set(ROLLUP_DIMENSIONS)
+    if unknown:
+        raise ValueError(f"Cannot group by {', '.join(sorted(unknown))}")
+
+    points = {}
+    for row in get_sales_rollup(start, end, **filters):
+        bucket = row["bucket"]
+        if granularity == "day":
+            bucket = bucket.replace(hour=0)
+        key = (bucket,) + tuple(row[d] for d in group_by)
+        point = points.setdefault(key, dict.fromkeys(_ROLLUP_MEASURES, 0))
+        for name in _ROLLUP_MEASURES:
+            point[name] += row[name]
+
+    series = []
+    for key, point in sorted(points.items()):
+        entry = {"bucket": key[0].isoformat()}
+        entry.update(zip(group_by, key[1:]))
+        entry.update((name, _as_number(value)) for name, value in point.items())
+        series.append(entry)
+    return series
+
+
+def truncate(moment, granularity):
+    """Start of the hour or day containing moment."""
+    moment = moment.replace(minute=0, second=0, microsecond=0)
+    return moment.replace(hour=0) if granularity == "day" else moment
+
+
+def default_range(granularity, now=None):
+    """Last 48 hours, or last 30 days, including the current bucket."""
+    end = truncate(now or datetime.datetime.utcnow(), granularity)
+    if granularity == "day":
+        return end - datetime.timedelta(days=29), end + datetime.timedelta(days=1)
+    return end - datetime.timedelta(hours=47), end + datetime.timedelta(hours=1)
+
+
+def recount():
+    """Rebuild the counters from the tickets table, logging any drift found."""
+    before, after = recount_ticket_stats()
+    recount_sales_rollup()
+    before, after = summarize(before)["totals"], summarize(after)["totals"]
+    drift = {
+        name: after[name] - before[name]
+        for name in _COUNTERS
+        if after[name] != before[name]
+    }
+    if drift:
+        current_app.logger.warning(f"Ticket stats drift corrected: {drift}")
+    return after
+
+
+def _recount_loop(app, interval):
+    lock = None
+    while True:
+        time.sleep(interval)
+        try:
+            with app.app_context():
+                if lock is not None and not lock.held():
+                    lock.release()
+                    lock = None
+                if lock is None:
+                    lock = get_backend().try_lock(RECOUNT_LOCK)
+                if lock is not None:
+                    recount()
+        except Exception as e:
+            app.logger.warning(f"Ticket stats recount failed: {e}")
+
+
+@on_first_connect
+def _init_ticket_stats():
+    """Backfill counters for existing tickets and start the periodic recount (see above)."""
+    global _recounter
+    if ticket_stats_is_empty():
+        recount_ticket_stats()
+        recount_sales_rollup()
+
+    app = current_app._get_current_object()
+    interval = app.config.get("STATS_RECOUNT_SECONDS") or 0
+    with _recounter_lock:
+        if interval > 0 and _recounter is None:
+            _recounter = threading.Thread(
+                target=_recount_loop, args=(app, interval), daemon=True
+            )
+            _recounter.start()
@@ -0,0 +1,108 @@
+"""
+Expiry of abandoned checkouts.
+
+A Paystack checkout that is never completed, or a manual payment whose
+MoMo transfer never arrives, leaves a pending row behind for good. Every
+SWEEP_INTERVAL_SECONDS a background thread moves pending rows older than
+their TTL to tickets_archive / manual_payments_archive, giving back any
+promo code use they took and taking them out of the /admin/stats counters.
+
+Rows are expired SWEEP_BATCH_SIZE at a time, each batch its own short
+transaction found through the (payment_status, created_at) index, so a
+large backlog never holds locks that checkouts and check-ins would queue
+on. A ticket whose payment completes after it expired is restored by
+/verify-payment (models.restore_expired_ticket), and a manual payment
+whose transfer arrives late by the confirm endpoints and the statement
+import (models.restore_expired_manual_payments).
+
+Every worker process runs the loop, but only the one holding the
+backend's sweeper lock (GET_LOCK on MySQL, a lock file next to the SQLite
+database) sweeps; if that process exits, another takes the lock at its
+next interval. Serverless deploys (Vercel) have no background threads
+between requests, so SWEEP_INTERVAL_SECONDS defaults to 0 there: call
+POST /admin/sweep-expired on a schedule instead (e.g. from a cron job).
+"""
+
+import datetime
+import threading
+import time
+
+from flask import current_app
+
+from .db import get_backend, on_first_connect
+from .models import expire_pending_manual_payments, expire_pending_tickets
+
+# Pause between batches, so other transactions get the rows' index pages
+_BATCH_PAUSE_SECONDS = 0.05
+
+# Held by the one process that sweeps
+SWEEPER_LOCK = "808api_sweeper"
+
+_sweeper = None
+_sweeper_lock = threading.Lock()
+
+
+def _expire_all(expire, ttl, batch_size, now):
+    if ttl <= 0:
+        return 0
+    older_than = now - datetime.timedelta(seconds=ttl)
+    total = 0
+    while True:
+        expired = expire(older_than, batch_size)
+        total += expired
+        if expired < batch_size:
+            return total
+        time.sleep(_BATCH_PAUSE_SECONDS)
+
+
+def sweep(now=None):
+    """Expire everything past its TTL; returns the number of rows expired by kind."""
+    config = current_app.config
+    now = now or datetime.datetime.utcnow()
+    batch_size = max(config.get("SWEEP_BATCH_SIZE") or 200, 1)
+    expired = {
+        "tickets": _expire_all(
+            expire_pending_tickets,
+            config.get("PENDING_TICKET_TTL_SECONDS") or 0,
+            batch_size,
+            now,
+        ),
+        "manual_payments": _expire_all(
+            expire_pending_manual_payments,
+            config.get("PENDING_MANUAL_PAYMENT_TTL_SECONDS") or 0,
+            batch_size,
+            now,
+        ),
+    }
+    if any(expired.values()):
+        current_app.logger.info(f"Expired abandoned checkouts: {expired}")
+    return expired
+
+
+def _sweep_loop(app, interval):
+    lock = None
+    while True:
+        time.sleep(interval)
+        try:
+            with app.app_context():
+                if lock is not None and not lock.held():
+                    lock.release()
+                    lock = None
+                if lock is None:
+                    lock = get_backend().try_lock(SWEEPER_LOCK)
+                if lock is not None:
+                    sweep()
+        except Exception as e:
+            app.logger.warning(f"Expiry sweep failed: {e}")
+
+
+@on_first_connect
+def _init_sweeper():
+    """Start the periodic sweep (which sweeps only once elected; see above)."""
+    global _sweeper
+    app = current_app._get_current_object()
+    interval = app.config.get("SWEEP_INTERVAL_SECONDS") or 0
+    with _sweeper_lock:
+        if interval > 0 and _sweeper is None:
+            _sweeper = threading.Thread(target=_sweep_loop, args=(app, interval), daemon=True)
+            _sweeper.start()
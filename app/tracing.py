@@ -0,0 +1,198 @@
+"""
+Per-request tracing.
+
+Every request gets a request id (taken from X-Request-ID when the caller
+sends one). Code wraps outbound work in span("paystack.verify") and the
+like; at the end of the request the spans are summed per category (the
+part before the first dot) and reported in a Server-Timing header and a
+single structured `app.trace` log line.
+
+The async endpoints (asgi.py) have no Flask request context; their trace
+lives in a context variable instead, which asyncio tasks and
+asyncio.to_thread() workers inherit.
+"""
+
+import contextlib
+import contextvars
+import json
+import logging
+import threading
+import time
+import uuid
+
+from flask import g, has_request_context, request
+
+trace_log = logging.getLogger("app.trace")
+
+_async_trace = contextvars.ContextVar("trace", default=None)
+
+
+class Span:
+    __slots__ = ("name", "parent", "start", "duration")
+
+    def __init__(self, name, parent, start, duration=None):
+        self.name = name
+        self.parent = parent
+        self.start = start
+        self.duration = duration
+
+    @property
+    def category(self):
+        return self.name.split(".", 1)[0]
+
+
+def _trace():
+    if not has_request_context():
+        return _async_trace.get()
+    return g.get("_trace")
+
+
+def _stack(trace):
+    # One stack per thread, so spans opened by fanout.submit() tasks nest
+    # under the span that submitted them rather than whatever is open on
+    # the request thread
+    return trace["stacks"].setdefault(threading.get_ident(), [])
+
+
+@contextlib.contextmanager
+def span(name):
+    """Time the enclosed block as a span of the current request."""
+    trace = _trace()
+    if trace is None:
+        yield None
+        return
+
+    stack = _stack(trace)
+    s = Span(name, stack[-1] if stack else None, time.perf_counter())
+    trace["spans"].append(s)
+    stack.append(s)
+    try:
+        yield s
+    finally:
+        s.duration = time.perf_counter() - s.start
+        stack.remove(s)
+
+
+def record_span(name, duration):
+    """Record an already-measured span (e.g. a DB statement)."""
+    trace = _trace()
+    if trace is None:
+        return
+    stack = _stack(trace)
+    parent = stack[-1] if stack else None
+    trace["spans"].append(Span(name, parent, time.perf_counter() - duration, duration))
+
+
+def current_span():
+    trace = _trace()
+    if trace is None:
+        return None
+    stack = _stack(trace)
+    return stack[-1] if stack else None
+
+
+@contextlib.contextmanager
+def parent_span(parent):
+    """Nest spans opened in this block under `parent` (from another thread)."""
+    trace = _trace()
+    if trace is None or parent is None:
+        yield
+        return
+    stack = _stack(trace)
+    stack.append(parent)
+    try:
+        yield
+    finally:
+        stack.remove(parent)
+
+
+def current_request_id():
+    trace = _trace()
+    return trace["request_id"] if trace else None
+
+
+def breakdown(spans):
+    """Total time per category, not double counting nested same-category spans."""
+    totals = {}
+    counts = {}
+    for s in spans:
+        if s.duration is None:
+            continue
+        parent = s.parent
+        while parent is not None and parent.category != s.category:
+            parent = parent.parent
+        if parent is not None:
+            continue
+        totals[s.category] = totals.get(s.category, 0) + s.duration
+        counts[s.category] = counts.get(s.category, 0) + 1
+    return totals, counts
+
+
+def _new_trace(request):
+    return {
+        "request_id": request.headers.get("X-Request-ID") or uuid.uuid4().hex,
+        "start": time.perf_counter(),
+        "spans": [],
+        "stacks": {},
+    }
+
+
+def _report_trace(trace, request, response, log_enabled):
+    total = time.perf_counter() - trace["start"]
+    totals, counts = breakdown(trace["spans"])
+
+    timings = [f"{name};dur={secs * 1000:.1f}" for name, secs in totals.items()]
+    timings.append(f"total;dur={total * 1000:.1f}")
+    response.headers["Server-Timing"] = ", ".join(timings)
+    response.headers["X-Request-ID"] = trace["request_id"]
+
+    if log_enabled:
+        trace_log.info(
+            json.dumps(
+                {
+                    "request_id": trace["request_id"],
+                    "method": request.method,
+                    "endpoint": request.endpoint,
+                    "path": request.path,
+                    "status": response.status_code,
+                    "duration_ms": round(total * 1000, 1),
+                    "spans_ms": {k: round(v * 1000, 1) for k, v in totals.items()},
+                    "span_counts": counts,
+                }
+            )
+        )
+    return response
+
+
+def init_tracing(app):
+    @app.before_request
+    def _start_trace():
+        g._trace = _new_trace(request)
+
+    @app.after_request
+    def _finish_trace(response):
+        trace = g.pop("_trace", None)
+        if trace is None:
+            return response
+        return _report_trace(
+            trace, request, response, app.config.get("TRACE_LOG_ENABLED", True)
+        )
+
+
+def init_async_tracing(app):
+    """init_tracing() for the Quart app in asgi.py."""
+    from quart import request as async_request
+
+    @app.before_request
+    async def _start_trace():
+        _async_trace.set(_new_trace(async_request))
+
+    @app.after_request
+    async def _finish_trace(response):
+        trace = _async_trace.get()
+        if trace is None:
+            return response
+        _async_trace.set(None)
+        return _report_trace(
+            trace, async_request, response, app.config.get("TRACE_LOG_ENABLED", True)
+        )
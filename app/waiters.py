@@ -0,0 +1,74 @@
+"""
+In-process registry of long-poll requests waiting for a row to change.
+
+A handler watch()es a key before reading the row, so a change committed
+between its read and its wait still wakes it, then blocks until a model
+function calls notify(key) or its timeout passes. Only waiters in the same
+process are woken; the others time out and the client simply polls again.
+"""
+
+import threading
+from contextlib import contextmanager
+
+from .metrics import metrics
+
+metrics.describe("longpoll_waiters", "gauge", "Requests waiting in a long poll")
+metrics.describe("longpoll_total", "counter", "Long polls by outcome")
+
+
+class WaiterRegistry:
+    """key -> the threading.Events of the requests waiting on it."""
+
+    def __init__(self, max_waiters=1000):
+        self.max_waiters = max_waiters
+        self._waiters = {}
+        self._count = 0
+        self._lock = threading.Lock()
+
+    @contextmanager
+    def watch(self, key):
+        """Yields an Event that is set on notify(key), or None if the registry is full."""
+        event = threading.Event()
+        with self._lock:
+            if self._count >= self.max_waiters:
+                event = None
+            else:
+                self._waiters.setdefault(key, set()).add(event)
+                self._count += 1
+        try:
+            yield event
+        finally:
+            if event is not None:
+                with self._lock:
+                    waiters = self._waiters[key]
+                    waiters.discard(event)
+                    if not waiters:
+                        del self._waiters[key]
+                    self._count -= 1
+
+    def notify(self, key):
+        """Wake everything waiting on key; returns how many were woken."""
+        with self._lock:
+            waiters = list(self._waiters.get(key, ()))
+        for event in waiters:
+            event.set()
+        return len(waiters)
+
+    def count(self):
+        return self._count
+
+
+registry = WaiterRegistry()
+
+
+def watch(key):
+    return registry.watch(key)
+
+
+def notify(key):
+    return registry.notify(key)
+
+
+def init_waiters(app):
+    registry.max_waiters = app.config.get("LONGPOLL_MAX_WAITERS", 1000)
+    metrics.register_gauge_callback(lambda: [("longpoll_waiters", (), registry.count())])
@@ -0,0 +1,270 @@
+"""
+Sync vs async concurrency comparison.
+
+Starts the synchronous Flask app (run:app under a threaded WSGI server) and
+the ASGI app (asgi:app under uvicorn) in turn, each against the same
+Paystack/Resend stubs and a scratch database, and drives them with a
+closed-loop client: N concurrent buyers each doing purchase -> verify
+back to back for --duration seconds. N steps through --levels. For every
+server and level it reports throughput, latency percentiles and errors,
+and the highest level that still meets the SLO (--slo-p99-ms, --slo-errors)
+is reported as that server's concurrency limit.
+
+    pip install -r requirements-async.txt gunicorn
+    python -m bench.async_compare --levels 10,100,500,1000 --duration 20
+
+Use --sync-cmd / --async-cmd to change the servers (for example more
+gunicorn threads or workers), or --server NAME=CMD (repeatable) to compare
+any set of commands, e.g. gunicorn's gthread and gevent workers:
+
+    python -m bench.async_compare --backend sqlite \
+        --server "gthread=gunicorn -k gthread --threads 16 -w 1 -b 127.0.0.1:{port} run:app" \
+        --server "gevent=gunicorn -k gevent -w 1 -b 127.0.0.1:{port} run:app"
+
+"{port}" is replaced with a free port.
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import random
+import socket
+import subprocess
+import sys
+import time
+import uuid
+
+from . import stubs
+from .loadtest import create_scratch_database, drop_scratch_database, percentile
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+DEFAULT_SYNC_CMD = (
+    "gunicorn --worker-class gthread --workers 1 --threads 16 --backlog 2048 "
+    "--bind 127.0.0.1:{port} run:app"
+)
+DEFAULT_ASYNC_CMD = (
+    "uvicorn asgi:app --workers 1 --backlog 2048 --host 127.0.0.1 --port {port}"
+)
+
+
+def free_port():
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def start_server(cmd):
+    """Start a server command; returns (base_url, process) once it answers."""
+    import httpx
+
+    port = free_port()
+    process = subprocess.Popen(
+        cmd.format(port=port).split(),
+        cwd=ROOT,
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.DEVNULL,
+    )
+    base_url = f"http://127.0.0.1:{port}"
+    deadline = time.monotonic() + 30
+    while time.monotonic() < deadline:
+        if process.poll() is not None:
+            raise RuntimeError(f"{cmd!r} exited with {process.returncode}")
+        try:
+            if httpx.get(f"{base_url}/", timeout=1).status_code == 200:
+                return base_url, process
+        except httpx.HTTPError:
+            pass
+        time.sleep(0.2)
+    process.terminate()
+    raise RuntimeError(f"{cmd!r} did not come up within 30s")
+
+
+def stop_server(process):
+    process.terminate()
+    try:
+        process.wait(timeout=10)
+    except subprocess.TimeoutExpired:
+        process.kill()
+
+
+async def buyer(client, base_url, deadline, latencies, statuses):
+    """One closed-loop user: purchase, then verify, until the deadline."""
+
+    def record(start, status):
+        latencies.append(time.perf_counter() - start)
+        statuses[status] = statuses.get(status, 0) + 1
+
+    while time.perf_counter() < deadline:
+        n = uuid.uuid4().hex[:10]
+        start = time.perf_counter()
+        try:
+            response = await client.post(
+                f"{base_url}/buy-ticket",
+                json={
+                    "email": f"compare+{n}@example.com",
+                    "name": f"Compare {n}",
+                    "phone": f"024{random.randint(1000000, 9999999)}",
+                },
+            )
+            status = response.status_code
+        except Exception:
+            status = 0  # connection error / timeout
+        record(start, status)
+        if status != 200:
+            continue
+
+        reference = response.json()["data"]["reference"]
+        start = time.perf_counter()
+        try:
+            response = await client.get(
+                f"{base_url}/verify-payment", params={"reference": reference}
+            )
+            status = response.status_code
+        except Exception:
+            status = 0
+        record(start, status)
+
+
+async def run_level(base_url, concurrency, duration, timeout):
+    import httpx
+
+    latencies = []
+    statuses = {}
+    limits = httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency)
+    async with httpx.AsyncClient(timeout=timeout, limits=limits) as client:
+        start = time.perf_counter()
+        deadline = start + duration
+        await asyncio.gather(
+            *(
+                buyer(client, base_url, deadline, latencies, statuses)
+                for _ in range(concurrency)
+            )
+        )
+        wall = time.perf_counter() - start
+
+    latencies.sort()
+    ok = sum(c for s, c in statuses.items() if 200 <= s < 300)
+    return {
+        "concurrency": concurrency,
+        "requests": len(latencies),
+        "ok": ok,
+        "errors": len(latencies) - ok,
+        "error_pct": round(100 * (len(latencies) - ok) / len(latencies), 2)
+        if latencies
+        else 0,
+        "statuses": {str(k): v for k, v in sorted(statuses.items())},
+        "throughput_rps": round(ok / wall, 2) if wall else 0,
+        "latency_ms": {
+            "p50": round(percentile(latencies, 50) * 1000, 1),
+            "p95": round(percentile(latencies, 95) * 1000, 1),
+            "p99": round(percentile(latencies, 99) * 1000, 1),
+            "max": round((latencies[-1] if latencies else 0) * 1000, 1),
+        },
+    }
+
+
+def concurrency_limit(results, slo_p99_ms, slo_errors):
+    """Highest concurrency level whose p99 and error rate met the SLO."""
+    passing = [
+        r["concurrency"]
+        for r in results
+        if r["latency_ms"]["p99"] <= slo_p99_ms and r["error_pct"] <= slo_errors
+    ]
+    return max(passing) if passing else None
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--levels", default="10,50,100,250,500,1000")
+    parser.add_argument("--duration", type=float, default=15, help="seconds per level")
+    parser.add_argument("--timeout", type=float, default=30, help="client timeout")
+    parser.add_argument("--sync-cmd", default=DEFAULT_SYNC_CMD)
+    parser.add_argument("--async-cmd", default=DEFAULT_ASYNC_CMD)
+    parser.add_argument(
+        "--server",
+        action="append",
+        metavar="NAME=CMD",
+        help="compare these servers instead of --sync-cmd/--async-cmd",
+    )
+    parser.add_argument("--paystack-latency-ms", type=float, default=300)
+    parser.add_argument("--paystack-jitter-ms", type=float, default=50)
+    parser.add_argument("--resend-latency-ms", type=float, default=150)
+    parser.add_argument("--resend-jitter-ms", type=float, default=30)
+    parser.add_argument("--slo-p99-ms", type=float, default=2000)
+    parser.add_argument("--slo-errors", type=float, default=1.0, help="max error %%")
+    parser.add_argument("--backend", choices=("mysql", "sqlite"), default="mysql")
+    parser.add_argument("--keep-db", action="store_true")
+    parser.add_argument("--json", dest="json_path", help="also write results here")
+    args = parser.parse_args(argv)
+
+    levels = sorted(int(n) for n in args.levels.split(","))
+    if args.server:
+        servers = [tuple(spec.split("=", 1)) for spec in args.server]
+    else:
+        servers = [("sync", args.sync_cmd), ("async", args.async_cmd)]
+    paystack = stubs.start_paystack(
+        latency_ms=args.paystack_latency_ms, jitter_ms=args.paystack_jitter_ms
+    )
+    resend = stubs.start_resend(
+        latency_ms=args.resend_latency_ms, jitter_ms=args.resend_jitter_ms
+    )
+    scratch_db = create_scratch_database(args.backend)
+    # Inherited by the server processes
+    os.environ.update(
+        {
+            "PAYSTACK_BASE_URL": paystack.url,
+            "PAYSTACK_SECRET_KEY": "sk_test_loadtest",
+            "RESEND_API_URL": resend.url,
+            "RESEND_API_KEY": "re_loadtest",
+            "RATELIMIT_ENABLED": "false",
+            "TRACE_LOG_ENABLED": "false",
+            "PRICING_REFRESH_SECONDS": "0",
+        }
+    )
+
+    report = {"config": vars(args), "servers": {}}
+    try:
+        for name, cmd in servers:
+            base_url, process = start_server(cmd)
+            results = []
+            try:
+                for level in levels:
+                    result = asyncio.run(
+                        run_level(base_url, level, args.duration, args.timeout)
+                    )
+                    results.append(result)
+                    latency = result["latency_ms"]
+                    print(
+                        f"{name:<8} c={level:<5} ok={result['ok']:<6} "
+                        f"err={result['error_pct']}% {result['throughput_rps']:>8} rps  "
+                        f"p50={latency['p50']}ms p95={latency['p95']}ms "
+                        f"p99={latency['p99']}ms",
+                        file=sys.stderr,
+                    )
+            finally:
+                stop_server(process)
+            report["servers"][name] = {
+                "cmd": cmd,
+                "results": results,
+                "concurrency_limit": concurrency_limit(
+                    results, args.slo_p99_ms, args.slo_errors
+                ),
+            }
+
+        for name, server in report["servers"].items():
+            print(f"{name}: concurrency limit {server['concurrency_limit']}")
+        if args.json_path:
+            with open(args.json_path, "w") as f:
+                json.dump(report, f, indent=2)
+        return report
+    finally:
+        for stub in (paystack, resend):
+            stub.stop()
+        if not args.keep_db:
+            drop_scratch_database(scratch_db, args.backend)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,375 @@
+"""
+End-to-end load test.
+
+Boots create_app() against local Paystack and Resend stubs and a scratch
+MySQL database, then drives purchase -> verify -> check-in traffic at a
+target rate and reports throughput, latency percentiles and pool
+saturation per scenario.
+
+    python -m bench.loadtest --rps 50 --duration 30 --paystack-latency-ms 300
+
+The scratch database is created on MYSQL_HOST (with MYSQL_USER /
+MYSQL_PASSWORD), or as a temporary SQLite file with --backend sqlite, and
+dropped afterwards unless --keep-db is given. Pass
+--target-url to load an already running server instead of booting one.
+"""
+
+import argparse
+import json
+import os
+import queue
+import random
+import re
+import tempfile
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+
+import requests
+
+from . import stubs
+
+SCENARIOS = ("purchase", "verify", "checkin")
+
+_local = threading.local()
+
+
+def _session():
+    session = getattr(_local, "session", None)
+    if session is None:
+        session = _local.session = requests.Session()
+    return session
+
+
+def percentile(sorted_values, pct):
+    if not sorted_values:
+        return 0.0
+    index = min(len(sorted_values) - 1, int(round(pct / 100 * (len(sorted_values) - 1))))
+    return sorted_values[index]
+
+
+class PoolSampler(threading.Thread):
+    """Polls /metrics and tracks pool occupancy while a scenario runs."""
+
+    def __init__(self, base_url, interval=0.1):
+        super().__init__(daemon=True)
+        self.base_url = base_url
+        self.interval = interval
+        self.samples = []
+        self.pool_size = None
+        self._done = threading.Event()
+
+    def scrape(self):
+        text = requests.get(f"{self.base_url}/metrics", timeout=5).text
+        values = {}
+        for name in (
+            "db_pool_size",
+            "db_pool_connections_in_use",
+        ):
+            match = re.search(rf"^{name} (\S+)$", text, re.M)
+            if match:
+                values[name] = float(match.group(1))
+        for name in ("db_pool_checkout_seconds_sum", "db_pool_checkout_seconds_count"):
+            values[name] = sum(
+                float(v) for v in re.findall(rf"^{name}\{{.*\}} (\S+)$", text, re.M)
+            )
+        return values
+
+    def run(self):
+        while not self._done.is_set():
+            try:
+                values = self.scrape()
+                self.pool_size = values.get("db_pool_size", self.pool_size)
+                if "db_pool_connections_in_use" in values:
+                    self.samples.append(values["db_pool_connections_in_use"])
+            except requests.RequestException:
+                pass
+            self._done.wait(self.interval)
+
+    def stop(self):
+        self._done.set()
+        self.join()
+
+
+def run_scenario(name, base_url, rps, duration, workers, call):
+    """
+    Open-loop driver: call number i is due at start + i / rps regardless of
+    how earlier calls are doing. Latency is measured from the due time, so
+    queueing behind a saturated server shows up in the percentiles.
+    """
+    latencies = []
+    statuses = {}
+    skipped = 0
+    lock = threading.Lock()
+
+    def one(due):
+        nonlocal skipped
+        try:
+            status = call()
+        except requests.RequestException:
+            status = 0  # connection error / timeout
+        elapsed = time.perf_counter() - due
+        with lock:
+            if status is None:
+                skipped += 1
+                return
+            latencies.append(elapsed)
+            statuses[status] = statuses.get(status, 0) + 1
+
+    sampler = PoolSampler(base_url)
+    sampler.start()
+    total = int(rps * duration)
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        for i in range(total):
+            due = start + i / rps
+            delay = due - time.perf_counter()
+            if delay > 0:
+                time.sleep(delay)
+            executor.submit(one, due)
+    wall = time.perf_counter() - start
+    sampler.stop()
+
+    final = {}
+    try:
+        final = sampler.scrape()
+    except requests.RequestException:
+        pass
+
+    latencies.sort()
+    ok = sum(c for s, c in statuses.items() if 200 <= s < 300)
+    samples = sampler.samples
+    pool_size = sampler.pool_size
+    checkout_count = final.get("db_pool_checkout_seconds_count") or 0
+    return {
+        "scenario": name,
+        "target_rps": rps,
+        "requests": len(latencies),
+        "ok": ok,
+        "errors": len(latencies) - ok,
+        "skipped": skipped,
+        "statuses": {str(k): v for k, v in sorted(statuses.items())},
+        "throughput_rps": round(ok / wall, 2) if wall else 0,
+        "latency_ms": {
+            "p50": round(percentile(latencies, 50) * 1000, 1),
+            "p95": round(percentile(latencies, 95) * 1000, 1),
+            "p99": round(percentile(latencies, 99) * 1000, 1),
+            "max": round((latencies[-1] if latencies else 0) * 1000, 1),
+        },
+        "pool": {
+            "size": pool_size,
+            "max_in_use": max(samples) if samples else None,
+            "mean_in_use": round(sum(samples) / len(samples), 2) if samples else None,
+            "saturated_pct": (
+                round(100 * sum(1 for s in samples if s >= pool_size) / len(samples), 1)
+                if samples and pool_size
+                else None
+            ),
+            "mean_checkout_ms": (
+                round(1000 * final["db_pool_checkout_seconds_sum"] / checkout_count, 3)
+                if checkout_count
+                else None
+            ),
+        },
+    }
+
+
+def make_calls(base_url):
+    """Build the per-scenario request functions, chained through queues."""
+    purchased = queue.Queue()
+    verified = queue.Queue()
+
+    def purchase():
+        n = uuid.uuid4().hex[:10]
+        response = _session().post(
+            f"{base_url}/buy-ticket",
+            json={
+                "email": f"loadtest+{n}@example.com",
+                "name": f"Load Test {n}",
+                "phone": f"024{random.randint(1000000, 9999999)}",
+                "quantity": random.choice((1, 1, 1, 2, 4)),
+            },
+            timeout=60,
+        )
+        if response.status_code == 200:
+            data = response.json()["data"]
+            purchased.put((data["reference"], data["ticket_code"]))
+        return response.status_code
+
+    def verify():
+        try:
+            reference, ticket_code = purchased.get_nowait()
+        except queue.Empty:
+            return None
+        response = _session().get(
+            f"{base_url}/verify-payment", params={"reference": reference}, timeout=60
+        )
+        if response.status_code == 200:
+            verified.put(ticket_code)
+        return response.status_code
+
+    def checkin():
+        try:
+            ticket_code = verified.get_nowait()
+        except queue.Empty:
+            return None
+        response = _session().post(
+            f"{base_url}/check-in/{ticket_code}",
+            # Group orders too, as one whole-group check-in each
+            json={"checked_in_by": "loadtest", "admit_all": True},
+            timeout=60,
+        )
+        return response.status_code
+
+    return {"purchase": purchase, "verify": verify, "checkin": checkin}
+
+
+def create_scratch_database(backend="mysql"):
+    """Create an empty database and point the app's env vars at it."""
+    name = f"mm_loadtest_{uuid.uuid4().hex[:8]}"
+    if backend == "sqlite":
+        path = os.path.join(tempfile.gettempdir(), f"{name}.db")
+        os.environ.update({"DB_BACKEND": "sqlite", "SQLITE_PATH": path})
+        return path
+
+    import mysql.connector
+
+    conn = mysql.connector.connect(
+        host=os.getenv("MYSQL_HOST"),
+        user=os.getenv("MYSQL_USER"),
+        password=os.getenv("MYSQL_PASSWORD"),
+    )
+    conn.cursor().execute(f"CREATE DATABASE `{name}` CHARACTER SET utf8mb4")
+    conn.close()
+    os.environ.update({"DB_BACKEND": "mysql", "MYSQL_DB": name})
+    return name
+
+
+def drop_scratch_database(name, backend="mysql"):
+    if backend == "sqlite":
+        for suffix in ("", "-wal", "-shm"):
+            if os.path.exists(name + suffix):
+                os.remove(name + suffix)
+        return
+
+    import mysql.connector
+
+    conn = mysql.connector.connect(
+        host=os.getenv("MYSQL_HOST"),
+        user=os.getenv("MYSQL_USER"),
+        password=os.getenv("MYSQL_PASSWORD"),
+    )
+    conn.cursor().execute(f"DROP DATABASE IF EXISTS `{name}`")
+    conn.close()
+
+
+def boot_app():
+    """Start create_app() on a local threaded server; returns (url, stop)."""
+    from werkzeug.serving import make_server
+
+    from app import create_app
+    from app.models import insert_waitlist
+
+    app = create_app()
+    with app.app_context():
+        # Make sure the waitlist table exists for check_waitlist_status
+        insert_waitlist(f"loadtest+seed-{uuid.uuid4().hex[:8]}@example.com")
+
+    server = make_server("127.0.0.1", 0, app, threaded=True)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    host, port = server.server_address
+    return f"http://{host}:{port}", server.shutdown
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--rps", type=float, default=20, help="target requests/sec")
+    parser.add_argument("--duration", type=float, default=20, help="seconds per scenario")
+    parser.add_argument("--workers", type=int, default=64, help="client threads")
+    parser.add_argument("--scenarios", default=",".join(SCENARIOS))
+    parser.add_argument("--paystack-latency-ms", type=float, default=250)
+    parser.add_argument("--paystack-jitter-ms", type=float, default=50)
+    parser.add_argument("--paystack-error-rate", type=float, default=0.0)
+    parser.add_argument("--resend-latency-ms", type=float, default=150)
+    parser.add_argument("--resend-jitter-ms", type=float, default=30)
+    parser.add_argument("--resend-error-rate", type=float, default=0.0)
+    parser.add_argument("--backend", choices=("mysql", "sqlite"), default="mysql")
+    parser.add_argument("--target-url", help="load a running server instead")
+    parser.add_argument("--keep-db", action="store_true")
+    parser.add_argument("--json", dest="json_path", help="also write results here")
+    args = parser.parse_args(argv)
+
+    paystack = resend = None
+    scratch_db = None
+    stop = None
+    try:
+        if args.target_url:
+            base_url = args.target_url.rstrip("/")
+        else:
+            paystack = stubs.start_paystack(
+                latency_ms=args.paystack_latency_ms,
+                jitter_ms=args.paystack_jitter_ms,
+                error_rate=args.paystack_error_rate,
+            )
+            resend = stubs.start_resend(
+                latency_ms=args.resend_latency_ms,
+                jitter_ms=args.resend_jitter_ms,
+                error_rate=args.resend_error_rate,
+            )
+            scratch_db = create_scratch_database(args.backend)
+            # config.py and routes.py read these at import time
+            os.environ.update(
+                {
+                    "PAYSTACK_BASE_URL": paystack.url,
+                    "PAYSTACK_SECRET_KEY": "sk_test_loadtest",
+                    "RESEND_API_URL": resend.url,
+                    "RESEND_API_KEY": "re_loadtest",
+                    "RATELIMIT_ENABLED": "false",
+                    "TRACE_LOG_ENABLED": "false",
+                }
+            )
+            base_url, stop = boot_app()
+
+        calls = make_calls(base_url)
+        results = []
+        for name in args.scenarios.split(","):
+            result = run_scenario(
+                name, base_url, args.rps, args.duration, args.workers, calls[name]
+            )
+            results.append(result)
+            latency = result["latency_ms"]
+            pool = result["pool"]
+            print(
+                f"{name:<9} ok={result['ok']:<6} err={result['errors']:<5} "
+                f"skip={result['skipped']:<5} {result['throughput_rps']:>7} rps  "
+                f"p50={latency['p50']}ms p95={latency['p95']}ms p99={latency['p99']}ms  "
+                f"pool max={pool['max_in_use']}/{pool['size']} "
+                f"saturated={pool['saturated_pct']}%"
+            )
+
+        report = {
+            "config": vars(args),
+            "stubs": {
+                "paystack_requests": paystack.requests if paystack else None,
+                "resend_requests": resend.requests if resend else None,
+            },
+            "results": results,
+        }
+        if args.json_path:
+            with open(args.json_path, "w") as f:
+                json.dump(report, f, indent=2)
+        return report
+    finally:
+        if stop:
+            stop()
+        for stub in (paystack, resend):
+            if stub:
+                stub.stop()
+        if scratch_db and not args.keep_db:
+            drop_scratch_database(scratch_db, args.backend)
+
+
+if __name__ == "__main__":
+    main()
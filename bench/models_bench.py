@@ -0,0 +1,291 @@
+"""
+Micro-benchmarks for the hot model functions.
+
+Seeds a scratch database with a bulk loader and times insert_ticket,
+generate_ticket_code, get_ticket_by_code, check_in_ticket, get_all_tickets
+and confirm_manual_payment at each table size. The table is grown in place
+between sizes (1k -> 100k -> 1M by default), so each step only loads the
+difference.
+
+    python -m bench.models_bench --sizes 1000,100000 --json results.json
+    python -m bench.models_bench --backend sqlite --sizes 1000
+    python -m bench.models_bench --baseline results.json --threshold 20
+
+Results are JSON (one record per size and function). With --baseline the
+run exits non-zero if any p50 regressed by more than --threshold percent.
+"""
+
+import argparse
+import datetime
+import json
+import os
+import random
+import sys
+import time
+import uuid
+
+from .loadtest import create_scratch_database, drop_scratch_database, percentile
+
+DEFAULT_SIZES = (1000, 100000, 1000000)
+SEED_BATCH = 5000
+_ALPHABET = "0123456789ABCDEFGHIJKLMNOPQRSTUVWXYZ"
+
+
+def seed_code(n, prefix="MM-", width=6):
+    """Deterministic unique code for seeded row n (base 36)."""
+    chars = []
+    for _ in range(width):
+        n, r = divmod(n, 36)
+        chars.append(_ALPHABET[r])
+    return prefix + "".join(reversed(chars))
+
+
+def bulk_load(conn, table, columns, rows):
+    """Insert rows with multi-row INSERTs, SEED_BATCH rows per statement."""
+    cursor = conn.cursor()
+    placeholders = "(" + ", ".join(["%s"] * len(columns)) + ")"
+    sql = f"INSERT INTO {table} ({', '.join(columns)}) VALUES {placeholders}"
+    batch = []
+    for row in rows:
+        batch.append(row)
+        if len(batch) >= SEED_BATCH:
+            cursor.executemany(sql, batch)
+            conn.commit()
+            batch = []
+    if batch:
+        cursor.executemany(sql, batch)
+        conn.commit()
+    cursor.close()
+
+
+TICKET_COLUMNS = (
+    "user_email",
+    "name",
+    "phone",
+    "price",
+    "total_price",
+    "quantity",
+    "ticket_type",
+    "reference",
+    "payment_status",
+    "ticket_code",
+    "discount_amount",
+    "final_price",
+    "created_at",
+)
+
+MANUAL_COLUMNS = (
+    "user_email",
+    "name",
+    "phone",
+    "ticket_type",
+    "quantity",
+    "price",
+    "total_price",
+    "final_price",
+    "discount_amount",
+    "reference_code",
+    "momo_number",
+    "created_at",
+)
+
+
+def grow_tables(start, stop):
+    """Bring tickets and manual_payments from `start` to `stop` rows."""
+    from app.db import get_conn
+    from app.models import create_manual_payments_table, create_tickets_table
+
+    launch = datetime.datetime(2025, 10, 1)
+
+    def tickets():
+        for i in range(start, stop):
+            yield (
+                f"seed{i}@example.com",
+                f"Seed Guest {i}",
+                f"024{i % 10000000:07d}",
+                150,
+                150,
+                1,
+                "regular",
+                f"SEED-{i}",
+                "paid",
+                seed_code(i),
+                0,
+                150,
+                launch + datetime.timedelta(seconds=i),
+            )
+
+    def manual_payments():
+        # One pending manual payment per 10 tickets, like a real sale
+        for i in range(start // 10, stop // 10):
+            yield (
+                f"seed{i}@example.com",
+                f"Seed Guest {i}",
+                f"024{i % 10000000:07d}",
+                "regular",
+                1,
+                150,
+                150,
+                150,
+                0,
+                seed_code(i, prefix="S", width=5),
+                "0240000000",
+                launch + datetime.timedelta(seconds=i),
+            )
+
+    conn = get_conn()
+    try:
+        create_tickets_table(conn)
+        create_manual_payments_table(conn)
+        bulk_load(conn, "tickets", TICKET_COLUMNS, tickets())
+        bulk_load(conn, "manual_payments", MANUAL_COLUMNS, manual_payments())
+    finally:
+        conn.close()
+
+
+def time_calls(fn, iterations):
+    samples = []
+    for _ in range(iterations):
+        start = time.perf_counter()
+        fn()
+        samples.append(time.perf_counter() - start)
+    samples.sort()
+    total = sum(samples)
+    return {
+        "iterations": iterations,
+        "mean_ms": round(1000 * total / iterations, 3),
+        "p50_ms": round(1000 * percentile(samples, 50), 3),
+        "p95_ms": round(1000 * percentile(samples, 95), 3),
+        "p99_ms": round(1000 * percentile(samples, 99), 3),
+        "ops_per_sec": round(iterations / total, 1) if total else None,
+    }
+
+
+def benchmarks(size, iterations):
+    """(name, callable, iterations) for one table size."""
+    from app import models
+
+    unchecked = list(range(size))
+    random.shuffle(unchecked)
+    pending = list(range(size // 10))
+    random.shuffle(pending)
+
+    def insert_ticket():
+        models.insert_ticket(
+            email="bench@example.com",
+            name="Bench",
+            phone="0240000000",
+            price=150,
+            reference=f"BENCH-{uuid.uuid4().hex}",
+        )
+
+    def get_ticket_by_code():
+        models.get_ticket_by_code(seed_code(random.randrange(size)))
+
+    def check_in_ticket():
+        models.check_in_ticket(seed_code(unchecked.pop()), "bench", admit_all=True)
+
+    def confirm_manual_payment():
+        models.confirm_manual_payment(
+            seed_code(pending.pop(), prefix="S", width=5), "bench"
+        )
+
+    # get_all_tickets returns the whole table, so run it far fewer times
+    full_scans = max(1, min(iterations, 2000000 // max(size, 1)))
+    return [
+        ("insert_ticket", insert_ticket, iterations),
+        ("generate_ticket_code", models.generate_ticket_code, iterations),
+        ("get_ticket_by_code", get_ticket_by_code, iterations),
+        ("check_in_ticket", check_in_ticket, min(iterations, size)),
+        ("get_all_tickets", models.get_all_tickets, full_scans),
+        ("confirm_manual_payment", confirm_manual_payment, min(iterations, size // 10)),
+    ]
+
+
+def compare(results, baseline, threshold):
+    """Return regressions: p50 slower than baseline by more than threshold %."""
+    previous = {(r["size"], r["function"]): r for r in baseline["results"]}
+    regressions = []
+    for r in results:
+        before = previous.get((r["size"], r["function"]))
+        if not before or not before["p50_ms"]:
+            continue
+        change = 100 * (r["p50_ms"] - before["p50_ms"]) / before["p50_ms"]
+        if change > threshold:
+            regressions.append(
+                {
+                    "size": r["size"],
+                    "function": r["function"],
+                    "baseline_p50_ms": before["p50_ms"],
+                    "p50_ms": r["p50_ms"],
+                    "change_pct": round(change, 1),
+                }
+            )
+    return regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument(
+        "--sizes", default=",".join(str(s) for s in DEFAULT_SIZES)
+    )
+    parser.add_argument("--iterations", type=int, default=200)
+    parser.add_argument("--json", dest="json_path", help="write results here")
+    parser.add_argument("--baseline", help="previous --json output to compare")
+    parser.add_argument("--threshold", type=float, default=20.0)
+    parser.add_argument("--backend", choices=("mysql", "sqlite"), default="mysql")
+    parser.add_argument("--keep-db", action="store_true")
+    args = parser.parse_args(argv)
+
+    sizes = sorted(int(s) for s in args.sizes.split(","))
+    scratch_db = create_scratch_database(args.backend)
+    os.environ["TRACE_LOG_ENABLED"] = "false"
+    os.environ["PRICING_REFRESH_SECONDS"] = "0"
+
+    try:
+        from app import create_app
+
+        app = create_app()
+        results = []
+        loaded = 0
+        with app.app_context():
+            for size in sizes:
+                start = time.perf_counter()
+                grow_tables(loaded, size)
+                loaded = size
+                print(
+                    f"seeded {size} tickets in {time.perf_counter() - start:.1f}s",
+                    file=sys.stderr,
+                )
+                for name, fn, iterations in benchmarks(size, args.iterations):
+                    record = {"size": size, "function": name}
+                    record.update(time_calls(fn, iterations))
+                    results.append(record)
+                    print(json.dumps(record), file=sys.stderr)
+
+        report = {
+            "generated_at": datetime.datetime.utcnow().isoformat(),
+            "sizes": sizes,
+            "results": results,
+        }
+        if args.json_path:
+            with open(args.json_path, "w") as f:
+                json.dump(report, f, indent=2)
+        else:
+            print(json.dumps(report, indent=2))
+
+        if args.baseline:
+            with open(args.baseline) as f:
+                regressions = compare(results, json.load(f), args.threshold)
+            for r in regressions:
+                print(f"REGRESSION {json.dumps(r)}", file=sys.stderr)
+            if regressions:
+                return 1
+        return 0
+    finally:
+        if not args.keep_db:
+            drop_scratch_database(scratch_db, args.backend)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,97 @@
+"""
+Cold-start profile for the serverless entry point.
+
+Imports run.py (which calls create_app()) in fresh interpreters, the way a
+cold Vercel lambda does, and reports the median time plus the slowest
+imports from `python -X importtime`. Exits non-zero if the median exceeds
+--budget-ms or if any module that should load lazily was imported at
+startup. tests/test_startup.py runs the same checks as part of the test
+suite.
+
+    python -m bench.startup_profile --runs 5 --budget-ms 400
+"""
+
+import argparse
+import os
+import re
+import statistics
+import subprocess
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Only needed once a request actually talks to MySQL, Paystack or Resend
+LAZY_MODULES = ("mysql.connector", "requests", "resend")
+
+_PROBE = (
+    "import time; start = time.perf_counter(); import run; "
+    "print((time.perf_counter() - start) * 1000)"
+)
+_IMPORTTIME = re.compile(r"^import time:\s+(\d+) \|\s+(\d+) \|(\s*)(\S+)$")
+
+
+def cold_start_ms():
+    out = subprocess.run(
+        [sys.executable, "-c", _PROBE],
+        cwd=ROOT,
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+    return float(out.stdout.strip().splitlines()[-1])
+
+
+def import_profile():
+    """[(module, self_us, cumulative_us, depth)] for one cold import of run."""
+    out = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", "import run"],
+        cwd=ROOT,
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+    rows = []
+    for line in out.stderr.splitlines():
+        match = _IMPORTTIME.match(line)
+        if match:
+            self_us, cumulative_us, indent, module = match.groups()
+            rows.append((module, int(self_us), int(cumulative_us), len(indent) // 2))
+    return rows
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--budget-ms", type=float, default=400)
+    parser.add_argument("--top", type=int, default=15)
+    args = parser.parse_args(argv)
+
+    samples = [cold_start_ms() for _ in range(args.runs)]
+    median = statistics.median(samples)
+    print(
+        f"cold start (import run): median={median:.1f}ms "
+        f"min={min(samples):.1f}ms max={max(samples):.1f}ms over {args.runs} runs"
+    )
+
+    rows = import_profile()
+    print(f"\nslowest imports (cumulative, top {args.top}):")
+    for module, self_us, cumulative_us, depth in sorted(
+        rows, key=lambda r: r[2], reverse=True
+    )[: args.top]:
+        print(f"  {cumulative_us / 1000:8.1f}ms  {self_us / 1000:7.1f}ms self  {module}")
+
+    failures = []
+    if median > args.budget_ms:
+        failures.append(f"median {median:.1f}ms exceeds budget {args.budget_ms}ms")
+    imported = {r[0] for r in rows}
+    for module in LAZY_MODULES:
+        if module in imported:
+            failures.append(f"{module} is imported at startup")
+
+    for failure in failures:
+        print(f"FAIL: {failure}", file=sys.stderr)
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
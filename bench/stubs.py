@@ -0,0 +1,151 @@
+"""
+Local stand-ins for Paystack and Resend.
+
+Each stub is a threaded HTTP server that answers the handful of endpoints
+the API calls, after an artificial delay and with a configurable error
+rate, so sale-day traffic can be rehearsed without touching the real
+services.
+"""
+
+import json
+import random
+import threading
+import time
+import uuid
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+
+class _StubHTTPServer(ThreadingHTTPServer):
+    daemon_threads = True
+    # Read by listen() in the constructor, so it must be set on the class
+    request_queue_size = 1024
+
+
+class StubServer:
+    """Runs a handler class on 127.0.0.1:<free port> in a background thread."""
+
+    def __init__(self, handler, latency_ms=0, jitter_ms=0, error_rate=0.0):
+        self.latency_ms = latency_ms
+        self.jitter_ms = jitter_ms
+        self.error_rate = error_rate
+        self.requests = 0
+        self.errors = 0
+        self._lock = threading.Lock()
+
+        server = _StubHTTPServer(("127.0.0.1", 0), handler)
+        server.stub = self
+        self._server = server
+        self._thread = threading.Thread(target=server.serve_forever, daemon=True)
+
+    @property
+    def url(self):
+        host, port = self._server.server_address
+        return f"http://{host}:{port}"
+
+    def start(self):
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._server.shutdown()
+        self._server.server_close()
+
+    def delay_and_roll(self):
+        """Sleep for the configured latency; return True if this call fails."""
+        delay = self.latency_ms + random.uniform(-self.jitter_ms, self.jitter_ms)
+        if delay > 0:
+            time.sleep(delay / 1000)
+        failed = random.random() < self.error_rate
+        with self._lock:
+            self.requests += 1
+            if failed:
+                self.errors += 1
+        return failed
+
+
+class _JSONHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def log_message(self, format, *args):
+        pass
+
+    def read_json(self):
+        length = int(self.headers.get("Content-Length") or 0)
+        body = self.rfile.read(length) if length else b""
+        return json.loads(body) if body else {}
+
+    def send_json(self, status, payload):
+        body = json.dumps(payload).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+
+class PaystackHandler(_JSONHandler):
+    """/transaction/initialize and /transaction/verify/<reference>."""
+
+    def do_POST(self):
+        payload = self.read_json()
+        if self.server.stub.delay_and_roll():
+            return self.send_json(500, {"status": False, "message": "Stub error"})
+        if self.path != "/transaction/initialize":
+            return self.send_json(404, {"status": False, "message": "Not found"})
+
+        reference = f"LT-{uuid.uuid4().hex[:16]}"
+        self.send_json(
+            200,
+            {
+                "status": True,
+                "message": "Authorization URL created",
+                "data": {
+                    "authorization_url": f"https://checkout.example/{reference}",
+                    "access_code": uuid.uuid4().hex[:15],
+                    "reference": reference,
+                    "amount": payload.get("amount"),
+                },
+            },
+        )
+
+    def do_GET(self):
+        if self.server.stub.delay_and_roll():
+            return self.send_json(500, {"status": False, "message": "Stub error"})
+        prefix = "/transaction/verify/"
+        if not self.path.startswith(prefix):
+            return self.send_json(404, {"status": False, "message": "Not found"})
+
+        reference = self.path[len(prefix):]
+        self.send_json(
+            200,
+            {
+                "status": True,
+                "message": "Verification successful",
+                "data": {"status": "success", "reference": reference},
+            },
+        )
+
+
+class ResendHandler(_JSONHandler):
+    """/emails and /emails/batch."""
+
+    def do_POST(self):
+        payload = self.read_json()
+        if self.server.stub.delay_and_roll():
+            return self.send_json(
+                500, {"name": "internal_server_error", "message": "Stub error"}
+            )
+        if self.path == "/emails":
+            return self.send_json(200, {"id": str(uuid.uuid4())})
+        if self.path == "/emails/batch":
+            ids = [{"id": str(uuid.uuid4())} for _ in payload]
+            return self.send_json(200, {"data": ids})
+        self.send_json(404, {"name": "not_found", "message": "Not found"})
+
+
+def start_paystack(**kwargs):
+    return StubServer(PaystackHandler, **kwargs).start()
+
+
+def start_resend(**kwargs):
+    return StubServer(ResendHandler, **kwargs).start()
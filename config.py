@@ -12,7 +12,101 @@ class Config:
     MYSQL_USER = os.getenv("MYSQL_USER")
     MYSQL_PASSWORD = os.getenv("MYSQL_PASSWORD")
     MYSQL_DB = os.getenv("MYSQL_DB")
+    # "mysql" (default) or "sqlite" for single-node deployments and local runs
+    DB_BACKEND = os.getenv("DB_BACKEND", "mysql").lower()
+    SQLITE_PATH = os.getenv("SQLITE_PATH", "808api.db")
+    DB_POOL_SIZE = int(os.getenv("DB_POOL_SIZE", 5))
+    # One connection per container, so a fleet of lambdas stays under max_connections
+    DB_SINGLE_CONNECTION = os.getenv("DB_SINGLE_CONNECTION", "false").lower() == "true"
+    DB_CHECKOUT_TIMEOUT = float(os.getenv("DB_CHECKOUT_TIMEOUT", 10))
+    DB_CONNECT_TIMEOUT = int(os.getenv("DB_CONNECT_TIMEOUT", 5))
+    # Ping connections that have been idle longer than this before reusing them
+    DB_PING_AFTER_SECONDS = float(os.getenv("DB_PING_AFTER_SECONDS", 30))
+    # Read replica for @read_only model functions (admin listings); user and
+    # password default to the primary's
+    MYSQL_REPLICA_HOST = os.getenv("MYSQL_REPLICA_HOST")
+    MYSQL_REPLICA_USER = os.getenv("MYSQL_REPLICA_USER")
+    MYSQL_REPLICA_PASSWORD = os.getenv("MYSQL_REPLICA_PASSWORD")
+    DB_REPLICA_POOL_SIZE = int(os.getenv("DB_REPLICA_POOL_SIZE", 3))
+    # After a failed replica checkout, use the primary for this long
+    DB_REPLICA_RETRY_SECONDS = float(os.getenv("DB_REPLICA_RETRY_SECONDS", 30))
+    # Pure Python MySQL protocol; needed under gevent (see gunicorn.conf.py)
+    DB_USE_PURE = os.getenv("DB_USE_PURE", "false").lower() == "true"
     RESEND_API_KEY = os.getenv("RESEND_API_KEY")
     RESEND_VERIFIED_DOMAIN = os.getenv("VERIFIED_DOMAIN")
     ADMIN_EMAIL = os.getenv("ADMIN_EMAIL")
     MOMO_NUMBER = os.getenv("MOMO_NUMBER")
+    # How often (seconds) to check ticket_types for changes; 0 disables
+    PRICING_REFRESH_SECONDS = int(os.getenv("PRICING_REFRESH_SECONDS", 30))
+    # Event the events table is seeded with (as the current event) when it is
+    # empty; add later events and switch or archive them with `flask events`
+    EVENT_CODE = os.getenv("EVENT_CODE", "midnight-madness-3")
+    EVENT_TITLE = os.getenv("EVENT_TITLE", "MIDNIGHT MADNESS III")
+    EVENT_DATE = os.getenv("EVENT_DATE", "2025-10-31")
+    EVENT_VENUE = os.getenv("EVENT_VENUE", "[Redacted], Accra")
+    # How often (seconds) to rebuild /admin/stats counters from tickets; 0
+    # disables. Off on Vercel (see app/stats.py)
+    STATS_RECOUNT_SECONDS = int(
+        os.getenv("STATS_RECOUNT_SECONDS", 0 if os.getenv("VERCEL") else 3600)
+    )
+    # /admin/events: frames buffered per client before it is evicted as too
+    # slow, max connected clients, and events kept for Last-Event-ID replay
+    EVENTS_CLIENT_BUFFER = int(os.getenv("EVENTS_CLIENT_BUFFER", 100))
+    EVENTS_MAX_CLIENTS = int(os.getenv("EVENTS_MAX_CLIENTS", 100))
+    EVENTS_HISTORY = int(os.getenv("EVENTS_HISTORY", 200))
+    EVENTS_HEARTBEAT_SECONDS = float(os.getenv("EVENTS_HEARTBEAT_SECONDS", 15))
+    # redis:// URL that shares events between processes (required with more
+    # than one worker, and on Vercel); see app/events.py
+    EVENTS_REDIS_URL = os.getenv("EVENTS_REDIS_URL")
+    # Seconds a publish waits on Redis before delivering to this process only
+    EVENTS_REDIS_TIMEOUT = float(os.getenv("EVENTS_REDIS_TIMEOUT", 0.5))
+    # Longest a ?wait= long poll is held open, and how many may wait at once
+    LONGPOLL_MAX_SECONDS = float(os.getenv("LONGPOLL_MAX_SECONDS", 25))
+    LONGPOLL_MAX_WAITERS = int(os.getenv("LONGPOLL_MAX_WAITERS", 1000))
+    # Manual payments confirmed/rejected per transaction by batch operations
+    MANUAL_BATCH_CHUNK_SIZE = int(os.getenv("MANUAL_BATCH_CHUNK_SIZE", 100))
+    # Largest MoMo statement /admin/import-momo-statement accepts (bytes)
+    MOMO_IMPORT_MAX_BYTES = int(os.getenv("MOMO_IMPORT_MAX_BYTES", 2 * 1024 * 1024))
+    # Largest guest list POST /admin/comps accepts (bytes, and rows)
+    COMP_LIST_MAX_BYTES = int(os.getenv("COMP_LIST_MAX_BYTES", 2 * 1024 * 1024))
+    COMP_LIST_MAX_ROWS = int(os.getenv("COMP_LIST_MAX_ROWS", 5000))
+    # Send bulk confirmation emails from a background thread. Off by default
+    # on Vercel (which sets VERCEL=1): threads don't run between requests
+    # there, so queued emails would never go out
+    EMAIL_QUEUE_ENABLED = (
+        os.getenv("EMAIL_QUEUE_ENABLED", "false" if os.getenv("VERCEL") else "true").lower()
+        == "true"
+    )
+    # Pending tickets and manual payments older than these TTLs (seconds) are
+    # expired and archived every SWEEP_INTERVAL_SECONDS, SWEEP_BATCH_SIZE rows
+    # per transaction; a TTL or the interval of 0 disables. Off on Vercel,
+    # where a scheduled POST /admin/sweep-expired does it (see app/sweeper.py)
+    PENDING_TICKET_TTL_SECONDS = int(os.getenv("PENDING_TICKET_TTL_SECONDS", 2 * 3600))
+    PENDING_MANUAL_PAYMENT_TTL_SECONDS = int(
+        os.getenv("PENDING_MANUAL_PAYMENT_TTL_SECONDS", 48 * 3600)
+    )
+    SWEEP_INTERVAL_SECONDS = int(
+        os.getenv("SWEEP_INTERVAL_SECONDS", 0 if os.getenv("VERCEL") else 300)
+    )
+    SWEEP_BATCH_SIZE = int(os.getenv("SWEEP_BATCH_SIZE", 200))
+    # Rate limiting for public endpoints; set a redis:// URL to share buckets
+    RATELIMIT_ENABLED = os.getenv("RATELIMIT_ENABLED", "true").lower() == "true"
+    RATELIMIT_STORAGE_URL = os.getenv("RATELIMIT_STORAGE_URL")
+    RATELIMIT_MAX_KEYS = int(os.getenv("RATELIMIT_MAX_KEYS", 10000))
+    # Proxies in front of the app that append to X-Forwarded-For (Vercel's
+    # edge is one); the client IP is the hop the outermost of them added.
+    # 0 when clients connect directly
+    TRUSTED_PROXY_HOPS = int(os.getenv("TRUSTED_PROXY_HOPS", 1))
+    # Optional bearer token required to scrape /metrics
+    METRICS_TOKEN = os.getenv("METRICS_TOKEN")
+    # Statements slower than this (milliseconds) go to the slow-query log
+    SLOW_QUERY_MS = float(os.getenv("SLOW_QUERY_MS", 200))
+    # Emit one structured log line per request with its timing breakdown
+    TRACE_LOG_ENABLED = os.getenv("TRACE_LOG_ENABLED", "true").lower() == "true"
+    # Async endpoints (asgi.py): aiomysql pool and outbound HTTP limits
+    ASYNC_DB_POOL_SIZE = int(os.getenv("ASYNC_DB_POOL_SIZE", 20))
+    ASYNC_DB_POOL_RECYCLE = int(os.getenv("ASYNC_DB_POOL_RECYCLE", 280))
+    ASYNC_HTTP_MAX_CONNECTIONS = int(os.getenv("ASYNC_HTTP_MAX_CONNECTIONS", 500))
+    ASYNC_HTTP_TIMEOUT = float(os.getenv("ASYNC_HTTP_TIMEOUT", 30))
+    # Threads shared by requests for running independent I/O concurrently
+    FANOUT_MAX_WORKERS = int(os.getenv("FANOUT_MAX_WORKERS", 8))
@@ -0,0 +1,81 @@
+"""
+Production server profile.
+
+    pip install -r requirements-server.txt
+    gunicorn run:app                 # reads this file from the working directory
+
+Workers are gevent workers: Paystack/Resend calls, MySQL reads and pool
+waits yield to other requests instead of pinning an OS thread, so one
+worker holds GUNICORN_WORKER_CONNECTIONS requests in flight.
+
+The database pool is sized from the same numbers. DB_MAX_CONNECTIONS is the
+share of MySQL's max_connections this deployment may use; each worker gets
+DB_MAX_CONNECTIONS // workers connections (never more than it has
+greenlets). Requests only hold a connection for the length of a model call,
+so a pool far smaller than worker_connections is enough; excess requests
+wait up to DB_CHECKOUT_TIMEOUT for one. Setting DB_POOL_SIZE explicitly
+overrides the derived value.
+
+Workers share nothing in memory: with more than one, set EVENTS_REDIS_URL
+so every /admin/events stream sees every worker's events (app/events.py).
+
+Load test: bench/async_compare with a SQLite scratch database, the
+Paystack stub at 300±50ms and the Resend stub at 150±30ms. Each buyer runs
+purchase then verify in a closed loop, one worker, 10s per level. The run
+was on a single vCPU shared with the stubs and the load generator:
+
+    concurrency   gthread, 16 threads          gevent, 1000 connections
+                  rps    p50      p99          rps    p50      p99
+    10            23.6   425ms    566ms        24.0   421ms    555ms
+    50            38.7   1197ms   1575ms       83.9   570ms    877ms
+    100           38.5   2372ms   3111ms       96.1   960ms    1756ms
+    250           32.9   5702ms   9279ms       38.4   4675ms   10377ms
+
+gthread tops out at threads / round trip (~40 rps) and queues everything
+beyond that. gevent keeps latency near the stub round trip until the CPU
+is saturated; at 250 the shared core is the bottleneck. With the default
+2s p99 SLO, the highest concurrency that passed was 50 for gthread and
+100 for gevent.
+"""
+
+import multiprocessing
+import os
+
+bind = f"0.0.0.0:{os.getenv('PORT', '5000')}"
+worker_class = os.getenv("GUNICORN_WORKER_CLASS", "gevent")
+# gevent workers are single OS threads, so one per core
+workers = int(os.getenv("WEB_CONCURRENCY", multiprocessing.cpu_count()))
+worker_connections = int(os.getenv("GUNICORN_WORKER_CONNECTIONS", 1000))
+backlog = 2048
+
+timeout = int(os.getenv("GUNICORN_TIMEOUT", 30))
+graceful_timeout = 20
+keepalive = 5
+# Recycle workers now and then so slow leaks can't accumulate
+max_requests = 5000
+max_requests_jitter = 500
+
+# The app must be imported after gevent has patched the worker, not in the
+# master
+preload_app = False
+
+accesslog = "-"
+errorlog = "-"
+
+_db_budget = int(os.getenv("DB_MAX_CONNECTIONS", 60))
+_pool_size = max(1, min(worker_connections, _db_budget // workers))
+os.environ.setdefault("DB_POOL_SIZE", str(_pool_size))
+if worker_class == "gevent":
+    # mysql-connector's C extension blocks the event loop; the pure Python
+    # protocol uses (patched) sockets and yields while waiting on MySQL
+    os.environ.setdefault("DB_USE_PURE", "true")
+
+
+def post_worker_init(worker):
+    worker.log.info(
+        "worker %s: %s, %s connections, DB pool %s",
+        worker.pid,
+        worker_class,
+        worker_connections,
+        os.environ["DB_POOL_SIZE"],
+    )
@@ -4,4 +4,5 @@ from config import Config
 app = create_app()
 
 if __name__ == "__main__":
-    app.run(debug=True, port=Config.PORT)
+    # Local development only; production runs gunicorn (see gunicorn.conf.py)
+    app.run(debug=Config.ENV == "development", port=Config.PORT)
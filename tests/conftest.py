@@ -0,0 +1,72 @@
+"""
+Shared fixtures.
+
+`app` runs each test against every storage backend: always SQLite (a fresh
+file per test), and MySQL when MYSQL_TEST_HOST is set. The MySQL database
+(MYSQL_TEST_DB, default 808api_test) is emptied before each test, so point
+it at a throwaway database.
+"""
+
+import os
+
+import pytest
+
+from config import Config
+
+BACKENDS = ["sqlite", "mysql"]
+
+
+def _drop_mysql_tables(app):
+    from app.db import get_backend
+
+    conn = get_backend().get_connection()
+    try:
+        cursor = conn.cursor()
+        cursor.execute("SHOW TABLES")
+        for (table,) in cursor.fetchall():
+            cursor.execute(f"DROP TABLE `{table}`")
+        cursor.close()
+    finally:
+        conn.close()
+
+
+@pytest.fixture(params=BACKENDS)
+def app(request, tmp_path, monkeypatch):
+    settings = {
+        "DB_BACKEND": request.param,
+        "SQLITE_PATH": str(tmp_path / "test.db"),
+        # No background threads
+        "PRICING_REFRESH_SECONDS": 0,
+        "STATS_RECOUNT_SECONDS": 0,
+        "SWEEP_INTERVAL_SECONDS": 0,
+        "EMAIL_QUEUE_ENABLED": False,
+        "TRACE_LOG_ENABLED": False,
+        "RATELIMIT_ENABLED": False,
+        "MYSQL_REPLICA_HOST": None,
+    }
+    if request.param == "mysql":
+        if not os.getenv("MYSQL_TEST_HOST"):
+            pytest.skip("MYSQL_TEST_HOST not set")
+        settings.update(
+            MYSQL_HOST=os.getenv("MYSQL_TEST_HOST"),
+            MYSQL_USER=os.getenv("MYSQL_TEST_USER", "root"),
+            MYSQL_PASSWORD=os.getenv("MYSQL_TEST_PASSWORD", ""),
+            MYSQL_DB=os.getenv("MYSQL_TEST_DB", "808api_test"),
+        )
+    for key, value in settings.items():
+        monkeypatch.setattr(Config, key, value)
+
+    from app import create_app, pricing
+
+    app = create_app()
+    with app.app_context():
+        if request.param == "mysql":
+            _drop_mysql_tables(app)
+        # The snapshot is per process; load this database's
+        pricing.reload_pricing()
+        yield app
+
+
+@pytest.fixture
+def client(app):
+    return app.test_client()
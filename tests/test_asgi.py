@@ -0,0 +1,109 @@
+"""
+The ASGI app (asgi.py) end to end against the Paystack and Resend stubs:
+buy and verify go through the Quart endpoints, check-in through Flask.
+Needs requirements-async.txt.
+"""
+
+import asyncio
+
+import pytest
+
+pytest.importorskip("quart")
+httpx = pytest.importorskip("httpx")
+
+from app import async_routes, models  # noqa: E402
+from bench import stubs  # noqa: E402
+
+
+@pytest.fixture
+def asgi(app, monkeypatch):
+    from app.asgi import PathDispatcher, create_async_app
+
+    paystack = stubs.start_paystack()
+    resend = stubs.start_resend()
+    monkeypatch.setattr(async_routes, "PAYSTACK_BASE_URL", paystack.url)
+    monkeypatch.setattr(async_routes, "RESEND_API_URL", resend.url)
+    quart_app = create_async_app(app)
+    try:
+        yield quart_app, PathDispatcher(quart_app, app)
+    finally:
+        paystack.stop()
+        resend.stop()
+
+
+def _run(asgi, requests):
+    """Serve `requests(client)` with the Quart app started, as uvicorn would."""
+    quart_app, dispatcher = asgi
+
+    async def main():
+        await quart_app.startup()
+        try:
+            transport = httpx.ASGITransport(app=dispatcher)
+            async with httpx.AsyncClient(
+                transport=transport, base_url="http://test"
+            ) as client:
+                return await requests(client)
+        finally:
+            await quart_app.shutdown()
+
+    return asyncio.run(main())
+
+
+def _purchase(**extra):
+    return {
+        "email": "buyer@example.com",
+        "name": "Async Buyer",
+        "phone": "0241234567",
+        "quantity": 2,
+        **extra,
+    }
+
+
+def test_buy_verify_and_check_in(asgi):
+    async def requests(client):
+        bought = await client.post("/buy-ticket", json=_purchase())
+        reference = bought.json()["data"]["reference"]
+        verified = await client.get("/verify-payment", params={"reference": reference})
+        checked_in = await client.post(
+            f"/check-in/{bought.json()['data']['ticket_code']}", json={"admit_all": True}
+        )
+        return bought, verified, checked_in
+
+    bought, verified, checked_in = _run(asgi, requests)
+
+    assert bought.status_code == 200, bought.json()
+    assert "X-Request-ID" in bought.headers
+    assert "paystack;dur=" in bought.headers["Server-Timing"]
+    assert verified.status_code == 200, verified.json()
+    assert verified.json()["payment_status"] == "paid"
+    assert verified.json()["email_sent"] is True
+    assert checked_in.status_code == 200, checked_in.json()
+    assert checked_in.json()["data"]["admitted"] == 2
+
+
+def test_promo_priced_once(asgi):
+    models.create_promo_code("HALF", "percentage", 50, max_uses=1)
+
+    async def requests(client):
+        return await client.post("/buy-ticket", json=_purchase(promo_code="HALF"))
+
+    bought = _run(asgi, requests).json()["data"]
+    ticket = models.get_ticket_by_reference(bought["reference"])
+
+    # The quote the buyer was charged is the one stored
+    assert float(bought["discount_amount"]) > 0
+    assert float(ticket["final_price"]) == float(bought["final_price"])
+    assert float(ticket["discount_amount"]) == float(bought["discount_amount"])
+    assert models.get_promo_code("HALF")["used_count"] == 1
+
+
+def test_rate_limited(asgi):
+    quart_app, _ = asgi
+    quart_app.config["RATELIMIT_ENABLED"] = True
+
+    async def requests(client):
+        return [(await client.get("/verify-payment")).status_code for _ in range(25)]
+
+    statuses = _run(asgi, requests)
+    assert statuses[:20] == [400] * 20
+    assert 429 in statuses
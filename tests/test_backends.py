@@ -0,0 +1,285 @@
+"""
+Model functions that depend on MySQL-only SQL, run against every backend
+(see conftest.py). On SQLite these go through sqlite_backend.translate().
+"""
+
+import datetime
+import threading
+
+import pytest
+
+from app import models, search, stats
+from app.db import get_conn
+from app.sqlite_backend import translate
+
+
+def _scalar(sql, params=()):
+    conn = get_conn()
+    try:
+        cursor = conn.cursor()
+        cursor.execute(sql, params)
+        (value,) = cursor.fetchone()
+        cursor.close()
+        return value
+    finally:
+        conn.close()
+
+
+def _paid_ticket(reference, quantity=1, promo_code=None):
+    ticket = models.insert_ticket(
+        f"{reference.lower()}@example.com",
+        "Test Buyer",
+        "0241234567",
+        150,
+        reference,
+        quantity=quantity,
+        promo_code=promo_code,
+    )
+    assert models.update_ticket_payment_status(reference, "paid")
+    return ticket
+
+
+@pytest.mark.parametrize(
+    "mysql, sqlite",
+    [
+        ("SELECT * FROM t WHERE a = %s FOR UPDATE", "SELECT * FROM t WHERE a = ?"),
+        ("INSERT IGNORE INTO t (a) VALUES (%s)", "INSERT OR IGNORE INTO t (a) VALUES (?)"),
+        ("UPDATE t SET n = GREATEST(n - %s, 0)", "UPDATE t SET n = MAX(n - ?, 0)"),
+        (
+            "INSERT INTO t (a, n) VALUES (%s, %s) ON DUPLICATE KEY UPDATE n = n + VALUES(n)",
+            "INSERT INTO t (a, n) VALUES (?, ?) ON CONFLICT DO UPDATE SET n = n + excluded.n",
+        ),
+        ("SELECT UTC_TIMESTAMP()", "SELECT CURRENT_TIMESTAMP"),
+    ],
+)
+def test_translate(mysql, sqlite):
+    assert translate(mysql) == sqlite
+
+
+def test_upsert_updates_existing_row(app):
+    models.upsert_ticket_type("vip", "VIP", 500)
+    models.upsert_ticket_type("vip", "VIP+", 600, sort_order=3)
+
+    rows = [t for t in models.get_all_ticket_types() if t["code"] == "vip"]
+    assert len(rows) == 1
+    assert rows[0]["name"] == "VIP+"
+    assert rows[0]["price"] == 600
+    assert rows[0]["sort_order"] == 3
+
+
+def test_upsert_accumulates_counters(app):
+    _paid_ticket("UPS-1", quantity=2)
+    _paid_ticket("UPS-2", quantity=3)
+
+    totals = stats.get_stats()["totals"]
+    assert totals["paid_orders"] == 2
+    assert totals["paid_quantity"] == 5
+    assert totals["revenue"] == 750
+    # Incremental counters agree with a full recount
+    stats.recount()
+    assert stats.get_stats()["totals"] == totals
+
+
+def test_recount_reports_only_real_drift(app):
+    _paid_ticket("DRF-1")
+    conn = get_conn()
+    try:
+        cursor = conn.cursor()
+        # A counter edited by hand
+        cursor.execute("UPDATE ticket_stats SET paid_orders = paid_orders + 5 WHERE paid_orders > 0")
+        conn.commit()
+        cursor.close()
+    finally:
+        conn.close()
+
+    before, after = models.recount_ticket_stats()
+    assert sum(r["paid_orders"] for r in before) == 6
+    assert sum(r["paid_orders"] for r in after) == 1
+
+
+def test_insert_ignore_skips_duplicates(app):
+    ticket = _paid_ticket("IGN-1", quantity=3)
+    assert len(models.get_ticket_admissions(ticket["ticket_code"])) == 3
+
+    # Marking it paid again re-runs the same INSERT IGNORE
+    models.update_ticket_payment_status("IGN-1", "paid")
+    admissions = models.get_ticket_admissions(ticket["ticket_code"])
+    assert [a["seq"] for a in admissions] == [1, 2, 3]
+
+
+def test_for_update_reads_inside_transactions(app):
+    ticket = _paid_ticket("LCK-1", quantity=2)
+    code = ticket["ticket_code"]
+
+    assert not models.check_in_ticket(code, "gate")
+    assert models.check_in_ticket(code, "gate", admit_all=True)
+    assert not models.check_in_ticket(code, "gate", admit_all=True)
+    assert models.get_ticket_by_code(code)["admitted"] == 2
+
+
+def test_greatest_floors_promo_release_at_zero(app):
+    models.create_promo_code("HALF", "percentage", 50)
+    models.insert_ticket(
+        "exp@example.com", "Exp", "0241234567", 150, "EXP-1", promo_code="HALF"
+    )
+    assert _scalar("SELECT used_count FROM promo_codes WHERE code = %s", ("HALF",)) == 1
+
+    # Release more uses than were counted: GREATEST() keeps it at 0
+    conn = get_conn()
+    try:
+        cursor = conn.cursor()
+        cursor.execute("UPDATE promo_codes SET used_count = 0 WHERE code = %s", ("HALF",))
+        conn.commit()
+        cursor.close()
+    finally:
+        conn.close()
+
+    future = datetime.datetime.utcnow() + datetime.timedelta(hours=1)
+    assert models.expire_pending_tickets(future, 10) == 1
+    assert _scalar("SELECT used_count FROM promo_codes WHERE code = %s", ("HALF",)) == 0
+
+
+def test_search_prefix_is_collation_independent(app):
+    for email, name in [
+        ("jazz@example.com", "Jazz Quartet"),
+        ("a_b@example.com", "Under Score"),
+        ("axb@example.com", "Ex Bee"),
+    ]:
+        models.insert_waitlist(email, name)
+
+    # Under utf8mb4_0900_ai_ci, "jaz"'s code point successor "ja{" sorts
+    # before "jazz"; and "_" must match only itself
+    assert [r["user_email"] for r in search.search("jaz")] == ["jazz@example.com"]
+    assert [r["user_email"] for r in search.search("a_b")] == ["a_b@example.com"]
+
+
+def test_add_search_columns_fills_partial_tables(app):
+    models.insert_waitlist("", "   ", None)
+    models.insert_waitlist("late@example.com", "Late Comer", "024 123 4567")
+    conn = get_conn()
+    try:
+        cursor = conn.cursor()
+        # A table migrated by older code: one column missing, rows unfilled
+        drop_index = "DROP INDEX idx_waitlist_phone_norm"
+        if app.config["DB_BACKEND"] == "mysql":
+            drop_index += " ON waitlist"
+        cursor.execute(drop_index)
+        cursor.execute("ALTER TABLE waitlist DROP COLUMN phone_norm")
+        cursor.execute("UPDATE waitlist SET email_lc = NULL, name_lc = NULL")
+        conn.commit()
+        cursor.close()
+
+        # Terminates although the first row's fields all normalize to NULL
+        models.add_search_columns(conn, batch_size=1)
+    finally:
+        conn.close()
+
+    assert [r["user_email"] for r in search.search("0241234567")] == ["late@example.com"]
+    assert _scalar("SELECT COUNT(*) FROM waitlist WHERE name_lc = 'late comer'") == 1
+
+
+def test_create_admissions_table_finishes_partial_migrations(app):
+    conn = get_conn()
+    try:
+        cursor = conn.cursor()
+        # A run that stopped after migrating tickets but before the archive
+        cursor.execute("ALTER TABLE tickets_archive DROP COLUMN admitted")
+        conn.commit()
+        cursor.close()
+
+        models.create_admissions_table(conn)
+    finally:
+        conn.close()
+
+    assert _scalar("SELECT COUNT(admitted) FROM tickets_archive") == 0
+
+
+def test_try_lock_elects_one_holder(app):
+    backend = app.extensions["db_pool"]
+    lock = backend.try_lock("test_lock")
+    try:
+        assert lock is not None and lock.held()
+        assert backend.try_lock("test_lock") is None
+    finally:
+        lock.release()
+    backend.try_lock("test_lock").release()
+
+
+def test_ticket_codes_skip_archived_codes(app, monkeypatch):
+    archived = models.insert_ticket(
+        "gone@example.com", "Gone", "0241234567", 150, "GONE-1"
+    )["ticket_code"]
+    future = datetime.datetime.utcnow() + datetime.timedelta(days=1)
+    assert models.expire_pending_tickets(future, 100) == 1
+
+    # Each generator's first candidate is the archived ticket's code
+    candidates = iter([archived, "MM-FRESH1", archived, "MM-FRESH2"])
+    monkeypatch.setattr(models, "_random_ticket_code", lambda: next(candidates))
+    assert models.generate_ticket_code() == "MM-FRESH1"
+    conn = get_conn()
+    try:
+        assert models.allocate_ticket_codes(conn, 1) == ["MM-FRESH2"]
+    finally:
+        conn.close()
+
+
+def _in_thread(app, fn, *args, **kwargs):
+    """Run fn in a thread of its own (so on a connection of its own)."""
+    result = {}
+
+    def run():
+        with app.app_context():
+            result["value"] = fn(*args, **kwargs)
+
+    thread = threading.Thread(target=run)
+    thread.start()
+    return thread, result
+
+
+def test_locking_reads_serialize_writers(app):
+    models.insert_ticket("race@example.com", "Race", "0241234567", 150, "RACE-1")
+
+    # A verify that locked the ticket first, on a connection of its own
+    conn = get_conn()
+    try:
+        cursor = conn.cursor(dictionary=True)
+        cursor.execute(models._LOCK_TICKET_SQL, ("RACE-1",))
+        ticket = cursor.fetchone()
+
+        thread, result = _in_thread(app, models.update_ticket_payment_status, "RACE-1")
+        thread.join(0.5)
+        assert thread.is_alive(), "the second update didn't wait for the lock"
+
+        cursor.execute(models._SET_PAYMENT_STATUS_SQL, ("paid", "RACE-1", "paid"))
+        for statement in models.payment_status_statements(ticket, "paid"):
+            cursor.execute(*statement)
+        conn.commit()
+        cursor.close()
+    finally:
+        conn.close()
+    thread.join()
+
+    assert result["value"] is False
+    assert stats.get_stats()["totals"]["paid_orders"] == 1
+
+
+def test_concurrent_check_ins_count_once(app):
+    code = _paid_ticket("RACE-2")["ticket_code"]
+
+    conn = get_conn()
+    try:
+        cursor = conn.cursor(dictionary=True)
+        cursor.execute(
+            "SELECT admitted FROM tickets WHERE ticket_code = %s FOR UPDATE", (code,)
+        )
+        thread, result = _in_thread(app, models.check_in_ticket, code, "gate")
+        thread.join(0.5)
+        assert thread.is_alive(), "the check-in didn't wait for the lock"
+        conn.rollback()
+    finally:
+        conn.close()
+    thread.join()
+
+    assert result["value"] is True
+    assert not models.check_in_ticket(code, "gate")
+    assert stats.get_stats()["totals"]["checked_in_orders"] == 1
@@ -0,0 +1,51 @@
+"""Gate check-in by admission code, and the whole-group override."""
+
+from app import models
+
+
+def _paid_group(reference, quantity):
+    ticket = models.insert_ticket(
+        f"{reference.lower()}@example.com", "Group", "0241234567", 150, reference,
+        quantity=quantity,
+    )
+    assert models.update_ticket_payment_status(reference, "paid")
+    return ticket["ticket_code"]
+
+
+def test_admission_codes_are_not_derived_from_the_ticket_code(app):
+    ticket_code = _paid_group("GRP-1", 3)
+    codes = models.get_admission_codes([ticket_code])[ticket_code]
+
+    assert len(set(codes)) == 3
+    assert all(models.is_admission_code(c) and ticket_code not in c for c in codes)
+    assert not models.check_in_admission(f"{ticket_code}-1")[0]
+
+
+def test_guests_check_in_with_their_own_codes(client):
+    ticket_code = _paid_group("GRP-2", 2)
+    first, second = models.get_admission_codes([ticket_code])[ticket_code]
+
+    assert client.post(f"/check-in/{first}", json={}).get_json()["data"]["admitted"] == 1
+    assert client.post(f"/check-in/{first}", json={}).status_code == 400
+    response = client.post(f"/check-in/{second}", json={})
+    assert response.get_json()["data"]["ticket_code"] == ticket_code
+    assert response.get_json()["data"]["admitted"] == 2
+
+
+def test_whole_group_needs_the_override(client):
+    ticket_code = _paid_group("GRP-3", 2)
+
+    refused = client.post(f"/check-in/{ticket_code}", json={})
+    assert refused.status_code == 400
+    assert models.get_ticket_by_code(ticket_code)["admitted"] == 0
+
+    admitted = client.post(f"/check-in/{ticket_code}", json={"admit_all": True})
+    assert admitted.status_code == 200, admitted.get_json()
+    assert admitted.get_json()["data"]["admitted"] == 2
+
+
+def test_single_ticket_checks_in_by_ticket_code(client):
+    ticket_code = _paid_group("ONE-1", 1)
+
+    response = client.post(f"/check-in/{ticket_code}", json={})
+    assert response.status_code == 200, response.get_json()
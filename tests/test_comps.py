@@ -0,0 +1,21 @@
+"""Comp (guest list) tickets through POST /admin/comps."""
+
+from app import routes
+
+
+def test_issued_tickets_reported_when_emails_fail(client, monkeypatch):
+    def fail_to_queue(tickets):
+        raise RuntimeError("queue unavailable")
+
+    monkeypatch.setattr(routes, "queue_ticket_confirmation_emails", fail_to_queue)
+
+    response = client.post(
+        "/admin/comps?list_name=artists",
+        data="name,email\nAma,ama@example.com\nKofi,kofi@example.com\n",
+    )
+
+    assert response.status_code == 200, response.get_json()
+    body = response.get_json()
+    assert body["email_error"] is True
+    assert body["issued"] == 2
+    assert {t["email"] for t in body["data"]} == {"ama@example.com", "kofi@example.com"}
@@ -0,0 +1,81 @@
+import threading
+
+import pytest
+
+from app import models, routes
+from app.mysql_backend import _LOCKING_READ
+from bench import stubs
+
+
+@pytest.fixture
+def checkouts(app, monkeypatch):
+    """Names of the threads that checked out connections."""
+    backend = app.extensions["db_pool"]
+    get_connection = backend.get_connection
+    threads = []
+
+    def tracked():
+        threads.append(threading.current_thread().name)
+        return get_connection()
+
+    monkeypatch.setattr(backend, "get_connection", tracked)
+    return threads
+
+
+@pytest.fixture
+def peak_in_use(app, monkeypatch):
+    """Most connections the test held at once."""
+    backend = app.extensions["db_pool"]
+    get_connection = backend.get_connection
+    peak = [0]
+
+    def tracked():
+        conn = get_connection()
+        peak[0] = max(peak[0], backend.in_use())
+        return conn
+
+    monkeypatch.setattr(backend, "get_connection", tracked)
+    return peak
+
+
+def test_model_functions_hold_one_connection(app, peak_in_use):
+    models.create_promo_code("HALF", "percentage", 50)
+    ticket = models.insert_ticket(
+        "one@example.com", "One", "0241234567", 150, "ONE-1",
+        quantity=2, promo_code="HALF",
+    )
+    assert ticket["final_price"] == 150
+
+    reference_code = models.insert_manual_payment(
+        "momo@example.com", "Mo", "0241234567", "regular", 1, 150, 150, 150, 0,
+        None, "0241234567",
+    )
+    assert models.confirm_manual_payment(reference_code, "admin")[0]
+    assert peak_in_use[0] == 1
+
+
+def test_buy_ticket_fans_out_no_database_work(client, checkouts, monkeypatch):
+    paystack = stubs.start_paystack(latency_ms=20)
+    monkeypatch.setattr(routes, "PAYSTACK_BASE_URL", paystack.url)
+    try:
+        response = client.post(
+            "/buy-ticket",
+            json={"email": "b@example.com", "name": "B", "phone": "0241234567"},
+        )
+    finally:
+        paystack.stop()
+    assert response.status_code == 200, response.get_json()
+    assert checkouts and not [t for t in checkouts if t.startswith("fanout")]
+
+
+@pytest.mark.parametrize(
+    "sql, locking",
+    [
+        ("SELECT * FROM tickets WHERE reference = %s FOR UPDATE", True),
+        ("SELECT * FROM tickets WHERE id = 1 for share", True),
+        ("SELECT * FROM tickets LOCK IN SHARE MODE", True),
+        ("SELECT * FROM tickets", False),
+    ],
+)
+def test_locking_reads(sql, locking):
+    assert bool(_LOCKING_READ.search(sql)) == locking
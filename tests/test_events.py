@@ -0,0 +1,88 @@
+"""
+The /admin/events broadcaster. The relay tests need a Redis server
+(REDIS_TEST_URL, e.g. redis://localhost:6379/15) and the redis package.
+"""
+
+import os
+import socket
+import time
+import uuid
+
+import pytest
+
+from app.events import Broadcaster, RedisRelay
+
+
+def _ids(frames):
+    return [int(f.split("\n", 1)[0][len("id: "):]) for f in frames]
+
+
+def test_replays_missed_events():
+    broadcaster = Broadcaster()
+    for n in range(3):
+        broadcaster.publish("ticket.paid", {"n": n})
+
+    subscriber = broadcaster.subscribe(last_event_id=1)
+    broadcaster.publish("ticket.paid", {"n": 3})
+    assert _ids(subscriber.drain(0)) == [2, 3, 4]
+
+
+@pytest.fixture
+def relays():
+    url = os.getenv("REDIS_TEST_URL")
+    if not url:
+        pytest.skip("REDIS_TEST_URL not set")
+    pytest.importorskip("redis")
+    channel = f"events-test-{uuid.uuid4().hex}"
+    # Two processes' worth of broadcasters on one channel
+    broadcasters = []
+    for _ in range(2):
+        broadcaster = Broadcaster()
+        broadcaster.configure(100, 100, 50, relay=RedisRelay(url, 50, channel))
+        broadcasters.append(broadcaster)
+    yield broadcasters
+    broadcasters[0].relay._client.delete(*broadcasters[0].relay._keys[:2])
+
+
+def test_relay_delivers_across_processes(relays):
+    first, second = relays
+    subscriber = first.subscribe()
+    event_id = second.publish("ticket.paid", {"reference": "R1"})
+
+    assert _ids(subscriber.drain(5)) == [event_id]
+
+
+def test_relay_replays_from_redis(relays):
+    first, second = relays
+    ids = [second.publish("ticket.paid", {"n": n}) for n in range(3)]
+
+    # A process that saw none of them live replays them, then gets new ones once
+    subscriber = first.subscribe(last_event_id=ids[0])
+    ids.append(second.publish("ticket.paid", {"n": 3}))
+    frames = subscriber.drain(5)
+    while _ids(frames)[-1] != ids[-1]:
+        frames += subscriber.drain(5)
+    assert _ids(frames) == ids[1:]
+
+
+def test_hung_relay_falls_back_to_local_delivery():
+    pytest.importorskip("redis")
+    # Accepts connections but never answers
+    server = socket.socket()
+    server.bind(("127.0.0.1", 0))
+    server.listen()
+    try:
+        url = f"redis://127.0.0.1:{server.getsockname()[1]}/0"
+        relay = RedisRelay(url, 50, timeout=0.2)
+        # Only publishing is under test
+        relay.start = lambda broadcaster: None
+        broadcaster = Broadcaster()
+        broadcaster.configure(100, 100, 50, relay=relay)
+        subscriber = broadcaster.subscribe()
+
+        start = time.monotonic()
+        event_id = broadcaster.publish("ticket.paid", {"reference": "R1"})
+        assert time.monotonic() - start < 2
+        assert _ids(subscriber.drain(0)) == [event_id]
+    finally:
+        server.close()
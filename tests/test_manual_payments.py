@@ -0,0 +1,93 @@
+"""Manual (MoMo) payment confirmation through the admin endpoints."""
+
+import datetime
+
+from app import models, routes
+
+
+def _manual_payment(email="momo@example.com"):
+    return models.insert_manual_payment(
+        email, "Mo", "0241234567", "regular", 1, 150, 150, 150, 0,
+        None, "0241234567",
+    )
+
+
+def _expire_all():
+    future = datetime.datetime.utcnow() + datetime.timedelta(days=1)
+    models.expire_pending_manual_payments(future, 100)
+
+
+def _fail_to_queue(tickets):
+    raise RuntimeError("queue unavailable")
+
+
+def test_batch_reports_confirmed_when_emails_fail(client, monkeypatch):
+    monkeypatch.setattr(routes, "queue_ticket_confirmation_emails", _fail_to_queue)
+    codes = [_manual_payment(f"m{n}@example.com") for n in range(2)]
+
+    response = client.post(
+        "/admin/manual-payments/batch",
+        json={"action": "confirm", "reference_codes": codes},
+    )
+
+    outcomes = response.get_json()["data"]
+    assert [o["status"] for o in outcomes] == ["confirmed", "confirmed"]
+    assert all(o["email_error"] for o in outcomes)
+    for code in codes:
+        payment = models.get_manual_payment_by_reference(code)
+        assert payment["payment_status"] == "confirmed"
+
+
+def test_import_reports_confirmed_when_emails_fail(client, monkeypatch):
+    monkeypatch.setattr(routes, "queue_ticket_confirmation_emails", _fail_to_queue)
+    code = _manual_payment()
+
+    response = client.post(
+        "/admin/import-momo-statement",
+        data=f"Reference,Amount\nTickets {code},150\n",
+    )
+
+    assert response.status_code == 200, response.get_json()
+    [outcome] = response.get_json()["data"]
+    assert outcome["status"] == "confirmed"
+    assert outcome["email_error"] is True
+
+
+def test_confirm_restores_expired_payment(client):
+    code = _manual_payment()
+    _expire_all()
+    assert models.get_manual_payment_by_reference(code) is None
+
+    response = client.post(f"/admin/confirm-manual-payment/{code}", json={})
+
+    assert response.status_code == 200, response.get_json()
+    assert models.get_manual_payment_by_reference(code)["payment_status"] == "confirmed"
+
+
+def test_batch_and_import_restore_expired_payments(client):
+    batched, imported = _manual_payment("b@example.com"), _manual_payment("i@example.com")
+    _expire_all()
+
+    batch = client.post(
+        "/admin/manual-payments/batch",
+        json={"action": "confirm", "reference_codes": [batched, "ZZZZ"]},
+    ).get_json()["data"]
+    statement = client.post(
+        "/admin/import-momo-statement",
+        data=f"Reference,Amount\nFROM MOMO {imported},150\n",
+    ).get_json()["data"]
+
+    assert [o["status"] for o in batch] == ["confirmed", "not_found"]
+    assert statement[0]["status"] == "confirmed"
+    for code in (batched, imported):
+        assert models.get_manual_payment_by_reference(code)["payment_status"] == "confirmed"
+
+
+def test_new_payments_never_reuse_archived_codes(app, monkeypatch):
+    code = _manual_payment()
+    _expire_all()
+    # The first candidate is the archived code
+    candidates = iter([code, "WXYZ"])
+    monkeypatch.setattr(models.random, "choices", lambda chars, k: next(candidates))
+
+    assert _manual_payment("next@example.com") == "WXYZ"
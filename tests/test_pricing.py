@@ -0,0 +1,24 @@
+from app import pricing
+
+
+def test_failed_first_load_is_retried(app, monkeypatch):
+    monkeypatch.setattr(pricing, "_loaded", False)
+    defaults = pricing.PricingSnapshot(pricing.DEFAULT_TICKET_TYPES)
+    monkeypatch.setattr(pricing, "_snapshot", defaults)
+    real_reload = pricing.reload_pricing
+    calls = []
+
+    def flaky_reload():
+        calls.append(1)
+        if len(calls) == 1:
+            raise RuntimeError("database unavailable")
+        return real_reload()
+
+    monkeypatch.setattr(pricing, "reload_pricing", flaky_reload)
+
+    # Falls back to the configured event, then loads on the next call
+    assert pricing.current_event().id is None
+    assert pricing.current_event().id is not None
+    assert len(calls) == 2
+    pricing.current_event()
+    assert len(calls) == 2
@@ -0,0 +1,91 @@
+"""Read-replica routing in db.get_conn() (see @read_only)."""
+
+import functools
+
+import pytest
+
+from app import db, models, stats
+from app.mysql_backend import MySQLBackend
+from app.sqlite_backend import SQLiteBackend
+
+
+@pytest.fixture
+def replica(app):
+    """A "replica" that is the primary's own SQLite file, counting checkouts."""
+    if app.config["DB_BACKEND"] != "sqlite":
+        pytest.skip("uses the SQLite file as its replica")
+    backend = SQLiteBackend(app.config["SQLITE_PATH"])
+    backend.down_until = 0
+    backend.checkouts = 0
+    get_connection = backend.get_connection
+
+    def counted():
+        backend.checkouts += 1
+        return get_connection()
+
+    backend.get_connection = counted
+    app.extensions["db_replica_pool"] = backend
+    yield backend
+    del app.extensions["db_replica_pool"]
+
+
+def _unreachable_replica(app, **kwargs):
+    backend = MySQLBackend(
+        {"host": "127.0.0.1", "port": 1, "user": "x", "connection_timeout": 1},
+        **kwargs,
+    )
+    backend.down_until = 0
+    app.extensions["db_replica_pool"] = backend
+    return backend
+
+
+def test_read_only_functions_use_the_replica(replica):
+    models.get_all_waitlist()
+    assert replica.checkouts == 1
+
+    models.check_waitlist_status("a@example.com")
+    assert replica.checkouts == 1
+
+
+def test_routing_survives_renames_and_wrapping(replica):
+    @functools.wraps(models.get_all_waitlist)
+    def wrapped():
+        return models.get_all_waitlist()
+
+    listing = models.get_all_waitlist
+    listing()
+    wrapped()
+    assert replica.checkouts == 2
+
+    # A primary function sharing a read-only function's name stays on the primary
+    def get_all_waitlist():
+        db.get_conn().close()
+
+    get_all_waitlist()
+    assert replica.checkouts == 2
+
+
+def test_recount_reads_the_primary(replica):
+    stats.recount()
+    assert replica.checkouts == 0
+
+
+def test_statement_matching_reads_the_primary(replica):
+    models.get_pending_manual_payments()
+    assert replica.checkouts == 0
+
+
+def test_unreachable_replica_is_marked_down(app):
+    backend = _unreachable_replica(app)
+    models.get_all_waitlist()
+    assert backend.down_until > 0
+
+
+def test_busy_replica_stays_up(app):
+    backend = _unreachable_replica(app, pool_size=1, checkout_timeout=0)
+    backend._slots.acquire()
+    try:
+        models.get_all_waitlist()
+    finally:
+        backend._slots.release()
+    assert backend.down_until == 0
@@ -0,0 +1,21 @@
+"""
+Cold-start budget for the serverless entry point (see bench/startup_profile.py
+for the full import profile).
+"""
+
+import os
+import statistics
+
+from bench.startup_profile import LAZY_MODULES, cold_start_ms, import_profile
+
+BUDGET_MS = float(os.getenv("COLD_START_BUDGET_MS", 400))
+
+
+def test_cold_import_within_budget():
+    median = statistics.median(cold_start_ms() for _ in range(3))
+    assert median <= BUDGET_MS, f"cold import of run.py took {median:.1f}ms"
+
+
+def test_service_clients_load_lazily():
+    imported = {module for module, _, _, _ in import_profile()}
+    assert not imported & set(LAZY_MODULES)